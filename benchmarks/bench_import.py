@@ -0,0 +1,219 @@
+"""Cold-import benchmark of the Home Assistant integration.
+
+Imports the integration's modules in fresh interpreters running
+``python -X importtime`` and reports what loading them costs before any
+config entry exists. Home Assistant itself is replaced by a stub package
+generated in a temporary directory, so only the integration and the
+third-party libraries it pulls in are measured; those (aiohttp, voluptuous,
+...) must be installed. Libraries HA loads anyway are imported before timing
+starts. The report lists the total, the slowest imports and
+which heavy optional modules were loaded eagerly.
+
+Usage::
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 9 --top 15
+    python benchmarks/bench_import.py --modules pge_sensor.config_flow
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+COMPONENTS = ROOT / "custom_components"
+DEFAULT_MODULES = (
+    "pge_sensor",
+    "pge_sensor.config_flow",
+    "pge_sensor.sensor",
+    "pge_sensor.diagnostics",
+)
+# Libraries Home Assistant has already imported before it loads the integration.
+PRELOADED = ("aiohttp", "yarl", "voluptuous")
+# Modules that should only be loaded once a refresh actually parses a page.
+DEFERRED = ("bs4", "lxml", "xml.etree.ElementTree", "requests")
+
+STUB_MODULES = (
+    "homeassistant",
+    "homeassistant.components",
+    "homeassistant.components.diagnostics",
+    "homeassistant.components.sensor",
+    "homeassistant.config_entries",
+    "homeassistant.const",
+    "homeassistant.core",
+    "homeassistant.data_entry_flow",
+    "homeassistant.exceptions",
+    "homeassistant.helpers",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.entity",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.typing",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.util",
+    "homeassistant.util.dt",
+)
+PACKAGES = {name.rpartition(".")[0] for name in STUB_MODULES if "." in name}
+
+# Every attribute of a stub module is a class that can be subclassed (with
+# class keywords and generics), called, used as a decorator or asked for
+# further attributes such as ``Platform.SENSOR``.
+STUB_SOURCE = '''\
+class _StubMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _stub(name)
+
+
+class _Stub(metaclass=_StubMeta):
+    def __init_subclass__(cls, **_kwargs):
+        pass
+
+    def __class_getitem__(cls, _item):
+        return cls
+
+    def __init__(self, *_args, **_kwargs):
+        pass
+
+
+_STUBS = {}
+
+
+def _stub(name):
+    if name not in _STUBS:
+        _STUBS[name] = _StubMeta(name, (_Stub,), {})
+    return _STUBS[name]
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return _stub(name)
+'''
+
+TIMED_MARKER = "--- timed imports ---"
+PROBE = """
+import importlib, json, sys, time
+for name in {preloaded!r}:
+    importlib.import_module(name)
+print({marker!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "deferred": [name for name in {deferred!r} if name in sys.modules],
+}}))
+"""
+
+
+def write_stub_package(target: Path) -> None:
+    """Create the ``homeassistant`` stub package below ``target``."""
+    (target / "homeassistant").mkdir()
+    (target / "homeassistant" / "_stub.py").write_text(STUB_SOURCE, encoding="utf-8")
+    for name in STUB_MODULES:
+        parts = name.split(".")
+        if name in PACKAGES:
+            path = target.joinpath(*parts, "__init__.py")
+        else:
+            path = target.joinpath(*parts[:-1], f"{parts[-1]}.py")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("from homeassistant._stub import __getattr__  # noqa: F401\n")
+
+
+def run_once(stub_dir: Path, modules: list[str]) -> tuple[dict, list[tuple[int, int, str]]]:
+    """Import ``modules`` in a fresh interpreter; return its probe and import log."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(stub_dir), str(COMPONENTS), env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            PROBE.format(
+                preloaded=PRELOADED, marker=TIMED_MARKER, modules=modules, deferred=DEFERRED
+            ),
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.splitlines()[-15:])
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{tail}")
+    rows = []
+    log = result.stderr.split(TIMED_MARKER, 1)[-1]
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return json.loads(result.stdout.strip().splitlines()[-1]), rows
+
+
+def _print_report(
+    seconds: list[float], rows: list[tuple[int, int, str]], deferred: list[str], top: int
+) -> None:
+    print(
+        f"cold import over {len(seconds)} runs: "
+        f"median {statistics.median(seconds) * 1000:.1f} ms, "
+        f"min {min(seconds) * 1000:.1f} ms, max {max(seconds) * 1000:.1f} ms"
+    )
+    own = sum(self_us for self_us, _, name in rows if name.strip().startswith("pge_sensor"))
+    stub = sum(self_us for self_us, _, name in rows if name.strip().startswith("homeassistant"))
+    total = sum(self_us for self_us, _, _ in rows)
+    print(
+        f"self time of the last run: {total / 1000:.1f} ms total, "
+        f"{own / 1000:.1f} ms in pge_sensor, {stub / 1000:.1f} ms in the HA stub, "
+        f"{(total - own - stub) / 1000:.1f} ms elsewhere"
+    )
+    print(f"\n{'self ms':>9} {'cumul. ms':>10}  module")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{self_us / 1000:>9.2f} {cumulative_us / 1000:>10.2f}  {name.strip()}")
+    eager = ", ".join(deferred) if deferred else "none of " + ", ".join(DEFERRED)
+    print(f"\nloaded eagerly: {eager}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the integration's cold import time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument(
+        "--modules",
+        default=",".join(DEFAULT_MODULES),
+        help="Comma separated modules to import (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    modules = [name.strip() for name in args.modules.split(",") if name.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="pge_import_") as tmp:
+        stub_dir = Path(tmp)
+        write_stub_package(stub_dir)
+        # The first run compiles bytecode; only warm-cache imports are timed.
+        run_once(stub_dir, modules)
+        seconds: list[float] = []
+        for _ in range(args.runs):
+            probe, rows = run_once(stub_dir, modules)
+            seconds.append(probe["seconds"])
+    _print_report(seconds, rows, probe["deferred"], args.top)
+    # Non-zero when a dependency that should be deferred was imported eagerly.
+    return 1 if probe["deferred"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,200 @@
+"""Offline benchmark of the finance parsing helpers in pge_scraper.py.
+
+Every parser path is timed against synthetic fixtures (and optionally
+captured portal responses) for each installed HTML parser backend. The report
+lists throughput, latency percentiles and peak traced memory, and the run
+fails when two backends disagree on the extracted invoice rows.
+
+Usage::
+
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --rows 1,100,10000 --repeat 5
+    python benchmarks/bench_parser.py --fixtures captured_pages/
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from bs4 import XMLParsedAsHTMLWarning
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pge_scraper  # noqa: E402
+from pge_scraper import PgeScraper, _make_soup  # noqa: E402
+
+try:  # noqa: SIM105 - allow running as a script and as a module
+    from fixtures import ROW_COUNTS, Fixture, generate, load_recorded
+except ImportError:  # pragma: no cover - executed via ``python -m``
+    from benchmarks.fixtures import ROW_COUNTS, Fixture, generate, load_recorded
+
+
+def _paths(fixture: Fixture) -> dict[str, Callable[[], Any]]:
+    payload = fixture.payload
+    paths: dict[str, Callable[[], Any]] = {
+        "extract_balance_info": lambda: PgeScraper._extract_balance_info(payload),
+        "analyse_finance_payload": lambda: PgeScraper._analyse_finance_payload(payload),
+        "has_no_outstanding_hint": lambda: PgeScraper._has_no_outstanding_hint(payload),
+        "invoice_tables": lambda: PgeScraper._extract_from_invoice_tables(
+            _make_soup(PgeScraper._finance_markup(payload))
+        ),
+    }
+    if payload.lstrip().startswith("<?xml"):
+        paths["extract_from_partial"] = lambda: _partial_or_none(payload)
+    return paths
+
+
+def _partial_or_none(payload: str) -> Any:
+    try:
+        return PgeScraper._extract_from_partial(payload)
+    except pge_scraper.PgeScraperError:
+        return None
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> tuple[list[float], int]:
+    func()  # warm caches (regex compilation, soupsieve selectors)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return samples, peak
+
+
+def _repeat_for(fixture: Fixture, requested: int) -> int:
+    if requested:
+        return requested
+    if fixture.rows >= 10000:
+        return 3
+    if fixture.rows >= 1000:
+        return 10
+    return 30
+
+
+def run(
+    fixtures: Iterable[Fixture], backends: list[str], repeat: int
+) -> tuple[list[dict[str, Any]], list[str]]:
+    results: list[dict[str, Any]] = []
+    mismatches: list[str] = []
+    for fixture in fixtures:
+        reference: Any = None
+        for backend in backends:
+            pge_scraper.set_html_parser(backend)
+            extracted = PgeScraper._analyse_finance_payload(fixture.payload)
+            if reference is None:
+                reference = extracted
+            elif extracted != reference:
+                mismatches.append(f"{fixture.name}: {backend} differs from {backends[0]}")
+            for path, func in _paths(fixture).items():
+                samples, peak = _measure(func, _repeat_for(fixture, repeat))
+                mean = statistics.fmean(samples)
+                results.append(
+                    {
+                        "fixture": fixture.name,
+                        "backend": backend,
+                        "path": path,
+                        "rows": fixture.rows,
+                        "bytes": fixture.size,
+                        "ops_per_s": 1 / mean if mean else float("inf"),
+                        "mib_per_s": fixture.size / mean / 2**20 if mean else float("inf"),
+                        "p50_ms": _percentile(samples, 0.50) * 1000,
+                        "p95_ms": _percentile(samples, 0.95) * 1000,
+                        "p99_ms": _percentile(samples, 0.99) * 1000,
+                        "peak_kib": peak / 1024,
+                    }
+                )
+    return results, mismatches
+
+
+def _print_report(results: list[dict[str, Any]]) -> None:
+    header = (
+        f"{'fixture':<24} {'backend':<12} {'path':<24} {'KiB':>8} {'ops/s':>9} "
+        f"{'MiB/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['fixture']:<24} {row['backend']:<12} {row['path']:<24} "
+            f"{row['bytes'] / 1024:>8.1f} {row['ops_per_s']:>9.1f} {row['mib_per_s']:>7.2f} "
+            f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f} "
+            f"{row['peak_kib']:>10.1f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the finance page parsers")
+    parser.add_argument(
+        "--rows",
+        default=",".join(str(count) for count in ROW_COUNTS),
+        help="Comma separated invoice row counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=0,
+        help="Timed iterations per case (default: scaled with fixture size)",
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=pge_scraper.HTML_PARSER_BACKENDS,
+        help="Restrict to a parser backend (repeatable; default: all installed)",
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=Path,
+        help="Directory with captured finance pages to benchmark as well",
+    )
+    parser.add_argument(
+        "--no-synthetic",
+        action="store_true",
+        help="Only benchmark the captured pages passed with --fixtures",
+    )
+    args = parser.parse_args()
+    # Malformed partial responses intentionally fall back to the HTML parser.
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+    backends = args.backend or pge_scraper.available_html_parsers()
+    missing = [name for name in backends if name not in pge_scraper.available_html_parsers()]
+    if missing:
+        print(f"Parser backend not installed: {', '.join(missing)}", file=sys.stderr)
+        return 2
+    row_counts = tuple(int(value) for value in args.rows.split(",") if value)
+
+    fixtures: list[Fixture] = []
+    if not args.no_synthetic:
+        fixtures.extend(generate(row_counts))
+    if args.fixtures:
+        fixtures.extend(load_recorded(args.fixtures))
+
+    results, mismatches = run(fixtures, backends, args.repeat)
+    _print_report(results)
+    if mismatches:
+        print("\nBackend mismatches:", file=sys.stderr)
+        for line in mismatches:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,307 @@
+"""Local stand-in for the eBOK portal for end-to-end and load testing.
+
+Serves just enough of ebok.gkpge.pl for ``PgeScraper``: the JSF login form
+with a ``javax.faces.ViewState`` token, the login POST redirecting to the
+dashboard (or to the browser verification page), cookie sessions that expire,
+the dashboard/index warmup pages and both finance endpoints. Finance pages
+come from the benchmark fixture generator, so their size is configurable.
+
+Latency, injected errors and a failing primary finance endpoint make it
+possible to exercise retries, hedging and concurrency limits offline.
+``--trailer-kib`` appends hidden dialog markup after the invoice table, like
+the heavy JSF pages do, to exercise large pages and the finance size cap.
+
+Accounts are implicit: any username logs in with ``--password``. Usernames
+starting with ``verify`` are sent to the verification page, usernames
+starting with ``empty`` have nothing to pay and usernames starting with
+``multi`` have ``--contracts`` contracts, listed in a switcher on the
+dashboard and selected on the finance page with ``?umowa=<id>``
+(``--ignore-contract-param`` serves every contract the same account page).
+
+Usage::
+
+    python benchmarks/fake_portal.py --port 8080 --rows 100 --latency 0.2
+    python pge_scraper.py --base-url http://localhost:8080 user secret
+
+``GET /_stats`` returns request counters as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from aiohttp import web
+
+try:  # noqa: SIM105 - allow running as a script and as a module
+    from fixtures import full_page, no_outstanding_page, partial_response
+except ImportError:  # pragma: no cover - executed via ``python -m``
+    from benchmarks.fixtures import full_page, no_outstanding_page, partial_response
+
+LOGIN_PATH = "/ebok/profil/logowanie.xhtml"
+VERIFICATION_PATH = "/ebok/profil/weryfikacja.xhtml"
+DASHBOARD_PATH = "/ebok/"
+INDEX_PATH = "/ebok/index.xhtml"
+FINANCE_PATH = "/ebok/finanse.xhtml"
+FINANCE_FALLBACK_PATH = "/ebok/finanse/finanse.xhtml"
+SESSION_COOKIE = "JSESSIONID"
+CONTRACT_PARAM = "umowa"
+# Issued ViewState tokens remembered for validating login POSTs.
+MAX_VIEW_STATES = 100_000
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@dataclass
+class PortalConfig:
+    """Behaviour of the fake portal; mirrors the command line options."""
+
+    password: str = "secret"
+    rows: int = 3
+    partial: bool = False
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    session_ttl: float = 1800.0
+    primary_finance_status: int = 200
+    trailer_kib: int = 0
+    compress: bool = False
+    contracts: int = 3
+    ignore_contract_param: bool = False
+    seed: int = 0
+
+
+class FakePortal:
+    """In-memory portal state: issued ViewStates, sessions and counters."""
+
+    def __init__(self, config: PortalConfig) -> None:
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._view_states: OrderedDict[str, None] = OrderedDict()
+        self._sessions: dict[str, tuple[str, float]] = {}
+        self.stats: Counter[str] = Counter()
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._fault_middleware])
+        app.router.add_get(LOGIN_PATH, self._login_form)
+        app.router.add_post(LOGIN_PATH, self._login_submit)
+        app.router.add_get(VERIFICATION_PATH, self._verification)
+        app.router.add_get(DASHBOARD_PATH, self._dashboard)
+        app.router.add_get(INDEX_PATH, self._dashboard)
+        app.router.add_get(FINANCE_PATH, self._finance)
+        app.router.add_get(FINANCE_FALLBACK_PATH, self._finance)
+        app.router.add_get("/_stats", self._stats)
+        return app
+
+    @web.middleware
+    async def _fault_middleware(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        if request.path == "/_stats":
+            return await handler(request)
+        self.stats["requests"] += 1
+        self.stats[f"{request.method} {request.path}"] += 1
+        delay = self.config.latency + self._rng.uniform(0, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._rng.random() < self.config.error_rate:
+            self.stats["injected_errors"] += 1
+            return web.Response(status=503, text="Serwis chwilowo niedostępny")
+        return await handler(request)
+
+    async def _login_form(self, _request: web.Request) -> web.Response:
+        token = f"{secrets.randbits(63)}:{secrets.randbits(63)}"
+        self._view_states[token] = None
+        while len(self._view_states) > MAX_VIEW_STATES:
+            self._view_states.popitem(last=False)
+        return _html(
+            "eBOK - Logowanie",
+            '<form id="hiddenLoginForm" method="post" action="/ebok/profil/logowanie.xhtml">'
+            '<input type="hidden" name="hiddenLoginForm" value="hiddenLoginForm"/>'
+            '<input type="text" name="hiddenLoginForm:hiddenLogin"/>'
+            '<input type="password" name="hiddenLoginForm:hiddenPassword"/>'
+            '<input type="submit" name="hiddenLoginForm:loginButton" value="Zaloguj"/>'
+            f'<input type="hidden" name="javax.faces.ViewState" value="{token}"/>'
+            "</form>",
+        )
+
+    async def _login_submit(self, request: web.Request) -> web.StreamResponse:
+        form = await request.post()
+        username = str(form.get("hiddenLoginForm:hiddenLogin", ""))
+        password = str(form.get("hiddenLoginForm:hiddenPassword", ""))
+        token = str(form.get("javax.faces.ViewState", ""))
+        known_token = token in self._view_states
+        self._view_states.pop(token, None)
+        if not known_token or password != self.config.password:
+            # JSF re-renders the form on a stale ViewState or bad credentials.
+            self.stats["failed_logins"] += 1
+            return await self._login_form(request)
+        if username.startswith("verify"):
+            self.stats["verification_redirects"] += 1
+            raise web.HTTPFound(VERIFICATION_PATH)
+        session_id = secrets.token_hex(16).upper()
+        self._sessions[session_id] = (username, time.monotonic())
+        self.stats["logins"] += 1
+        response = web.HTTPFound(DASHBOARD_PATH)
+        response.set_cookie(SESSION_COOKIE, session_id, path="/ebok", httponly=True)
+        raise response
+
+    async def _verification(self, _request: web.Request) -> web.Response:
+        return _html(
+            "eBOK - Weryfikacja",
+            "<p>Potwierdź logowanie kodem wysłanym na adres e-mail.</p>",
+        )
+
+    async def _dashboard(self, request: web.Request) -> web.Response:
+        username = self._require_session(request)
+        switcher = ""
+        if username.startswith("multi"):
+            options = "".join(
+                f'<option value="{contract}">Umowa {contract} - PPE {index}</option>'
+                for index, contract in enumerate(self._contract_ids(username), start=1)
+            )
+            switcher = f'<select id="menuForm:wyborUmowy">{options}</select>'
+        return _html("eBOK", f"{switcher}<p>Witaj w eBOK</p>")
+
+    async def _finance(self, request: web.Request) -> web.Response:
+        username = self._require_session(request)
+        if request.path == FINANCE_PATH and self.config.primary_finance_status != 200:
+            return web.Response(
+                status=self.config.primary_finance_status, text="Błąd serwera"
+            )
+        view = username
+        if username.startswith("multi") and not self.config.ignore_contract_param:
+            contract = request.query.get(CONTRACT_PARAM, "")
+            if contract not in self._contract_ids(username):
+                return web.Response(status=400, text="Nieznana umowa")
+            self.stats["contract_views"] += 1
+            view = f"{username}/{contract}"
+        if username.startswith("empty"):
+            body = no_outstanding_page()
+        else:
+            body = _finance_document(
+                self.config.rows, self.config.partial, self.config.trailer_kib, view
+            )
+        content_type = "text/xml" if body.startswith("<?xml") else "text/html"
+        response = web.Response(text=body, content_type=content_type, charset="utf-8")
+        if self.config.compress:
+            # Negotiated from Accept-Encoding (gzip or deflate, br if available).
+            response.enable_compression()
+        return response
+
+    async def _stats(self, _request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "sessions": len(self._sessions)})
+
+    def _contract_ids(self, username: str) -> list[str]:
+        seed = sum(username.encode("utf-8"))
+        return [f"{seed:04d}{index:02d}" for index in range(1, self.config.contracts + 1)]
+
+    def _require_session(self, request: web.Request) -> str:
+        session = self._sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+        if session is not None:
+            username, created = session
+            if time.monotonic() - created < self.config.session_ttl:
+                return username
+            del self._sessions[request.cookies[SESSION_COOKIE]]
+            self.stats["expired_sessions"] += 1
+        raise web.HTTPFound(LOGIN_PATH)
+
+
+@lru_cache(maxsize=256)
+def _finance_document(rows: int, partial: bool, trailer_kib: int, username: str) -> str:
+    seed = sum(username.encode("utf-8"))
+    if partial:
+        return partial_response(rows, seed)
+    page = full_page(rows, seed)
+    if not trailer_kib:
+        return page
+    dialog = (
+        '<div class="ui-dialog ui-widget" style="display:none" role="dialog">'
+        '<div class="ui-dialog-content"><p>Szczegóły dokumentu</p></div></div>'
+    )
+    trailer = dialog * (trailer_kib * 1024 // len(dialog) + 1)
+    return page.replace("</main>", f"</main>{trailer}", 1)
+
+
+def _html(title: str, body: str) -> web.Response:
+    return web.Response(
+        text=(
+            '<!DOCTYPE html><html><head><meta charset="UTF-8"/>'
+            f"<title>{title}</title></head><body>{body}</body></html>"
+        ),
+        content_type="text/html",
+        charset="utf-8",
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a local stand-in eBOK portal")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="Port (default: %(default)s)")
+    parser.add_argument("--password", default="secret", help="Password accepted for every user")
+    parser.add_argument("--rows", type=int, default=3, help="Invoices per finance page")
+    parser.add_argument(
+        "--partial", action="store_true", help="Serve finance data as JSF partial responses"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Base delay per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay up to (s)")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503"
+    )
+    parser.add_argument(
+        "--session-ttl", type=float, default=1800.0, help="Session lifetime in seconds"
+    )
+    parser.add_argument(
+        "--primary-finance-status",
+        type=int,
+        default=200,
+        help="HTTP status of /ebok/finanse.xhtml; non-200 forces the fallback endpoint",
+    )
+    parser.add_argument(
+        "--trailer-kib",
+        type=int,
+        default=0,
+        help="KiB of hidden markup after the invoice table on full pages",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress finance pages according to the client's Accept-Encoding",
+    )
+    parser.add_argument(
+        "--contracts", type=int, default=3, help="Contracts of every multi* account"
+    )
+    parser.add_argument(
+        "--ignore-contract-param",
+        action="store_true",
+        help=f"Serve the account's finance page whatever ?{CONTRACT_PARAM}= selects",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and errors")
+    args = parser.parse_args()
+    config = PortalConfig(
+        password=args.password,
+        rows=args.rows,
+        partial=args.partial,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        session_ttl=args.session_ttl,
+        primary_finance_status=args.primary_finance_status,
+        trailer_kib=args.trailer_kib,
+        compress=args.compress,
+        contracts=args.contracts,
+        ignore_contract_param=args.ignore_contract_param,
+        seed=args.seed,
+    )
+    web.run_app(FakePortal(config).build_app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+"""Synthetic eBOK finance documents for offline parser benchmarks.
+
+The generator mimics the structure of the real JSF pages served by
+ebok.gkpge.pl: a full HTML page with navigation, hidden ViewState inputs and
+the ``fakturaDoZaplaty`` invoice table, the same table delivered as a
+``<partial-response>`` AJAX update, pages reporting no outstanding payments
+and a few deliberately broken documents.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+ROW_COUNTS = (1, 10, 100, 1000, 10000)
+
+
+@dataclass(frozen=True)
+class Fixture:
+    """A named finance payload with the number of invoice rows it contains."""
+
+    name: str
+    kind: str
+    rows: int
+    payload: str
+
+    @property
+    def size(self) -> int:
+        return len(self.payload.encode("utf-8"))
+
+
+def _format_amount(grosze: int) -> str:
+    zloty, cents = divmod(grosze, 100)
+    groups = f"{zloty:,}".replace(",", "\xa0")
+    return f"{groups},{cents:02d}\xa0zł"
+
+
+def _invoice_rows(rows: int, seed: int) -> str:
+    rng = random.Random(seed)
+    issued = date(2024, 1, 5)
+    parts = []
+    for index in range(rows):
+        issue_date = issued + timedelta(days=index % 730)
+        due_date = issue_date + timedelta(days=14)
+        grosze = rng.randint(1_000, 250_000_00)
+        parts.append(
+            "<tr class=\"ui-widget-content ui-datatable-{parity}\" role=\"row\">"
+            "<td role=\"gridcell\"><span>FV/{year}/{number:07d}</span></td>"
+            "<td role=\"gridcell\"><span>{issue}</span></td>"
+            "<td role=\"gridcell\"><span>{due}</span></td>"
+            "<td role=\"gridcell\" class=\"kwota\"><span>{amount}</span></td>"
+            "<td role=\"gridcell\"><a href=\"/ebok/finanse/faktura.xhtml;jsessionid="
+            "{session}?id={number}\">Pobierz</a></td>"
+            "</tr>".format(
+                parity="even" if index % 2 else "odd",
+                year=issue_date.year,
+                number=index + 1,
+                issue=issue_date.strftime("%d.%m.%Y"),
+                due=due_date.strftime("%d.%m.%Y"),
+                amount=_format_amount(grosze),
+                session=f"{rng.getrandbits(64):016X}",
+            )
+        )
+    return "".join(parts)
+
+
+def _invoice_table(rows: int, seed: int) -> str:
+    return (
+        "<div id=\"financeForm:faktury\" class=\"ui-datatable ui-widget\">"
+        "<table role=\"grid\">"
+        "<thead id=\"financeForm:fakturaDoZaplaty_head\"><tr role=\"row\">"
+        "<th>Numer dokumentu</th><th>Data wystawienia</th>"
+        "<th>Termin płatności</th><th>Kwota do zapłaty</th><th></th>"
+        "</tr></thead>"
+        f"<tbody id=\"financeForm:fakturaDoZaplaty_data\">{_invoice_rows(rows, seed)}"
+        "</tbody></table></div>"
+    )
+
+
+def _page(body: str, seed: int) -> str:
+    rng = random.Random(seed)
+    navigation = "".join(
+        f"<li class=\"menu-item\"><a href=\"/ebok/sekcja{index}.xhtml\">Sekcja {index}</a></li>"
+        for index in range(40)
+    )
+    scripts = "".join(
+        f"<script src=\"/ebok/javax.faces.resource/app{index}.js?ln=js\"></script>"
+        for index in range(12)
+    )
+    view_state = f"{rng.getrandbits(63)}:{rng.getrandbits(63)}"
+    return (
+        "<!DOCTYPE html><html xmlns=\"http://www.w3.org/1999/xhtml\"><head>"
+        "<meta charset=\"UTF-8\"/><title>eBOK - Finanse</title>"
+        f"{scripts}</head><body><header><ul class=\"menu\">{navigation}</ul></header>"
+        "<form id=\"financeForm\" method=\"post\" action=\"/ebok/finanse.xhtml\">"
+        f"<main>{body}</main>"
+        "<input type=\"hidden\" name=\"javax.faces.ViewState\" "
+        f"id=\"j_id1:javax.faces.ViewState:0\" value=\"{view_state}\"/>"
+        "</form><footer><p>PGE Obrót S.A.</p></footer></body></html>"
+    )
+
+
+def full_page(rows: int, seed: int = 0) -> str:
+    """Full finance page with ``rows`` outstanding invoices."""
+    summary = (
+        "<div class=\"do-zaplaty-label\">Saldo do zapłaty: "
+        f"<strong>{_format_amount(rows * 100)}</strong></div>"
+    )
+    return _page(summary + _invoice_table(rows, seed), seed)
+
+
+def partial_response(rows: int, seed: int = 0) -> str:
+    """JSF ``<partial-response>`` carrying the invoice table as an update."""
+    rng = random.Random(seed)
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<partial-response id=\"j_id1\"><changes>"
+        f"<update id=\"financeForm:faktury\"><![CDATA[{_invoice_table(rows, seed)}]]></update>"
+        "<update id=\"j_id1:javax.faces.ViewState:0\"><![CDATA["
+        f"{rng.getrandbits(63)}:{rng.getrandbits(63)}]]></update>"
+        "</changes></partial-response>"
+    )
+
+
+def no_outstanding_page(seed: int = 0) -> str:
+    """Finance page telling the customer that nothing is due."""
+    body = (
+        "<div class=\"ui-messages-info\"><span class=\"ui-messages-info-summary\">"
+        "Brak\xa0należności do zapłaty.</span></div>"
+        "<div class=\"saldo\">Saldo: <strong>0,00\xa0zł</strong></div>"
+    )
+    return _page(body, seed)
+
+
+def malformed_page(rows: int, seed: int = 0) -> str:
+    """Full page truncated in the middle of the invoice table."""
+    document = full_page(rows, seed)
+    cut = document.index("</tbody>")
+    return document[: cut - 40]
+
+
+def malformed_partial(rows: int, seed: int = 0) -> str:
+    """Partial response whose XML envelope is broken."""
+    return partial_response(rows, seed).replace("]]></update>", "</update>", 1)
+
+
+def generate(row_counts: tuple[int, ...] = ROW_COUNTS, seed: int = 0) -> Iterator[Fixture]:
+    """Yield the standard benchmark fixture set."""
+    yield Fixture("no-outstanding", "no_outstanding", 0, no_outstanding_page(seed))
+    for rows in row_counts:
+        yield Fixture(f"page-{rows}", "page", rows, full_page(rows, seed))
+        yield Fixture(f"partial-{rows}", "partial", rows, partial_response(rows, seed))
+        yield Fixture(f"malformed-page-{rows}", "malformed", rows, malformed_page(rows, seed))
+        yield Fixture(
+            f"malformed-partial-{rows}", "malformed", rows, malformed_partial(rows, seed)
+        )
+
+
+def load_recorded(directory: Path) -> Iterator[Fixture]:
+    """Yield captured portal responses (``*.html``/``*.xml``) from a directory."""
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() not in (".html", ".htm", ".xml", ".xhtml"):
+            continue
+        payload = path.read_text(encoding="utf-8", errors="replace")
+        yield Fixture(f"recorded:{path.name}", "recorded", -1, payload)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write synthetic finance fixtures to disk")
+    parser.add_argument("directory", type=Path, help="Output directory")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+    args.directory.mkdir(parents=True, exist_ok=True)
+    for fixture in generate(seed=args.seed):
+        suffix = ".xml" if fixture.payload.startswith("<?xml") else ".html"
+        (args.directory / f"{fixture.name}{suffix}").write_text(fixture.payload, encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
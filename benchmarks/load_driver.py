@@ -0,0 +1,243 @@
+"""Load driver measuring end-to-end refresh latency against a portal.
+
+Runs many simulated accounts for several rounds against ``--base-url``
+(normally ``benchmarks/fake_portal.py``) and reports latency percentiles,
+throughput, failures by class and the summed per-phase request statistics.
+The first round logs every account in; later rounds reuse the sessions like
+periodic refreshes do.
+
+Two clients are available: ``async`` drives the Home Assistant scraper
+(``custom_components/pge_sensor/api.py``) on one shared aiohttp connector,
+``cli`` drives ``pge_scraper.py`` on a thread pool with a shared urllib3 pool.
+
+Usage::
+
+    python benchmarks/fake_portal.py --latency 0.05 --jitter 0.1 &
+    python benchmarks/load_driver.py --accounts 200 --concurrency 20 --rounds 3
+    python benchmarks/load_driver.py --client cli --hedge-delay 0.5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import statistics
+import sys
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@dataclass
+class RoundResult:
+    """Outcome of one round over every simulated account."""
+
+    wall_s: float
+    latencies: list[float] = field(default_factory=list)
+    failures: Counter[str] = field(default_factory=Counter)
+    requests: int = 0
+    bytes: int = 0
+    wire_bytes: int = 0
+
+
+def _load_async_api() -> ModuleType:
+    # Import api.py on its own; the package __init__ needs Home Assistant.
+    path = ROOT / "custom_components" / "pge_sensor" / "api.py"
+    spec = importlib.util.spec_from_file_location("pge_sensor_api", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _record(result: RoundResult, started: float, metrics: Any, error: Optional[Exception]) -> None:
+    result.latencies.append(time.perf_counter() - started)
+    total = metrics.as_dict()["total"]
+    result.requests += total["requests"]
+    result.bytes += total["bytes"]
+    result.wire_bytes += total["wire_bytes"]
+    if error is not None:
+        result.failures[getattr(error, "kind", type(error).__name__)] += 1
+
+
+async def _run_async(args: argparse.Namespace, usernames: list[str]) -> list[RoundResult]:
+    import aiohttp
+
+    api = _load_async_api()
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    slots = asyncio.Semaphore(args.concurrency)
+    sessions = [
+        aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            auto_decompress=False,
+        )
+        for _ in usernames
+    ]
+    scrapers = [
+        api.PgeScraper(
+            username,
+            args.password,
+            session,
+            timeout=args.timeout,
+            hedge_delay=args.hedge_delay,
+            metrics=api.ScrapeMetrics(),
+            base_url=args.base_url,
+        )
+        for username, session in zip(usernames, sessions)
+    ]
+
+    async def _one(scraper: Any, result: RoundResult) -> None:
+        async with slots:
+            started = time.perf_counter()
+            error: Optional[Exception] = None
+            try:
+                await scraper.get_snapshot()
+            except Exception as exc:  # noqa: BLE001 - every failure is counted
+                error = exc
+            _record(result, started, scraper.metrics, error)
+
+    results = []
+    try:
+        for _ in range(args.rounds):
+            result = RoundResult(wall_s=0.0)
+            started = time.perf_counter()
+            await asyncio.gather(*(_one(scraper, result) for scraper in scrapers))
+            result.wall_s = time.perf_counter() - started
+            results.append(result)
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+        await connector.close()
+    return results
+
+
+def _run_cli(args: argparse.Namespace, usernames: list[str]) -> list[RoundResult]:
+    import pge_scraper
+
+    adapter = pge_scraper.create_adapter(
+        pool_maxsize=args.concurrency * pge_scraper.DEFAULT_POOL_MAXSIZE
+    )
+    scrapers = []
+    for username in usernames:
+        session = pge_scraper.create_session(adapter)
+        scrapers.append(
+            pge_scraper.PgeScraper(
+                username,
+                args.password,
+                session=session,
+                timeout=args.timeout,
+                hedge_delay=args.hedge_delay,
+                metrics=pge_scraper.ScrapeMetrics(),
+                base_url=args.base_url,
+            )
+        )
+
+    def _one(scraper: Any, result: RoundResult) -> None:
+        started = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            scraper.get_snapshot()
+        except Exception as exc:  # noqa: BLE001 - every failure is counted
+            error = exc
+        _record(result, started, scraper.metrics, error)
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for _ in range(args.rounds):
+                result = RoundResult(wall_s=0.0)
+                started = time.perf_counter()
+                list(executor.map(lambda scraper: _one(scraper, result), scrapers))
+                result.wall_s = time.perf_counter() - started
+                results.append(result)
+    finally:
+        adapter.close()
+    return results
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _print_report(results: list[RoundResult]) -> None:
+    header = (
+        f"{'round':>5} {'ok':>6} {'failed':>6} {'wall s':>8} {'acct/s':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'requests':>9} "
+        f"{'KiB':>9} {'wire KiB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for number, result in enumerate(results, start=1):
+        failed = sum(result.failures.values())
+        samples = result.latencies
+        print(
+            f"{number:>5} {len(samples) - failed:>6} {failed:>6} {result.wall_s:>8.2f} "
+            f"{len(samples) / result.wall_s:>8.1f} "
+            f"{_percentile(samples, 0.50) * 1000:>9.1f} "
+            f"{_percentile(samples, 0.95) * 1000:>9.1f} "
+            f"{_percentile(samples, 0.99) * 1000:>9.1f} "
+            f"{max(samples) * 1000:>9.1f} {result.requests:>9} {result.bytes / 1024:>9.1f} "
+            f"{result.wire_bytes / 1024:>9.1f}"
+        )
+        if result.failures:
+            print(f"      failures: {dict(result.failures)}")
+    means = [statistics.fmean(result.latencies) * 1000 for result in results]
+    print(f"\nmean latency per round (ms): {', '.join(f'{mean:.1f}' for mean in means)}")
+
+
+def _server_stats(base_url: str) -> Optional[dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"{base_url.rstrip('/')}/_stats", timeout=5) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Drive concurrent scrapes against a portal")
+    parser.add_argument(
+        "--base-url",
+        default="http://localhost:8080",
+        help="Portal origin (default: %(default)s)",
+    )
+    parser.add_argument("--client", choices=("async", "cli"), default="async")
+    parser.add_argument("--accounts", type=int, default=50, help="Simulated accounts")
+    parser.add_argument("--concurrency", type=int, default=10, help="Accounts in flight")
+    parser.add_argument("--rounds", type=int, default=3, help="Refresh rounds per account")
+    parser.add_argument("--prefix", default="user", help="Username prefix (default: user)")
+    parser.add_argument("--password", default="secret", help="Password for every account")
+    parser.add_argument("--timeout", type=int, default=15, help="Request timeout in seconds")
+    parser.add_argument(
+        "--hedge-delay", type=float, help="Hedge the finance fetch after SECONDS"
+    )
+    args = parser.parse_args()
+    if args.accounts < 1 or args.concurrency < 1 or args.rounds < 1:
+        parser.error("--accounts, --concurrency and --rounds must be at least 1")
+
+    usernames = [f"{args.prefix}{index}" for index in range(args.accounts)]
+    if args.client == "async":
+        results = asyncio.run(_run_async(args, usernames))
+    else:
+        results = _run_cli(args, usernames)
+    _print_report(results)
+    stats = _server_stats(args.base_url)
+    if stats is not None:
+        print(f"server: {json.dumps(stats, ensure_ascii=False, sort_keys=True)}")
+    return 1 if any(result.failures for result in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,35 +1,85 @@
 """Home Assistant integration for PGE Sensor."""
 from __future__ import annotations
 
+from datetime import timedelta
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
 from homeassistant.helpers.typing import ConfigType
 
-from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN
-from .coordinator import PgeEbokCoordinator
+from .api import set_html_parser
+from .backoff import async_drop_breaker, async_reset_breakers
+
+from .const import (
+    CONF_DAILY_REFRESH_BUDGET,
+    CONF_PASSWORD,
+    CONF_STALE_AFTER_HOURS,
+    CONF_USERNAME,
+    DEFAULT_DAILY_REFRESH_BUDGET,
+    DEFAULT_STALE_AFTER_HOURS,
+    DOMAIN,
+)
+from .coordinator import PgeEbokCoordinator, invoice_history, session_store
+from .hub import async_get_hub, async_release_hub
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
+SERVICE_RESET_BACKOFF = "reset_backoff"
+
 
+async def async_setup(hass: HomeAssistant, _config: ConfigType) -> bool:
+    """Set up the integration via YAML (not supported) and its services."""
 
-async def async_setup(_hass: HomeAssistant, _config: ConfigType) -> bool:
-    """Set up the integration via YAML (not supported)."""
+    async def _async_reset_backoff(_call: ServiceCall) -> None:
+        async_reset_breakers(hass)
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            await coordinator.async_request_refresh()
+
+    hass.services.async_register(DOMAIN, SERVICE_RESET_BACKOFF, _async_reset_backoff)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
+    hub = async_get_hub(hass)
+    hub.register(entry.entry_id)
+    # Picking the parser backend imports bs4 (and lxml); keep that off the loop.
+    await hass.async_add_executor_job(set_html_parser)
     coordinator = PgeEbokCoordinator(
         hass,
+        hub,
+        entry.entry_id,
         entry.data[CONF_USERNAME],
         entry.data[CONF_PASSWORD],
+        entry.options.get(CONF_DAILY_REFRESH_BUDGET, DEFAULT_DAILY_REFRESH_BUDGET),
+        timedelta(
+            hours=entry.options.get(CONF_STALE_AFTER_HOURS, DEFAULT_STALE_AFTER_HOURS)
+        ),
     )
 
-    await coordinator.async_config_entry_first_refresh()
+    # Entities are set up from the config flow's login or the persisted
+    # snapshot; only an entry with neither waits for the portal, and even
+    # then in the background so HA start-up is not held up by eBOK.
+    refresh_now = False
+    try:
+        validated = hub.pop_validation(entry.unique_id)
+        if validated is not None:
+            await coordinator.async_adopt_validation(validated)
+        else:
+            refresh_now = not await coordinator.async_restore_snapshot()
+    except Exception:
+        await coordinator.async_shutdown()
+        async_release_hub(hass, entry.entry_id)
+        raise
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_reload_entry))
+    if refresh_now:
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {entry.entry_id}"
+        )
 
     return True
 
@@ -37,5 +87,21 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        coordinator: PgeEbokCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
+        async_release_hub(hass, entry.entry_id)
     return unload_ok
+
+
+async def _async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options by reloading the entry."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the persisted portal session and history when an entry is deleted."""
+    async_drop_breaker(hass, entry.entry_id)
+    await session_store(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(
+        invoice_history(hass).forget, entry.data[CONF_USERNAME]
+    )
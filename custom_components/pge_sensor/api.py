@@ -1,24 +1,228 @@
 """PGE Sensor scraping helpers."""
 from __future__ import annotations
 
+import asyncio
+import codecs
+import contextlib
+import functools
+import hashlib
+import importlib
 import logging
 import re
-import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+import time
+import zlib
+from array import array
+from dataclasses import asdict, dataclass
 from datetime import date, datetime
-from typing import Optional
+from http.cookies import SimpleCookie
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncContextManager,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+from urllib.parse import urlsplit
 
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+from yarl import URL
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+# bs4 (with its tree builders) and ElementTree are imported on first use, not
+# when Home Assistant loads the integration; aiohttp and yarl are already
+# loaded by HA itself.
 
 _LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
+
+# Finance pages are streamed in chunks of this size, and a page whose decoded
+# body exceeds the cap is rejected instead of being buffered and parsed.
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_FINANCE_BYTES = 16 * 1024 * 1024
+# Finance pages of accounts with several contracts are fetched in parallel,
+# at most this many at a time over the account's session.
+DEFAULT_CONTRACT_CONCURRENCY = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli_module() -> Any:
+    for name in ("brotli", "brotlicffi"):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return None
+
+
+def accepted_encodings() -> str:
+    """Return the ``Accept-Encoding`` value for the installed decoders.
+
+    ``br`` is only advertised when ``brotli`` or ``brotlicffi`` is installed.
+    """
+    return "gzip, deflate, br" if _brotli_module() is not None else "gzip, deflate"
+
+
+class _ContentDecoder:
+    """Undoes a response's ``Content-Encoding`` one chunk at a time.
+
+    Used on client sessions created with ``auto_decompress=False``, so the
+    scraper sees both the transferred and the decoded size of every body.
+    gzip and deflate output is produced in bounded pieces, so a small
+    compressed chunk cannot expand past the size cap in a single step.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self._encoding = encoding.strip().lower()
+        self._raw_deflate_fallback = self._encoding == "deflate"
+        self._zlib: Any = None
+        self._brotli: Any = None
+        brotli = _brotli_module()
+        if self._encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self._encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+        elif self._encoding == "br" and brotli is not None:
+            self._brotli = brotli.Decompressor()
+        elif self._encoding not in ("", "identity"):
+            raise aiohttp.ClientPayloadError(f"Unsupported content encoding {encoding!r}")
+
+    def decode(self, chunk: bytes) -> Iterator[bytes]:
+        """Yield the decoded form of ``chunk`` in pieces."""
+        try:
+            if self._zlib is not None:
+                yield from self._decode_zlib(chunk)
+            elif self._brotli is not None:
+                process = getattr(self._brotli, "process", None) or self._brotli.decompress
+                yield process(chunk)
+            else:
+                yield chunk
+        except Exception as exc:  # zlib.error, brotli.error
+            raise aiohttp.ClientPayloadError(
+                f"Could not decode {self._encoding} response body"
+            ) from exc
+
+    def flush(self) -> bytes:
+        return self._zlib.flush() if self._zlib is not None else b""
+
+    def _decode_zlib(self, chunk: bytes) -> Iterator[bytes]:
+        if self._raw_deflate_fallback:
+            self._raw_deflate_fallback = False
+            probe = self._zlib.copy()
+            try:
+                probe.decompress(chunk[:64])
+            except zlib.error:
+                # Some servers send "deflate" bodies without the zlib header.
+                self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+        while chunk:
+            yield self._zlib.decompress(chunk, STREAM_CHUNK_SIZE)
+            chunk = self._zlib.unconsumed_tail
+
+
+# BeautifulSoup tree builders in order of preference. lxml is an optional,
+# much faster C parser; html.parser ships with Python and is always present.
+HTML_PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def available_html_parsers() -> list[str]:
+    """Return the supported parser backends installed in this environment."""
+    from bs4.builder import builder_registry
+
+    return [name for name in HTML_PARSER_BACKENDS if builder_registry.lookup(name)]
+
+
+def set_html_parser(name: Optional[str] = None) -> str:
+    """Select the HTML parser backend; ``None`` picks the fastest installed."""
+    global _html_parser
+    from bs4.builder import builder_registry
+
+    if name is None:
+        _html_parser = available_html_parsers()[0]
+    elif name not in HTML_PARSER_BACKENDS:
+        raise ValueError(f"Unsupported HTML parser backend: {name}")
+    elif not builder_registry.lookup(name):
+        raise ValueError(f"HTML parser backend {name} is not installed")
+    else:
+        _html_parser = name
+    return _html_parser
+
+
+# Resolved in an executor during entry setup, or by the first parse otherwise.
+_html_parser: Optional[str] = None
+
+
+def _make_soup(markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    from bs4 import BeautifulSoup
+
+    parser = _html_parser or set_html_parser()
+    return BeautifulSoup(markup, parser, parse_only=parse_only)
+
+
+async def _run_blocking(func: Callable[..., _T], *args: Any) -> _T:
+    """Run CPU-bound parsing in the loop's default executor."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def _rebase_url(url: str, base_url: str) -> str:
+    """Move a portal URL onto ``base_url`` (scheme, host and optional prefix)."""
+    return base_url.rstrip("/") + urlsplit(url).path
+
+
+def _host_only_cookies(jar: aiohttp.abc.AbstractCookieJar) -> frozenset[tuple[str, str]]:
+    """``(host, name)`` of the cookies in ``jar`` that were set without a Domain."""
+    # Newer aiohttp exposes these as ``host_only_cookies`` (keyed by domain,
+    # path and name); older releases only keep the private set.
+    keys = getattr(jar, "host_only_cookies", None)
+    if keys is None:
+        keys = getattr(jar, "_host_only_cookies", ())
+    return frozenset((key[0], key[-1]) for key in keys)
 
 
 class PgeScraperError(RuntimeError):
     """Domain-specific exception raised by PgeScraper."""
 
+    # Failure class used to pick a retry policy; see the subclasses below.
+    kind = "unknown"
 
-@dataclass
+
+class PgeSessionExpiredError(PgeScraperError):
+    """Raised when the portal answers with the login form instead of data."""
+
+    kind = "session"
+
+
+class PgeNetworkError(PgeScraperError):
+    """The portal could not be reached or answered with an HTTP error."""
+
+    kind = "network"
+
+
+class PgeAuthError(PgeScraperError):
+    """The portal rejected the credentials or dropped the fresh session."""
+
+    kind = "auth"
+
+
+class PgeVerificationRequiredError(PgeScraperError):
+    """The portal asks for a verification step that only a browser can do."""
+
+    kind = "verification"
+
+
+class PgeLayoutChangedError(PgeScraperError):
+    """The portal answered, but its pages no longer look as expected."""
+
+    kind = "layout"
+
+
+@dataclass(frozen=True)
 class BalanceInfo:
     """Represents a single outstanding payment entry."""
 
@@ -26,10 +230,354 @@ class BalanceInfo:
     due_date: Optional[date] = None
     invoice_number: Optional[str] = None
     issue_date: Optional[date] = None
+    # Contract id on accounts with several contracts, otherwise None.
+    contract: Optional[str] = None
+
+
+class Contract(NamedTuple):
+    """A contract or delivery point (PPE) selectable under one login."""
+
+    id: str
+    label: str
+
+
+# Dates are kept as proleptic Gregorian ordinals; 0 marks a missing date.
+_NO_DATE = 0
+_UNDATED_LAST = date.max.toordinal() + 1
+
+
+@functools.lru_cache(maxsize=4096)
+def _date_from_ordinal(ordinal: int) -> date:
+    return date.fromordinal(ordinal)
+
+
+class InvoiceTable:
+    """Invoices stored column-wise: amounts in grosze, dates as ordinals.
+
+    Rows live in parallel ``array`` columns instead of one object each.
+    Sorting and filtering return views sharing those columns through an index
+    array, aggregates run over the integer columns, and ``BalanceInfo``
+    objects are only built when rows are iterated.
+    """
+
+    __slots__ = ("_amounts", "_due", "_issued", "_numbers", "_contracts", "_index")
+
+    def __init__(self) -> None:
+        self._amounts = array("q")
+        self._due = array("i")
+        self._issued = array("i")
+        self._numbers: list[Optional[str]] = []
+        self._contracts: list[Optional[str]] = []
+        self._index: Optional[array] = None
+
+    @classmethod
+    def from_balances(cls, balances: Iterable[BalanceInfo]) -> InvoiceTable:
+        table = cls()
+        for item in balances:
+            table.append(
+                round(item.amount * 100),
+                item.due_date.toordinal() if item.due_date else _NO_DATE,
+                item.issue_date.toordinal() if item.issue_date else _NO_DATE,
+                item.invoice_number,
+                item.contract,
+            )
+        return table
+
+    def append(
+        self,
+        amount_grosze: int,
+        due: int = _NO_DATE,
+        issued: int = _NO_DATE,
+        number: Optional[str] = None,
+        contract: Optional[str] = None,
+    ) -> None:
+        if self._index is not None:
+            raise TypeError("InvoiceTable views are read-only")
+        self._amounts.append(amount_grosze)
+        self._due.append(due)
+        self._issued.append(issued)
+        self._numbers.append(number)
+        self._contracts.append(contract)
+
+    def __len__(self) -> int:
+        return len(self._amounts) if self._index is None else len(self._index)
+
+    def __iter__(self) -> Iterator[BalanceInfo]:
+        return iter(self.rows())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, InvoiceTable):
+            return NotImplemented
+        return self.rows() == other.rows()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def rows(self) -> tuple[BalanceInfo, ...]:
+        amounts, due, issued, numbers = self._amounts, self._due, self._issued, self._numbers
+        contracts = self._contracts
+        to_date = _date_from_ordinal
+        return tuple(
+            BalanceInfo(
+                amounts[i] / 100,
+                to_date(due[i]) if due[i] else None,
+                numbers[i],
+                to_date(issued[i]) if issued[i] else None,
+                contracts[i],
+            )
+            for i in self._positions()
+        )
+
+    def tagged(self, contract: str) -> InvoiceTable:
+        """View whose rows all belong to ``contract``; other columns are shared."""
+        view = self._view(self._positions())
+        view._contracts = [contract] * len(self._amounts)
+        return view
+
+    def identified(self) -> InvoiceTable:
+        """View of the rows carrying an invoice number or a due date."""
+        numbers, due = self._numbers, self._due
+        return self._view(i for i in self._positions() if numbers[i] or due[i])
+
+    def due_before(self, day: date) -> InvoiceTable:
+        """View of the dated rows due before ``day``."""
+        limit, due = day.toordinal(), self._due
+        return self._view(i for i in self._positions() if _NO_DATE < due[i] < limit)
+
+    def sorted_by_due(self) -> InvoiceTable:
+        """View ordered by due date, undated rows last; ties keep their order."""
+        due = self._due
+        return self._view(
+            sorted(self._positions(), key=lambda i: due[i] or _UNDATED_LAST)
+        )
+
+    def largest(self) -> InvoiceTable:
+        """One-row view of the highest amount (the first on ties), empty if none."""
+        amounts = self._amounts
+        position = max(self._positions(), key=amounts.__getitem__, default=None)
+        return self._view(() if position is None else (position,))
+
+    def total_grosze(self) -> int:
+        if self._index is None:
+            return sum(self._amounts)
+        amounts = self._amounts
+        return sum(amounts[i] for i in self._index)
+
+    def earliest_due_date(self) -> Optional[date]:
+        due = self._due
+        ordinal = min((due[i] for i in self._positions() if due[i]), default=_NO_DATE)
+        return _date_from_ordinal(ordinal) if ordinal else None
+
+    def latest_issue_date(self) -> Optional[date]:
+        issued = self._issued
+        ordinal = max(issued[i] for i in self._positions()) if len(self) else _NO_DATE
+        return _date_from_ordinal(ordinal) if ordinal else None
+
+    def _positions(self) -> Iterable[int]:
+        return range(len(self._amounts)) if self._index is None else self._index
+
+    def _view(self, positions: Iterable[int]) -> InvoiceTable:
+        view = InvoiceTable.__new__(InvoiceTable)
+        view._amounts = self._amounts
+        view._due = self._due
+        view._issued = self._issued
+        view._numbers = self._numbers
+        view._contracts = self._contracts
+        view._index = array("q", positions)
+        return view
+
+
+class BalanceSnapshot(NamedTuple):
+    """Immutable view of every outstanding invoice from a single refresh.
+
+    Aggregates are computed once in :meth:`from_table` over the integer
+    columns; consumers only read fields. Invoices are ordered by due date,
+    undated ones last. On accounts with several contracts the fields cover
+    all of them and ``contracts`` holds a snapshot per contract, which
+    ``by_contract`` maps by contract id (empty for single accounts).
+    """
+
+    invoices: tuple[BalanceInfo, ...]
+    total: float
+    count: int
+    earliest_due_date: Optional[date]
+    overdue_amount: float
+    overdue_count: int
+    largest: Optional[BalanceInfo]
+    latest_issue_date: Optional[date]
+    fetched_at: datetime
+    contracts: tuple[tuple[Contract, BalanceSnapshot], ...] = ()
+    by_contract: Mapping[str, BalanceSnapshot] = MappingProxyType({})
+
+    @classmethod
+    def from_balances(
+        cls,
+        balances: list[BalanceInfo],
+        fetched_at: datetime,
+        contracts: Iterable[Contract] = (),
+    ) -> BalanceSnapshot:
+        contracts = tuple(contracts)
+        if not contracts:
+            return cls.from_table(InvoiceTable.from_balances(balances), fetched_at)
+        parts = [
+            (
+                contract,
+                cls.from_table(
+                    InvoiceTable.from_balances(
+                        item for item in balances if item.contract == contract.id
+                    ),
+                    fetched_at,
+                ),
+            )
+            for contract in contracts
+        ]
+        return cls.combine(parts, fetched_at)
+
+    @classmethod
+    def from_table(cls, table: InvoiceTable, fetched_at: datetime) -> BalanceSnapshot:
+        rows = table.identified()
+        if not rows:
+            # Only summary labels were found; they repeat one total, not add up.
+            rows = table.largest()
+        return cls._aggregate(rows, fetched_at)
+
+    @classmethod
+    def combine(
+        cls, parts: Iterable[tuple[Contract, BalanceSnapshot]], fetched_at: datetime
+    ) -> BalanceSnapshot:
+        """Account-wide snapshot over the per-contract snapshots ``parts``."""
+        parts = tuple(parts)
+        table = InvoiceTable.from_balances(
+            item for _, part in parts for item in part.invoices
+        )
+        return cls._aggregate(table, fetched_at, parts)
+
+    @classmethod
+    def _aggregate(
+        cls,
+        rows: InvoiceTable,
+        fetched_at: datetime,
+        contracts: tuple[tuple[Contract, BalanceSnapshot], ...] = (),
+    ) -> BalanceSnapshot:
+        largest = rows.largest()
+        rows = rows.sorted_by_due()
+        overdue = rows.due_before(fetched_at.date())
+        return cls(
+            invoices=rows.rows(),
+            total=rows.total_grosze() / 100,
+            count=len(rows),
+            earliest_due_date=rows.earliest_due_date(),
+            overdue_amount=overdue.total_grosze() / 100,
+            overdue_count=len(overdue),
+            largest=next(iter(largest), None),
+            latest_issue_date=rows.latest_issue_date(),
+            fetched_at=fetched_at,
+            contracts=contracts,
+            by_contract=MappingProxyType(
+                {contract.id: part for contract, part in contracts}
+            ),
+        )
+
+
+@dataclass
+class _FinanceAnalysis:
+    """Result of a single parse of a finance document."""
+
+    invoices: InvoiceTable
+    no_outstanding: bool = False
+
+
+class _PayloadTooLargeError(Exception):
+    """A response body exceeded the configured size limit."""
+
+
+@dataclass
+class PhaseStats:
+    """Wall time, request count and response body bytes of one scraper phase.
+
+    ``bytes`` counts decoded bodies, ``wire_bytes`` what was transferred
+    before content decoding (the same when the response was not compressed).
+    """
+
+    seconds: float = 0.0
+    requests: int = 0
+    bytes: int = 0
+    wire_bytes: int = 0
+
+
+class ScrapeMetrics:
+    """Per-phase statistics of the most recent scraper call.
+
+    Pass an instance to ``PgeScraper`` to enable collection; without one the
+    scraper uses a shared no-op recorder.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.phases: dict[str, PhaseStats] = {}
+
+    def reset(self) -> None:
+        self.phases = {}
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        self.phases.setdefault(phase, PhaseStats()).seconds += seconds
+
+    def record_request(self, phase: str, size: int, wire_size: Optional[int] = None) -> None:
+        stats = self.phases.setdefault(phase, PhaseStats())
+        stats.requests += 1
+        stats.bytes += size
+        stats.wire_bytes += size if wire_size is None else wire_size
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """Return the phases plus a ``total`` row, e.g. for JSON output."""
+        result = {name: asdict(stats) for name, stats in self.phases.items()}
+        result["total"] = {
+            "seconds": sum(stats.seconds for stats in self.phases.values()),
+            "requests": sum(stats.requests for stats in self.phases.values()),
+            "bytes": sum(stats.bytes for stats in self.phases.values()),
+            "wire_bytes": sum(stats.wire_bytes for stats in self.phases.values()),
+        }
+        return result
+
+
+class _DisabledMetrics(ScrapeMetrics):
+    enabled = False
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        pass
+
+    def record_request(self, phase: str, size: int, wire_size: Optional[int] = None) -> None:
+        pass
+
+
+_NO_METRICS = _DisabledMetrics()
+
+
+class _PortalResponse(NamedTuple):
+    """Fully read portal response detached from the aiohttp connection."""
+
+    url: str
+    status: int
+    text: str
 
 
 class PgeScraper:
-    """Scrapes outstanding payment data from the PGE Sensor portal."""
+    """Scrapes outstanding payment data from the PGE Sensor portal.
+
+    The scraper is asyncio-native and runs on an aiohttp client session owned
+    by the caller, so Home Assistant can share its connection pool instead of
+    parking a blocking request chain on an executor thread; only HTML parsing,
+    which is CPU-bound, runs in the loop's default executor. ``request_gate``
+    optionally wraps every HTTP request, e.g. to enforce a global rate limit.
+    With ``hedge_delay`` set, the finance fetch starts the next fallback
+    endpoint when the current one has not answered within that many seconds.
+    Finance pages are streamed, and bodies larger than ``max_finance_bytes``
+    are rejected before they are buffered in full. On a session created with
+    ``auto_decompress=False`` the scraper decodes bodies itself, so metrics
+    tell transferred and decoded bytes apart. When the dashboard lists several
+    contracts (delivery points), each one's finance page is fetched over the
+    same session, ``contract_concurrency`` at a time.
+    """
 
     LOGIN_URL = "https://ebok.gkpge.pl/ebok/profil/logowanie.xhtml"
     DASHBOARD_URL = "https://ebok.gkpge.pl/ebok/"
@@ -59,47 +607,277 @@ class PgeScraper:
     _ZERO_BALANCE_REGEX = re.compile(
         r"(saldo|do zap(?:\u0142|l)aty|kwota do zap(?:\u0142|l)aty)[^0-9]{0,80}(0[,\.]00)"
     )
+    # Per-request tokens that change on every response without the finance
+    # data changing; stripped before fingerprinting a payload.
+    _VOLATILE_TOKEN_REGEX = re.compile(
+        r"<update[^>]*javax\.faces\.ViewState[^>]*>.*?</update>"
+        r"|<input[^>]*javax\.faces\.ViewState[^>]*>"
+        r"|;jsessionid=[\w.\-]+"
+        r"|\snonce=\"[^\"]*\"",
+        re.IGNORECASE | re.DOTALL,
+    )
+    # Contract / delivery point switcher on the dashboard of business accounts
+    # and the query parameter selecting a contract on the finance page.
+    _CONTRACT_SELECTOR = (
+        'select[id*="umow" i] option[value], select[id*="ppe" i] option[value]'
+    )
+    _CONTRACT_PARAM = "umowa"
 
-    def __init__(self, username: str, password: str, *, timeout: int = 15) -> None:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        session: aiohttp.ClientSession,
+        *,
+        timeout: int = 15,
+        request_gate: Optional[Callable[[], AsyncContextManager[None]]] = None,
+        hedge_delay: Optional[float] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+        base_url: Optional[str] = None,
+        max_finance_bytes: int = DEFAULT_MAX_FINANCE_BYTES,
+        contract_concurrency: int = DEFAULT_CONTRACT_CONCURRENCY,
+    ) -> None:
         if not username or not password:
             raise ValueError("Username and password must be provided")
+        if base_url:
+            # Point every portal URL at another host, e.g. a local test portal.
+            self.LOGIN_URL = _rebase_url(self.LOGIN_URL, base_url)
+            self.DASHBOARD_URL = _rebase_url(self.DASHBOARD_URL, base_url)
+            self.INDEX_URL = _rebase_url(self.INDEX_URL, base_url)
+            self.FINANCE_URL = _rebase_url(self.FINANCE_URL, base_url)
+            self.FINANCE_FALLBACK_URLS = tuple(
+                _rebase_url(url, base_url) for url in self.FINANCE_FALLBACK_URLS
+            )
         self._username = username
         self._password = password
-        self._timeout = timeout
-        self._session = requests.Session()
-        default_headers = {
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = session
+        self._request_gate = request_gate
+        self._hedge_delay = hedge_delay
+        self._max_finance_bytes = max_finance_bytes
+        self._contract_concurrency = max(1, contract_concurrency)
+        self._metrics = metrics if metrics is not None else _NO_METRICS
+        self._phase = "other"
+        self._preferred_finance_url = self.FINANCE_URL
+        self._headers = {
             "User-Agent": self.USER_AGENT,
             "Accept": (
                 "text/html,application/xhtml+xml,application/xml;q=0.9,"
                 "image/avif,image/webp,*/*;q=0.8"
             ),
             "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
+            "Accept-Encoding": accepted_encodings(),
         }
-        for header, value in default_headers.items():
-            self._session.headers.setdefault(header, value)
+        # Sessions that leave decompression to us report transferred bytes.
+        self._decode_bodies = not getattr(session, "auto_decompress", True)
         self._authenticated = False
+        # None until the dashboard was seen; empty for single-contract accounts.
+        self._contracts: Optional[tuple[Contract, ...]] = None
+        self._contract_switch_warned = False
+        # Last fingerprint and analysis per contract id (None: the only view).
+        self._parse_cache: dict[Optional[str], tuple[str, _FinanceAnalysis]] = {}
+        self._parse_cache_hits = 0
+        self._parse_cache_misses = 0
 
-    def get_balance_details(self) -> BalanceInfo:
+    async def get_balance_details(self) -> BalanceInfo:
         """Return the highest outstanding payment along with its due date."""
-        if not self._authenticated:
-            self._login()
-        payload = self._fetch_finance_payload()
-        balances = self._extract_balance_info(payload)
-        if not balances:
-            if self._has_no_outstanding_hint(payload):
-                _LOGGER.debug("No outstanding payments detected for %s", self._username)
-                return BalanceInfo(amount=0.0)
-            raise PgeScraperError("Could not find any outstanding payments in response")
-        return max(balances, key=lambda item: item.amount)
+        snapshot = await self.get_snapshot()
+        return snapshot.largest or BalanceInfo(amount=0.0)
+
+    async def get_snapshot(self, now: Optional[datetime] = None) -> BalanceSnapshot:
+        """Return every outstanding invoice with aggregates as of ``now``.
+
+        On accounts with several contracts the snapshot covers all of them
+        and carries a snapshot per contract (see ``BalanceSnapshot.by_contract``).
+        """
+        self._metrics.reset()
+        fresh_login = not self._authenticated
+        if fresh_login:
+            await self._login()
+        try:
+            payloads = await self._fetch_finance_payloads()
+        except PgeSessionExpiredError:
+            if fresh_login:
+                raise
+            _LOGGER.debug("Portal session for %s expired, logging in again", self._username)
+            self._reset_session()
+            await self._login()
+            payloads = await self._fetch_finance_payloads()
+        fetched_at = now or datetime.now().astimezone()
+        with self._timed_phase("parse"):
+            return await _run_blocking(self._snapshot_from_payloads, payloads, fetched_at)
+
+    @property
+    def contracts(self) -> tuple[Contract, ...]:
+        """Contracts found on the dashboard; empty for single-contract accounts."""
+        return self._contracts or ()
+
+    @property
+    def metrics(self) -> ScrapeMetrics:
+        """Per-phase statistics of the last call (no-op unless enabled)."""
+        return self._metrics
+
+    @property
+    def parse_cache_stats(self) -> dict[str, int]:
+        """Hit/miss counters of the finance payload fingerprint cache."""
+        return {"hits": self._parse_cache_hits, "misses": self._parse_cache_misses}
+
+    def export_session(self) -> dict[str, Any]:
+        """Return a JSON-serialisable snapshot of the authenticated session.
+
+        Host-only cookies keep their host in ``domain`` and are flagged with
+        ``host_only``, so they are not widened to the host's subdomains.
+        """
+        jar = self._session.cookie_jar
+        host_only = _host_only_cookies(jar)
+        cookies = [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "host_only": (morsel["domain"], morsel.key) in host_only,
+                "path": morsel["path"] or "/",
+                "secure": bool(morsel["secure"]),
+                "httponly": bool(morsel["httponly"]),
+                "expires": morsel["expires"] or None,
+            }
+            for morsel in jar
+        ]
+        return {
+            "username": self._username,
+            "authenticated": self._authenticated,
+            "cookies": cookies,
+            "contracts": (
+                None if self._contracts is None else [list(item) for item in self._contracts]
+            ),
+        }
+
+    def restore_session(self, state: Optional[Mapping[str, Any]]) -> bool:
+        """Load cookies saved by export_session; return True when usable.
+
+        A restored session is trusted until the next finance request. If the
+        portal answers that request with its login form, get_balance_details
+        logs in again and retries once, so a stale cache costs one extra login.
+        """
+        if not state or state.get("username") != self._username:
+            return False
+        if not state.get("authenticated"):
+            return False
+        portal_url = URL(self.DASHBOARD_URL)
+        restored = 0
+        for item in state.get("cookies") or ():
+            cookie: SimpleCookie = SimpleCookie()
+            cookie[item["name"]] = item["value"]
+            morsel = cookie[item["name"]]
+            morsel["path"] = item.get("path") or "/"
+            for attribute in ("secure", "httponly", "expires"):
+                if item.get(attribute):
+                    morsel[attribute] = item[attribute]
+            url = portal_url
+            if item.get("host_only") and item.get("domain"):
+                # Without a Domain attribute the jar binds the cookie to the
+                # host of the URL it came from.
+                url = portal_url.with_host(item["domain"])
+            elif item.get("domain"):
+                morsel["domain"] = item["domain"]
+            self._session.cookie_jar.update_cookies(cookie, url)
+            restored += 1
+        if not restored:
+            return False
+        contracts = state.get("contracts")
+        if contracts is not None:
+            self._contracts = tuple(Contract(*item) for item in contracts)
+        self._authenticated = True
+        return True
 
     # ---------------------------------------------------------------------
     # Internal helpers
     # ---------------------------------------------------------------------
 
-    def _login(self) -> None:
-        view_state = self._fetch_view_state()
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[Mapping[str, str]] = None,
+        data: Optional[Mapping[str, str]] = None,
+        params: Optional[Mapping[str, str]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> _PortalResponse:
+        request_headers = dict(self._headers)
+        if headers:
+            request_headers.update(headers)
+        phase = self._phase
+        gate = self._request_gate() if self._request_gate else contextlib.nullcontext()
+        async with gate, self._session.request(
+            method,
+            url,
+            data=data,
+            params=params,
+            headers=request_headers,
+            timeout=self._timeout,
+        ) as response:
+            text = await self._read_body(response, phase, max_bytes)
+            return _PortalResponse(str(response.url), response.status, text)
+
+    async def _read_body(
+        self,
+        response: aiohttp.ClientResponse,
+        phase: str,
+        max_bytes: Optional[int],
+    ) -> str:
+        if (
+            max_bytes is not None
+            and response.content_length is not None
+            and response.content_length > max_bytes
+        ):
+            self._metrics.record_request(phase, 0, 0)
+            raise _PayloadTooLargeError(
+                f"body of {response.content_length} bytes exceeds {max_bytes} bytes"
+            )
+        body_decoder = None
+        if self._decode_bodies:
+            body_decoder = _ContentDecoder(response.headers.get("Content-Encoding", ""))
+        try:
+            text_decoder = codecs.getincrementaldecoder(response.charset or "utf-8")("replace")
+        except LookupError:
+            text_decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        parts: list[str] = []
+        size = 0
+        wire_size = 0
+        try:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                wire_size += len(chunk)
+                pieces = body_decoder.decode(chunk) if body_decoder is not None else (chunk,)
+                for piece in pieces:
+                    size += len(piece)
+                    if max_bytes is not None and size > max_bytes:
+                        raise _PayloadTooLargeError(f"body exceeds {max_bytes} bytes")
+                    parts.append(text_decoder.decode(piece))
+            tail = body_decoder.flush() if body_decoder is not None else b""
+            size += len(tail)
+            parts.append(text_decoder.decode(tail, final=True))
+        finally:
+            self._metrics.record_request(
+                phase, size, wire_size if body_decoder is not None else None
+            )
+        return "".join(parts)
+
+    @contextlib.contextmanager
+    def _timed_phase(self, phase: str) -> Iterator[None]:
+        self._phase = phase
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._phase = "other"
+            self._metrics.record_phase(phase, elapsed)
+            _LOGGER.debug("%s phase for %s took %.3f s", phase, self._username, elapsed)
+
+    async def _login(self) -> None:
+        with self._timed_phase("view_state"):
+            view_state = await self._fetch_view_state()
         payload = {
             "hiddenLoginForm": "hiddenLoginForm",
             "hiddenLoginForm:hiddenLogin": self._username,
@@ -108,129 +886,399 @@ class PgeScraper:
             "javax.faces.ViewState": view_state,
         }
         try:
-            response = self._session.post(
-                self.LOGIN_URL,
-                data=payload,
-                headers={"Referer": self.LOGIN_URL},
-                timeout=self._timeout,
-            )
-            response.raise_for_status()
-        except requests.RequestException as exc:
-            raise PgeScraperError("Login request failed") from exc
+            with self._timed_phase("login"):
+                response = await self._request(
+                    "POST",
+                    self.LOGIN_URL,
+                    data=payload,
+                    headers={"Referer": self.LOGIN_URL},
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise PgeNetworkError("Login request failed") from exc
+        if response.status >= 400:
+            raise PgeNetworkError(f"Login request failed with HTTP {response.status}")
         if self._is_login_response(response):
-            raise PgeScraperError(
+            raise PgeAuthError(
                 "Login failed: incorrect credentials or additional verification required"
             )
-        if "weryfikacja" in (response.url or "").lower():
-            raise PgeScraperError(
+        if "weryfikacja" in response.url.lower():
+            raise PgeVerificationRequiredError(
                 "Portal requires additional verification. Complete it in the browser first."
             )
-        self._post_login_warmup()
+        with self._timed_phase("warmup"):
+            await self._post_login_warmup()
         self._authenticated = True
 
-    def _fetch_view_state(self) -> str:
+    def _reset_session(self) -> None:
+        self._session.cookie_jar.clear()
+        self._authenticated = False
+
+    async def _fetch_view_state(self) -> str:
         try:
-            response = self._session.get(self.LOGIN_URL, timeout=self._timeout)
-            response.raise_for_status()
-        except requests.RequestException as exc:
-            raise PgeScraperError("Unable to load login form") from exc
-        soup = BeautifulSoup(response.text, "html.parser")
+            response = await self._request("GET", self.LOGIN_URL)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise PgeNetworkError("Unable to load login form") from exc
+        if response.status >= 400:
+            raise PgeNetworkError(f"Unable to load login form: HTTP {response.status}")
+        return await _run_blocking(self._view_state_from_form, response.text)
+
+    @staticmethod
+    def _view_state_from_form(html: str) -> str:
+        from bs4 import SoupStrainer
+
+        soup = _make_soup(html, parse_only=SoupStrainer("input"))
         view_state = soup.find("input", attrs={"name": "javax.faces.ViewState"})
         if not view_state or not view_state.get("value"):
-            raise PgeScraperError("Missing javax.faces.ViewState token on login page")
+            raise PgeLayoutChangedError("Missing javax.faces.ViewState token on login page")
         return view_state["value"]
 
     @staticmethod
-    def _is_login_response(response: requests.Response) -> bool:
-        url = (response.url or "").lower()
+    def _is_login_response(response: _PortalResponse) -> bool:
+        url = response.url.lower()
         if "logowanie" in url:
             return True
         return "hiddenLoginForm:hiddenLogin" in response.text
 
-    def _post_login_warmup(self) -> None:
-        for url in (self.DASHBOARD_URL, self.INDEX_URL):
-            try:
-                resp = self._session.get(url, timeout=self._timeout)
-                _LOGGER.debug("Warmup GET %s -> %s", url, resp.status_code)
-            except requests.RequestException as exc:
-                _LOGGER.debug("Warmup GET %s failed: %s", url, exc)
+    async def _post_login_warmup(self) -> None:
+        responses = await asyncio.gather(
+            self._warmup_get(self.DASHBOARD_URL), self._warmup_get(self.INDEX_URL)
+        )
+        if any(resp and self._is_login_response(resp) for resp in responses):
+            raise PgeAuthError(
+                "Login failed: portal did not keep the session after signing in"
+            )
+        dashboard = responses[0]
+        if dashboard is not None and dashboard.status < 400:
+            self._contracts = await _run_blocking(self._discover_contracts, dashboard.text)
+
+    async def _known_contracts(self) -> tuple[Contract, ...]:
+        if self._contracts is None:
+            # A restored session that never saw the dashboard.
+            with self._timed_phase("warmup"):
+                dashboard = await self._warmup_get(self.DASHBOARD_URL)
+            if dashboard is None or dashboard.status >= 400:
+                return ()
+            if self._is_login_response(dashboard):
+                raise PgeSessionExpiredError(
+                    "Portal session expired: dashboard redirected to login"
+                )
+            self._contracts = await _run_blocking(self._discover_contracts, dashboard.text)
+        return self._contracts
+
+    @classmethod
+    def _discover_contracts(cls, html: str) -> tuple[Contract, ...]:
+        from bs4 import SoupStrainer
+
+        soup = _make_soup(html, parse_only=SoupStrainer("select"))
+        contracts: dict[str, Contract] = {}
+        for option in soup.select(cls._CONTRACT_SELECTOR):
+            value = option.get("value", "").strip()
+            if value and value not in contracts:
+                contracts[value] = Contract(value, option.get_text(" ", strip=True) or value)
+        # A switcher with a single entry is the plain one-view account.
+        return tuple(contracts.values()) if len(contracts) > 1 else ()
+
+    async def _warmup_get(self, url: str) -> Optional[_PortalResponse]:
+        try:
+            resp = await self._request("GET", url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            _LOGGER.debug("Warmup GET %s failed: %s", url, exc)
+            return None
+        _LOGGER.debug("Warmup GET %s -> %s", url, resp.status)
+        return resp
+
+    async def _fetch_finance_payloads(self) -> list[tuple[Optional[Contract], str]]:
+        contracts = await self._known_contracts()
+        with self._timed_phase("finance"):
+            if not contracts:
+                return [(None, await self._fetch_finance_payload())]
+            slots = asyncio.Semaphore(self._contract_concurrency)
+
+            async def _fetch(contract: Contract) -> str:
+                async with slots:
+                    return await self._fetch_finance_payload(contract)
 
-    def _fetch_finance_payload(self) -> str:
+            # Let every fetch settle so a failure leaves no request running.
+            results = await asyncio.gather(
+                *(_fetch(contract) for contract in contracts), return_exceptions=True
+            )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return list(zip(contracts, results))
+
+    async def _fetch_finance_payload(self, contract: Optional[Contract] = None) -> str:
         errors: list[str] = []
-        headers = {"Referer": self.INDEX_URL}
-        for url in self.FINANCE_FALLBACK_URLS:
-            try:
-                response = self._session.get(url, timeout=self._timeout, headers=headers)
-                response.raise_for_status()
-                if url != self.FINANCE_URL:
-                    _LOGGER.debug("Using fallback finance endpoint %s", url)
-                return response.text
-            except requests.HTTPError as exc:
-                status = exc.response.status_code if exc.response else "?"
-                snippet = exc.response.text[:160].strip() if exc.response else ""
-                errors.append(f"{url} -> {status}: {snippet}")
-            except requests.RequestException as exc:
-                errors.append(f"{url} -> network error: {exc}")
-        raise PgeScraperError(
-            "Unable to retrieve finance data: " + "; ".join(errors)
+        params = None if contract is None else {self._CONTRACT_PARAM: contract.id}
+        urls = [self._preferred_finance_url]
+        urls.extend(url for url in self.FINANCE_FALLBACK_URLS if url not in urls)
+        if self._hedge_delay is None:
+            for url in urls:
+                result = await self._fetch_finance_url(url, errors, params)
+                if result is not None:
+                    break
+        else:
+            result = await self._fetch_finance_hedged(urls, errors, params)
+        if result is not None:
+            url, payload = result
+            if url != self.FINANCE_URL:
+                _LOGGER.debug("Using fallback finance endpoint %s", url)
+            self._preferred_finance_url = url
+            return payload
+        target = "" if contract is None else f" of contract {contract.id}"
+        raise PgeNetworkError(
+            f"Unable to retrieve finance data{target}: " + "; ".join(errors)
         )
 
+    async def _fetch_finance_hedged(
+        self,
+        urls: list[str],
+        errors: list[str],
+        params: Optional[Mapping[str, str]] = None,
+    ) -> Optional[tuple[str, str]]:
+        tasks: list[asyncio.Task[Optional[tuple[str, str]]]] = []
+        try:
+            for index, url in enumerate(urls):
+                tasks.append(
+                    asyncio.create_task(self._fetch_finance_url(url, errors, params))
+                )
+                last = index == len(urls) - 1
+                result = await self._first_result(
+                    tasks, None if last else self._hedge_delay
+                )
+                if result is not None:
+                    return result
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark as retrieved; losers are ignored
+
+    @staticmethod
+    async def _first_result(
+        tasks: list[asyncio.Task[Optional[tuple[str, str]]]], timeout: Optional[float]
+    ) -> Optional[tuple[str, str]]:
+        """Wait for the first successful task; None on timeout or if all failed."""
+        pending = {task for task in tasks if not task.done()}
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                return None
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    return result
+        return None
+
+    async def _fetch_finance_url(
+        self, url: str, errors: list[str], params: Optional[Mapping[str, str]] = None
+    ) -> Optional[tuple[str, str]]:
+        try:
+            response = await self._request(
+                "GET",
+                url,
+                headers={"Referer": self.INDEX_URL},
+                params=params,
+                max_bytes=self._max_finance_bytes,
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            errors.append(f"{url} -> network error: {exc!r}")
+            return None
+        except _PayloadTooLargeError as exc:
+            errors.append(f"{url} -> {exc}")
+            return None
+        if response.status >= 400:
+            snippet = response.text[:160].strip()
+            errors.append(f"{url} -> {response.status}: {snippet}")
+            return None
+        if self._is_login_response(response):
+            raise PgeSessionExpiredError(
+                "Portal session expired: finance page redirected to login"
+            )
+        return url, response.text
+
     # ------------------------------------------------------------------
     # Parsing helpers
     # ------------------------------------------------------------------
 
+    def _snapshot_from_payloads(
+        self, payloads: list[tuple[Optional[Contract], str]], fetched_at: datetime
+    ) -> BalanceSnapshot:
+        # Runs in an executor thread, one job per refresh, so the parse cache
+        # is never touched by two threads at once.
+        if payloads[0][0] is None:
+            return self._snapshot_from_payload(payloads[0][1], None, fetched_at)
+        fingerprints = [self._fingerprint_payload(payload) for _, payload in payloads]
+        if len(set(fingerprints)) == 1:
+            # Every contract got the same page, so the portal did not switch
+            # contracts; summing the pages would count one account N times.
+            if not self._contract_switch_warned:
+                self._contract_switch_warned = True
+                _LOGGER.warning(
+                    "Finance pages of the %d contracts of %s are identical, "
+                    "reading them as one account",
+                    len(payloads),
+                    self._username,
+                )
+            return self._snapshot_from_payload(
+                payloads[0][1], None, fetched_at, fingerprints[0]
+            )
+        parts = []
+        seen: set[str] = set()
+        for (contract, payload), fingerprint in zip(payloads, fingerprints):
+            if fingerprint in seen:
+                _LOGGER.debug(
+                    "Contract %s got the finance page of another contract, counting it once",
+                    contract.id,
+                )
+                continue
+            seen.add(fingerprint)
+            snapshot = self._snapshot_from_payload(payload, contract, fetched_at, fingerprint)
+            parts.append((contract, snapshot))
+        return BalanceSnapshot.combine(parts, fetched_at)
+
+    def _snapshot_from_payload(
+        self,
+        raw_payload: str,
+        contract: Optional[Contract],
+        fetched_at: datetime,
+        fingerprint: Optional[str] = None,
+    ) -> BalanceSnapshot:
+        analysis = self._analyse_cached(
+            raw_payload, contract.id if contract else None, fingerprint
+        )
+        if not analysis.invoices:
+            if not analysis.no_outstanding:
+                raise PgeLayoutChangedError(
+                    "Could not find any outstanding payments in response"
+                )
+            _LOGGER.debug(
+                "No outstanding payments detected for %s%s",
+                self._username,
+                f" ({contract.id})" if contract else "",
+            )
+        invoices = analysis.invoices
+        if contract is not None:
+            invoices = invoices.tagged(contract.id)
+        return BalanceSnapshot.from_table(invoices, fetched_at)
+
+    def _analyse_cached(
+        self,
+        raw_payload: str,
+        contract_id: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ) -> _FinanceAnalysis:
+        fingerprint = fingerprint or self._fingerprint_payload(raw_payload)
+        cached = self._parse_cache.get(contract_id)
+        if cached is not None and cached[0] == fingerprint:
+            self._parse_cache_hits += 1
+            _LOGGER.debug("Finance payload unchanged (%s), reusing parsed data", fingerprint)
+            return cached[1]
+        self._parse_cache_misses += 1
+        analysis = self._analyse_finance_payload(raw_payload)
+        self._parse_cache[contract_id] = (fingerprint, analysis)
+        return analysis
+
     @classmethod
-    def _extract_balance_info(cls, raw_payload: str) -> list[BalanceInfo]:
+    def _fingerprint_payload(cls, raw_payload: str) -> str:
+        stable = cls._VOLATILE_TOKEN_REGEX.sub("", raw_payload)
+        digest = hashlib.blake2b(
+            stable.encode("utf-8", "surrogatepass"), digest_size=16
+        )
+        return digest.hexdigest()
+
+    @classmethod
+    def _analyse_finance_payload(cls, raw_payload: str) -> _FinanceAnalysis:
+        """Parse a finance document once and collect everything we need.
+
+        Partial responses are read from their ``<update>`` fragments. When
+        those hold no invoices, the whole payload is parsed as HTML and also
+        searched for the no-outstanding message, as a table or message may
+        sit outside the fragments.
+        """
+        markup = cls._finance_markup(raw_payload)
+        soup = _make_soup(markup)
+        invoices = cls._extract_from_soup(soup)
+        from_fragments = markup is not raw_payload
+        if not invoices and from_fragments:
+            soup = _make_soup(raw_payload)
+            invoices = cls._extract_from_soup(soup)
+        if invoices:
+            return _FinanceAnalysis(invoices)
+        no_outstanding = cls._has_no_outstanding_hint(soup.get_text(" ")) or (
+            from_fragments and cls._has_no_outstanding_hint(raw_payload)
+        )
+        return _FinanceAnalysis(invoices, no_outstanding)
+
+    @classmethod
+    def _extract_balance_info(cls, raw_payload: str) -> InvoiceTable:
+        markup = cls._finance_markup(raw_payload)
+        invoices = cls._extract_from_html(markup)
+        if not invoices and markup is not raw_payload:
+            invoices = cls._extract_from_html(raw_payload)
+        return invoices
+
+    @classmethod
+    def _finance_markup(cls, raw_payload: str) -> str:
         snapshot = raw_payload.lstrip()
-        balances: list[BalanceInfo] = []
         if snapshot.startswith("<?xml") or "<partial-response" in snapshot[:200]:
             try:
-                balances.extend(cls._extract_from_partial(snapshot))
+                return cls._partial_fragments(snapshot)
             except PgeScraperError as err:
                 _LOGGER.debug(
                     "Partial-response parsing failed, falling back to HTML: %s", err
                 )
-        if not balances:
-            balances.extend(cls._extract_from_html(raw_payload))
-        return balances
+        return raw_payload
 
     @classmethod
-    def _has_no_outstanding_hint(cls, raw_payload: str) -> bool:
-        simplified = raw_payload.lower()
+    def _has_no_outstanding_hint(cls, text: str) -> bool:
+        simplified = " ".join(text.lower().split())
         if any(marker in simplified for marker in cls._NO_OUTSTANDING_HINTS):
             return True
         if "0,00" not in simplified and "0.00" not in simplified:
             return False
         return bool(cls._ZERO_BALANCE_REGEX.search(simplified))
 
-    @classmethod
-    def _extract_from_partial(cls, partial_xml: str) -> list[BalanceInfo]:
+    @staticmethod
+    def _partial_fragments(partial_xml: str) -> str:
+        import xml.etree.ElementTree as ET
+
         try:
             root = ET.fromstring(partial_xml)
         except ET.ParseError as exc:
-            raise PgeScraperError("Finance response is not valid XML") from exc
-        balances: list[BalanceInfo] = []
-        for update_node in root.findall(".//update"):
-            html_fragment = update_node.text or ""
-            balances.extend(cls._extract_from_html(html_fragment))
-        return balances
+            raise PgeLayoutChangedError("Finance response is not valid XML") from exc
+        return "\n".join(node.text or "" for node in root.iter("update"))
+
+    @classmethod
+    def _extract_from_partial(cls, partial_xml: str) -> InvoiceTable:
+        return cls._extract_from_html(cls._partial_fragments(partial_xml))
 
     @classmethod
-    def _extract_from_html(cls, html_payload: str) -> list[BalanceInfo]:
-        soup = BeautifulSoup(html_payload, "html.parser")
-        balances = cls._extract_from_invoice_tables(soup)
-        if not balances:
+    def _extract_from_html(cls, html_payload: str) -> InvoiceTable:
+        return cls._extract_from_soup(_make_soup(html_payload))
+
+    @classmethod
+    def _extract_from_soup(cls, soup: BeautifulSoup) -> InvoiceTable:
+        invoices = cls._extract_from_invoice_tables(soup)
+        if not invoices:
             for label in soup.select(
                 '[id*="amountToPay" i], .amount-to-pay, .do-zaplaty-label'
             ):
-                amount = cls._extract_amount_from_text(label.get_text(" ", strip=True))
+                amount = cls._amount_grosze(label.get_text(" ", strip=True))
                 if amount is not None:
-                    balances.append(BalanceInfo(amount=amount))
-        return balances
+                    invoices.append(amount)
+        return invoices
 
     @classmethod
-    def _extract_from_invoice_tables(cls, soup: BeautifulSoup) -> list[BalanceInfo]:
-        balances: list[BalanceInfo] = []
+    def _extract_from_invoice_tables(cls, soup: BeautifulSoup) -> InvoiceTable:
+        invoices = InvoiceTable()
         tables = []
         for thead in soup.select("thead[id*='fakturaDoZaplaty']"):
             table = thead.find_parent("table")
@@ -251,48 +1299,41 @@ class PgeScraper:
                 cells = row.find_all("td")
                 if len(cells) < 4:
                     continue
-                invoice_number = cells[0].get_text(" ", strip=True) or None
-                issue_date = cls._parse_date(cells[1].get_text(" ", strip=True))
-                due_date = cls._parse_date(cells[2].get_text(" ", strip=True))
-                amount = cls._extract_amount_from_text(
-                    cells[3].get_text(" ", strip=True)
-                )
+                amount = cls._amount_grosze(cells[3].get_text(" ", strip=True))
                 if amount is None:
                     continue
-                balances.append(
-                    BalanceInfo(
-                        amount=amount,
-                        due_date=due_date,
-                        invoice_number=invoice_number,
-                        issue_date=issue_date,
-                    )
+                invoices.append(
+                    amount,
+                    due=cls._date_ordinal(cells[2].get_text(" ", strip=True)),
+                    issued=cls._date_ordinal(cells[1].get_text(" ", strip=True)),
+                    number=cells[0].get_text(" ", strip=True) or None,
                 )
-        return balances
+        return invoices
 
+    # Cell texts repeat across rows and refreshes (due dates above all), so
+    # decoding is memoised; both caches are bounded.
     @staticmethod
-    def _parse_date(value: str) -> Optional[date]:
-        if not value:
-            return None
+    @functools.lru_cache(maxsize=4096)
+    def _date_ordinal(value: str) -> int:
+        """Decode ``DD.MM.YYYY`` to a date ordinal, 0 when it is not a date."""
+        day, _, rest = value.strip().partition(".")
+        month, _, year = rest.partition(".")
+        if not (day.isdigit() and month.isdigit() and year.isdigit() and len(year) == 4):
+            return _NO_DATE
         try:
-            return datetime.strptime(value.strip(), "%d.%m.%Y").date()
+            return date(int(year), int(month), int(day)).toordinal()
         except ValueError:
-            return None
+            return _NO_DATE
 
-    @classmethod
-    def _extract_amount_from_text(cls, text: str) -> Optional[float]:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _amount_grosze(text: str) -> Optional[int]:
+        """Decode the last amount in ``text`` to grosze."""
         if not text:
             return None
-        cleaned_text = text.replace("PLN", "").replace("zł", "")
-        matches = cls._AMOUNT_REGEX.findall(cleaned_text)
+        matches = PgeScraper._AMOUNT_REGEX.findall(text.replace("PLN", "").replace("zł", ""))
         if not matches:
             return None
-        numeric = matches[-1]
-        cleaned = (
-            numeric.replace("\xa0", "")
-            .replace(" ", "")
-            .replace(",", ".")
-        )
-        try:
-            return float(cleaned)
-        except ValueError:
-            return None
+        # Every match ends in a separator and two decimals, so its digits
+        # alone are the amount in grosze.
+        return int("".join(char for char in matches[-1] if char.isdigit()))
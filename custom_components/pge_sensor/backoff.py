@@ -0,0 +1,156 @@
+"""Failure backoff and circuit breaking for PGE Sensor refreshes."""
+from __future__ import annotations
+
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+DATA_BREAKERS = f"{DOMAIN}_breakers"
+# Retries wait between 100 % and 150 % of the policy delay, so installations
+# that failed together (portal maintenance) do not come back in lockstep.
+JITTER = 0.5
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """Retry schedule for one class of portal failures."""
+
+    initial: timedelta
+    maximum: timedelta
+    # Consecutive failures after which the breaker opens for ``cooldown``.
+    trip_after: int
+    cooldown: timedelta
+    factor: float = 2.0
+
+    def delay(self, failures: int) -> timedelta:
+        """Return the un-jittered delay after ``failures`` consecutive failures."""
+        if failures >= self.trip_after:
+            return self.cooldown
+        return min(self.maximum, self.initial * self.factor ** (failures - 1))
+
+
+# Keyed by ``PgeScraperError.kind``. Outages are retried fairly soon; failures
+# that need the user (credentials, browser verification) or a code change
+# (portal layout) open the breaker after one or a few attempts.
+POLICIES: dict[str, BackoffPolicy] = {
+    "network": BackoffPolicy(
+        timedelta(minutes=15), timedelta(hours=4), trip_after=6, cooldown=timedelta(hours=6)
+    ),
+    # The finance page asked for a login again right after signing in.
+    "session": BackoffPolicy(
+        timedelta(minutes=30), timedelta(hours=4), trip_after=4, cooldown=timedelta(hours=6)
+    ),
+    "unknown": BackoffPolicy(
+        timedelta(minutes=30), timedelta(hours=4), trip_after=5, cooldown=timedelta(hours=6)
+    ),
+    "layout": BackoffPolicy(
+        timedelta(hours=1), timedelta(hours=12), trip_after=3, cooldown=timedelta(hours=24)
+    ),
+    "auth": BackoffPolicy(
+        timedelta(hours=1), timedelta(hours=6), trip_after=2, cooldown=timedelta(hours=24)
+    ),
+    "verification": BackoffPolicy(
+        timedelta(hours=6), timedelta(hours=24), trip_after=1, cooldown=timedelta(hours=24)
+    ),
+}
+
+
+class CircuitBreaker:
+    """Counts consecutive refresh failures of one entry and pauses refreshes.
+
+    While open, the coordinator does not contact the portal at all. Once the
+    cool-down has passed a single attempt is let through; another failure
+    opens the breaker again, a success closes it.
+    """
+
+    def __init__(self, rng: random.Random | None = None) -> None:
+        self._rng = rng or random.Random()
+        self._failures = 0
+        self._kind: str | None = None
+        self._open_until: datetime | None = None
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    @property
+    def kind(self) -> str | None:
+        """Class of the most recent failure, ``None`` after a success."""
+        return self._kind
+
+    @property
+    def open_until(self) -> datetime | None:
+        return self._open_until
+
+    def is_open(self, now: datetime) -> bool:
+        if self._open_until is None:
+            return False
+        if now >= self._open_until:
+            self._open_until = None
+            return False
+        return True
+
+    def record_success(self) -> None:
+        self.reset()
+
+    def record_failure(
+        self, kind: str, now: datetime, floor: timedelta = timedelta(0)
+    ) -> timedelta:
+        """Count a failure and return the jittered delay before the next try.
+
+        ``floor`` is the earliest retry the caller's own limits allow (e.g. the
+        daily refresh budget); jitter is applied on top of it.
+        """
+        policy = POLICIES.get(kind, POLICIES["unknown"])
+        self._failures += 1
+        self._kind = kind
+        delay = max(policy.delay(self._failures), floor)
+        delay *= 1 + JITTER * self._rng.random()
+        if self._failures >= policy.trip_after:
+            self._open_until = now + delay
+            _LOGGER.warning(
+                "Pausing PGE portal refreshes until %s after %d consecutive %s failures",
+                self._open_until,
+                self._failures,
+                kind,
+            )
+        return delay
+
+    def reset(self) -> None:
+        """Close the breaker and forget past failures."""
+        self._failures = 0
+        self._kind = None
+        self._open_until = None
+
+
+def async_get_breaker(hass: HomeAssistant, entry_id: str) -> CircuitBreaker:
+    """Return the breaker of an entry.
+
+    Breakers outlive their coordinator, so setup retries and reloads cannot
+    be used to bypass an open breaker.
+    """
+    breakers: dict[str, CircuitBreaker] = hass.data.setdefault(DATA_BREAKERS, {})
+    breaker = breakers.get(entry_id)
+    if breaker is None:
+        breaker = breakers[entry_id] = CircuitBreaker()
+    return breaker
+
+
+def async_reset_breakers(hass: HomeAssistant, entry_id: str | None = None) -> None:
+    """Close the breaker of one entry, or of all entries."""
+    breakers: dict[str, CircuitBreaker] = hass.data.get(DATA_BREAKERS, {})
+    for key, breaker in breakers.items():
+        if entry_id is None or key == entry_id:
+            breaker.reset()
+
+
+def async_drop_breaker(hass: HomeAssistant, entry_id: str) -> None:
+    """Forget the breaker of a removed entry."""
+    breakers: dict[str, CircuitBreaker] = hass.data.get(DATA_BREAKERS, {})
+    breakers.pop(entry_id, None)
@@ -1,23 +1,48 @@
 """Config flow for the PGE Sensor integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
+from typing import Any
+
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.util import dt as dt_util
 
 from .api import PgeScraper, PgeScraperError
-from .const import DOMAIN
-
+from .backoff import async_reset_breakers
+from .const import (
+    CONF_DAILY_REFRESH_BUDGET,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_STALE_AFTER_HOURS,
+    DEFAULT_DAILY_REFRESH_BUDGET,
+    DEFAULT_STALE_AFTER_HOURS,
+    DOMAIN,
+)
+from .hub import async_get_hub
 
-async def _async_validate_credentials(hass: HomeAssistant, data: dict[str, str]) -> None:
-    def _validate() -> None:
-        scraper = PgeScraper(data[CONF_USERNAME], data[CONF_PASSWORD])
-        scraper.get_balance_details()
 
-    await hass.async_add_executor_job(_validate)
+async def _async_validate_credentials(
+    hass: HomeAssistant, data: dict[str, str], unique_id: str | None
+) -> None:
+    """Log in once and hand the session and first snapshot to the entry."""
+    hub = async_get_hub(hass)
+    session = hub.create_client()
+    try:
+        scraper = PgeScraper(
+            data[CONF_USERNAME],
+            data[CONF_PASSWORD],
+            session,
+            request_gate=hub.request_slot,
+        )
+        snapshot = await scraper.get_snapshot(dt_util.now())
+        if unique_id is not None:
+            hub.stash_validation(unique_id, scraper.export_session(), snapshot)
+    finally:
+        await session.close()
 
 
 class PgeEbokConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -25,13 +50,20 @@ class PgeEbokConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> PgeEbokOptionsFlow:
+        return PgeEbokOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input: dict[str, str] | None = None) -> FlowResult:
         errors: dict[str, str] = {}
         if user_input is not None:
             await self.async_set_unique_id(user_input[CONF_USERNAME].lower())
             self._abort_if_unique_id_configured()
             try:
-                await _async_validate_credentials(self.hass, user_input)
+                await _async_validate_credentials(self.hass, user_input, self.unique_id)
             except PgeScraperError:
                 errors["base"] = "invalid_auth"
             except Exception:
@@ -47,3 +79,69 @@ class PgeEbokConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
         return self.async_show_form(step_id="user", data_schema=data_schema, errors=errors)
+
+    async def async_step_reauth(self, _entry_data: Mapping[str, Any]) -> FlowResult:
+        """Ask for a new password after the portal kept rejecting the old one."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, str] | None = None
+    ) -> FlowResult:
+        entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        assert entry is not None
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            data = {**entry.data, CONF_PASSWORD: user_input[CONF_PASSWORD]}
+            try:
+                await _async_validate_credentials(self.hass, data, entry.unique_id)
+            except PgeScraperError:
+                errors["base"] = "invalid_auth"
+            except Exception:
+                errors["base"] = "unknown"
+            else:
+                async_reset_breakers(self.hass, entry.entry_id)
+                self.hass.config_entries.async_update_entry(entry, data=data)
+                await self.hass.config_entries.async_reload(entry.entry_id)
+                return self.async_abort(reason="reauth_successful")
+
+        data_schema = vol.Schema({vol.Required(CONF_PASSWORD): str})
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=data_schema,
+            description_placeholders={"username": entry.data[CONF_USERNAME]},
+            errors=errors,
+        )
+
+
+class PgeEbokOptionsFlow(config_entries.OptionsFlow):
+    """Handle PGE Sensor options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input: dict[str, int] | None = None) -> FlowResult:
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_DAILY_REFRESH_BUDGET,
+                    default=self._entry.options.get(
+                        CONF_DAILY_REFRESH_BUDGET, DEFAULT_DAILY_REFRESH_BUDGET
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=48)),
+                vol.Required(
+                    CONF_DIAGNOSTIC_SENSORS,
+                    default=self._entry.options.get(CONF_DIAGNOSTIC_SENSORS, False),
+                ): bool,
+                vol.Required(
+                    CONF_STALE_AFTER_HOURS,
+                    default=self._entry.options.get(
+                        CONF_STALE_AFTER_HOURS, DEFAULT_STALE_AFTER_HOURS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=720)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=data_schema)
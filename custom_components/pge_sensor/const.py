@@ -5,5 +5,41 @@ from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 
 DOMAIN = "pge_sensor"
 DEFAULT_TIMEOUT = 15
+# Seconds before the alternate finance endpoint is queried in parallel.
+FINANCE_HEDGE_DELAY = 5.0
+STORAGE_VERSION = 1
+# Invoice history database in HA's .storage directory and the event fired for
+# every new, changed or paid invoice it detects.
+HISTORY_FILENAME = f"{DOMAIN}.history.sqlite"
+EVENT_INVOICE_CHANGED = f"{DOMAIN}_invoice_changed"
 
-__all__ = ["DOMAIN", "CONF_USERNAME", "CONF_PASSWORD", "DEFAULT_TIMEOUT"]
+CONF_DAILY_REFRESH_BUDGET = "daily_refresh_budget"
+DEFAULT_DAILY_REFRESH_BUDGET = 12
+CONF_DIAGNOSTIC_SENSORS = "diagnostic_sensors"
+# Age of the last successful refresh after which sensors become unavailable.
+CONF_STALE_AFTER_HOURS = "stale_after_hours"
+DEFAULT_STALE_AFTER_HOURS = 72
+
+# Limits shared by every config entry towards ebok.gkpge.pl.
+MAX_CONCURRENT_REFRESHES = 2
+MAX_CONCURRENT_REQUESTS = 2
+MAX_REQUESTS_PER_SECOND = 1.0
+
+__all__ = [
+    "DOMAIN",
+    "CONF_USERNAME",
+    "CONF_PASSWORD",
+    "DEFAULT_TIMEOUT",
+    "FINANCE_HEDGE_DELAY",
+    "STORAGE_VERSION",
+    "HISTORY_FILENAME",
+    "EVENT_INVOICE_CHANGED",
+    "CONF_DAILY_REFRESH_BUDGET",
+    "DEFAULT_DAILY_REFRESH_BUDGET",
+    "CONF_DIAGNOSTIC_SENSORS",
+    "CONF_STALE_AFTER_HOURS",
+    "DEFAULT_STALE_AFTER_HOURS",
+    "MAX_CONCURRENT_REFRESHES",
+    "MAX_CONCURRENT_REQUESTS",
+    "MAX_REQUESTS_PER_SECOND",
+]
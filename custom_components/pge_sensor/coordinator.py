@@ -2,25 +2,143 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
+import sqlite3
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .api import BalanceInfo, PgeScraper, PgeScraperError
-from .const import DEFAULT_TIMEOUT
+from .api import (
+    BalanceInfo,
+    BalanceSnapshot,
+    Contract,
+    PgeAuthError,
+    PgeScraper,
+    PgeScraperError,
+    ScrapeMetrics,
+)
+from .backoff import async_get_breaker
+from .const import (
+    DEFAULT_TIMEOUT,
+    DOMAIN,
+    EVENT_INVOICE_CHANGED,
+    FINANCE_HEDGE_DELAY,
+    HISTORY_FILENAME,
+    STORAGE_VERSION,
+)
+from .history import InvoiceHistory
+from .hub import PgeHub, ValidatedLogin
+from .scheduler import PollingPlanner
 
+# Interval until the first refresh has told the planner what to expect.
 SCAN_INTERVAL = timedelta(hours=8)
-RETRY_INTERVAL = timedelta(minutes=30)
+# Shortest first interval used when moving an entry onto its staggered phase.
+MIN_STAGGER = timedelta(hours=1)
+# Earliest refresh after starting from a restored snapshot, plus a per-entry
+# spread so that restarts do not send every account to the portal at once.
+MIN_STARTUP_DELAY = timedelta(minutes=1)
+STARTUP_SPREAD = timedelta(minutes=10)
 _LOGGER = logging.getLogger(__name__)
 
 
-class PgeEbokCoordinator(DataUpdateCoordinator[BalanceInfo]):
+def session_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store holding the portal session and last snapshot of an entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.session", private=True)
+
+
+def invoice_history(hass: HomeAssistant) -> InvoiceHistory:
+    """Return the invoice history database shared by all entries."""
+    return InvoiceHistory(Path(hass.config.path(STORAGE_DIR, HISTORY_FILENAME)))
+
+
+def _snapshot_to_store(snapshot: BalanceSnapshot) -> dict[str, Any]:
+    return {
+        "fetched_at": snapshot.fetched_at.isoformat(),
+        "invoices": [
+            {
+                "amount": item.amount,
+                "due_date": item.due_date.isoformat() if item.due_date else None,
+                "invoice_number": item.invoice_number,
+                "issue_date": item.issue_date.isoformat() if item.issue_date else None,
+                "contract": item.contract,
+            }
+            for item in snapshot.invoices
+        ],
+        "contracts": [list(contract) for contract, _ in snapshot.contracts],
+    }
+
+
+def _snapshot_from_store(stored: dict[str, Any] | None) -> BalanceSnapshot | None:
+    if not stored:
+        return None
+    try:
+        invoices = [
+            BalanceInfo(
+                amount=float(item["amount"]),
+                due_date=date.fromisoformat(item["due_date"]) if item["due_date"] else None,
+                invoice_number=item["invoice_number"],
+                issue_date=(
+                    date.fromisoformat(item["issue_date"]) if item["issue_date"] else None
+                ),
+                contract=item.get("contract"),
+            )
+            for item in stored["invoices"]
+        ]
+        contracts = [Contract(*item) for item in stored.get("contracts") or ()]
+        fetched_at = datetime.fromisoformat(stored["fetched_at"])
+    except (KeyError, TypeError, ValueError) as err:
+        _LOGGER.debug("Ignoring unreadable stored snapshot: %s", err)
+        return None
+    # The stored rows already include the largest entry, so the aggregates
+    # come out exactly as they were when the snapshot was taken.
+    return BalanceSnapshot.from_balances(invoices, dt_util.as_local(fetched_at), contracts)
+
+
+class PgeEbokCoordinator(DataUpdateCoordinator[BalanceSnapshot]):
     """Coordinator responsible for fetching balance information."""
 
-    def __init__(self, hass: HomeAssistant, username: str, password: str) -> None:
-        self._api = PgeScraper(username, password, timeout=DEFAULT_TIMEOUT)
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        hub: PgeHub,
+        entry_id: str,
+        username: str,
+        password: str,
+        daily_budget: int,
+        stale_after: timedelta,
+    ) -> None:
+        self._hub = hub
+        self._planner = PollingPlanner(daily_budget)
+        self._breaker = async_get_breaker(hass, entry_id)
+        self._client = hub.create_client()
+        self._api = PgeScraper(
+            username,
+            password,
+            self._client,
+            timeout=DEFAULT_TIMEOUT,
+            request_gate=hub.request_slot,
+            hedge_delay=FINANCE_HEDGE_DELAY,
+            metrics=ScrapeMetrics(),
+        )
+        self._entry_id = entry_id
+        self._staggered = False
         self._username = username
+        self._store = session_store(hass, entry_id)
+        self._session_loaded = False
+        self._saved_session: dict[str, Any] | None = None
+        self._saved_snapshot: dict[str, Any] | None = None
+        self._stale_after = stale_after
+        self._unsub_stale: CALLBACK_TYPE | None = None
+        self._history = invoice_history(hass)
+        # Per-phase statistics of the latest refresh attempt, failed or not.
+        self.last_metrics: dict[str, dict[str, float]] = {}
         super().__init__(
             hass,
             _LOGGER,
@@ -28,22 +146,205 @@ class PgeEbokCoordinator(DataUpdateCoordinator[BalanceInfo]):
             update_interval=SCAN_INTERVAL,
         )
 
-    async def _async_update_data(self) -> BalanceInfo:
+    async def _async_update_data(self) -> BalanceSnapshot:
+        if self._breaker.is_open(dt_util.now()):
+            raise UpdateFailed(
+                f"Portal refreshes paused until {self._breaker.open_until} after "
+                f"repeated {self._breaker.kind} failures"
+            )
+        if not self._session_loaded:
+            await self._async_restore_session()
         try:
-            data = await self.hass.async_add_executor_job(self._api.get_balance_details)
-            self._ensure_interval(SCAN_INTERVAL)
-            return data
+            async with self._hub.refresh_slot():
+                self._planner.record_refresh(dt_util.now())
+                data = await self._api.get_snapshot(dt_util.now())
+            self._ensure_interval(self._next_scan_interval(data))
+        except PgeAuthError as err:
+            self._ensure_interval(self._failure_interval(err.kind))
+            if self._breaker.open_until is not None:
+                raise ConfigEntryAuthFailed(str(err)) from err
+            raise UpdateFailed(str(err)) from err
         except PgeScraperError as err:
-            self._ensure_interval(RETRY_INTERVAL)
+            self._ensure_interval(self._failure_interval(err.kind))
             raise UpdateFailed(str(err)) from err
         except Exception as err:  # pragma: no cover - defensive guard
-            self._ensure_interval(RETRY_INTERVAL)
+            self._ensure_interval(self._failure_interval(PgeScraperError.kind))
             raise UpdateFailed(f"Unexpected coordinator error: {err}") from err
+        finally:
+            self.last_metrics = self._api.metrics.as_dict()
+        await self._async_handle_success(data)
+        return data
+
+    async def async_adopt_validation(self, validated: ValidatedLogin) -> None:
+        """Start from the config flow's login instead of a first refresh.
+
+        The session is reused for the next refresh and the snapshot becomes
+        the entry's data, so setting up an account costs a single login.
+        """
+        self._session_loaded = True
+        self._api.restore_session(validated.session)
+        now = dt_util.now()
+        self._planner.record_refresh(now)
+        self._ensure_interval(self._next_scan_interval(validated.snapshot))
+        await self._async_handle_success(validated.snapshot)
+        self.async_set_updated_data(validated.snapshot)
+
+    async def async_restore_snapshot(self) -> bool:
+        """Publish the persisted snapshot instead of waiting for the portal.
+
+        The first refresh is then planned from the snapshot's age as if HA
+        had not restarted. Returns ``False`` when nothing was persisted.
+        """
+        await self._async_restore_session()
+        snapshot = _snapshot_from_store(self._saved_snapshot)
+        if snapshot is None:
+            return False
+        now = dt_util.now()
+        planned = self._planner.next_interval(snapshot, None, now) - (now - snapshot.fetched_at)
+        spread = self._hub.stagger_offset(self._entry_id, STARTUP_SPREAD)
+        self._ensure_interval(max(planned, MIN_STARTUP_DELAY) + spread)
+        self._schedule_stale_check(snapshot)
+        self.async_set_updated_data(snapshot)
+        _LOGGER.debug(
+            "Restored snapshot of %s from %s", self._username, snapshot.fetched_at
+        )
+        return True
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the data is older than the configured staleness limit."""
+        data = self.data
+        return data is not None and dt_util.now() - data.fetched_at >= self._stale_after
+
+    async def async_shutdown(self) -> None:
+        """Stop refreshing and release the entry's client session."""
+        if self._unsub_stale is not None:
+            self._unsub_stale()
+            self._unsub_stale = None
+        await super().async_shutdown()
+        await self._client.close()
 
     @property
     def username(self) -> str:
         return self._username
 
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the refresh state shown in the entry's diagnostics."""
+        data = self.data
+        return {
+            "last_update_success": self.last_update_success,
+            "last_exception": repr(self.last_exception) if self.last_exception else None,
+            "update_interval_s": (
+                self.update_interval.total_seconds() if self.update_interval else None
+            ),
+            "stale": self.is_stale,
+            "last_metrics": self.last_metrics,
+            "parse_cache": self._api.parse_cache_stats,
+            "backoff": {
+                "failures": self._breaker.failures,
+                "kind": self._breaker.kind,
+                "open_until": self._breaker.open_until,
+            },
+            "snapshot": None
+            if data is None
+            else {
+                "fetched_at": data.fetched_at,
+                "total": data.total,
+                "count": data.count,
+                "earliest_due_date": data.earliest_due_date,
+                "overdue_amount": data.overdue_amount,
+                "invoices": [asdict(item) for item in data.invoices],
+                "contracts": [
+                    {
+                        "contract": contract.id,
+                        "label": contract.label,
+                        "total": part.total,
+                        "count": part.count,
+                        "overdue_amount": part.overdue_amount,
+                    }
+                    for contract, part in data.contracts
+                ],
+            },
+        }
+
+    def _next_scan_interval(self, data: BalanceSnapshot) -> timedelta:
+        now = dt_util.now()
+        interval = self._planner.next_interval(data, self.data, now)
+        if self._staggered:
+            return interval
+        # Move this entry onto its own phase once, so accounts set up together
+        # (e.g. at HA start) do not keep refreshing in the same instant.
+        self._staggered = True
+        offset = self._hub.stagger_offset(self._entry_id, interval)
+        staggered = offset if offset >= MIN_STAGGER else offset + interval
+        return self._planner.clamp(staggered, now)
+
+    async def _async_handle_success(self, data: BalanceSnapshot) -> None:
+        self._breaker.record_success()
+        self._schedule_stale_check(data)
+        await self._async_persist_state(data)
+        # An unchanged invoice list cannot produce a delta; skip the write.
+        if self.data is None or data.invoices != self.data.invoices:
+            await self._async_record_history(data)
+        _LOGGER.debug(
+            "Finance parse cache for %s: %s", self._username, self._api.parse_cache_stats
+        )
+
+    def _failure_interval(self, kind: str) -> timedelta:
+        now = dt_util.now()
+        return self._breaker.record_failure(
+            kind, now, floor=self._planner.clamp(timedelta(0), now)
+        )
+
     def _ensure_interval(self, interval: timedelta) -> None:
         if self.update_interval != interval:
             self.update_interval = interval
+
+    async def _async_restore_session(self) -> None:
+        self._session_loaded = True
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        self._saved_session = stored.get("session")
+        self._saved_snapshot = stored.get("snapshot")
+        if self._api.restore_session(self._saved_session):
+            _LOGGER.debug("Restored portal session for %s", self._username)
+
+    async def _async_record_history(self, data: BalanceSnapshot) -> None:
+        try:
+            changes = await self.hass.async_add_executor_job(
+                self._history.record, self._username, data
+            )
+        except sqlite3.Error as err:
+            _LOGGER.warning("Could not update invoice history for %s: %s", self._username, err)
+            return
+        for change in changes:
+            self.hass.bus.async_fire(
+                EVENT_INVOICE_CHANGED,
+                {"entry_id": self._entry_id, "username": self._username, **change.as_dict()},
+            )
+
+    async def _async_persist_state(self, data: BalanceSnapshot) -> None:
+        state = self._api.export_session()
+        snapshot = _snapshot_to_store(data)
+        if state == self._saved_session and snapshot == self._saved_snapshot:
+            return
+        self._saved_session = state
+        self._saved_snapshot = snapshot
+        await self._store.async_save({"session": state, "snapshot": snapshot})
+
+    def _schedule_stale_check(self, data: BalanceSnapshot) -> None:
+        # Entities only re-evaluate availability on updates; wake them up when
+        # the data crosses the staleness limit without a successful refresh.
+        if self._unsub_stale is not None:
+            self._unsub_stale()
+        remaining = data.fetched_at + self._stale_after - dt_util.now()
+        self._unsub_stale = async_call_later(
+            self.hass, max(remaining.total_seconds(), 0), self._async_stale_reached
+        )
+
+    @callback
+    def _async_stale_reached(self, _now: datetime) -> None:
+        self._unsub_stale = None
+        _LOGGER.debug("Data of %s is older than %s", self._username, self._stale_after)
+        self.async_update_listeners()
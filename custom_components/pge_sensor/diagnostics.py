@@ -0,0 +1,27 @@
+"""Diagnostics support for the PGE Sensor integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN
+from .coordinator import PgeEbokCoordinator
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, "invoice_number", "contract", "label"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return entry settings and the coordinator's refresh state."""
+    coordinator: PgeEbokCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return async_redact_data(
+        {
+            "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+            "coordinator": coordinator.diagnostics(),
+        },
+        TO_REDACT,
+    )
@@ -0,0 +1,200 @@
+"""SQLite history of scraped invoices with incremental diffing.
+
+The CLI (``pge_scraper.py``) loads this file directly as well, so it only
+imports the standard library; snapshots of either scraper can be recorded.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from .api import BalanceSnapshot
+
+# Scrapes kept per account: about a year at the default refresh budget. The
+# diff only needs the latest one; older rows are for inspecting the database.
+MAX_SCRAPES = 4500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrapes_account ON scrapes (account, id);
+CREATE TABLE IF NOT EXISTS observations (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes (id),
+    position INTEGER NOT NULL,
+    invoice_number TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    amount_grosze INTEGER NOT NULL,
+    due_date TEXT,
+    issue_date TEXT,
+    PRIMARY KEY (scrape_id, position),
+    UNIQUE (scrape_id, invoice_number, occurrence)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_due ON observations (due_date, scrape_id);
+"""
+
+# Current rows that are new or differ from the previous scrape, plus previous
+# rows missing from the current one. A row is matched across scrapes by its
+# invoice number and how many rows with that number precede it, so unnumbered
+# and repeated rows are compared in order instead of collapsing into one.
+# Every probe is a lookup on the unique key.
+_DIFF_QUERY = """
+SELECT CASE WHEN prev.invoice_number IS NULL THEN 'new' ELSE 'changed' END,
+       cur.invoice_number, cur.amount_grosze, prev.amount_grosze,
+       cur.due_date, cur.issue_date
+FROM observations AS cur
+LEFT JOIN observations AS prev
+    ON prev.scrape_id = :previous
+   AND prev.invoice_number = cur.invoice_number
+   AND prev.occurrence = cur.occurrence
+WHERE cur.scrape_id = :current
+  AND (prev.invoice_number IS NULL
+       OR prev.amount_grosze != cur.amount_grosze
+       OR prev.due_date IS NOT cur.due_date)
+UNION ALL
+SELECT 'paid', prev.invoice_number, 0, prev.amount_grosze,
+       prev.due_date, prev.issue_date
+FROM observations AS prev
+WHERE prev.scrape_id = :previous
+  AND NOT EXISTS (
+      SELECT 1 FROM observations AS cur
+      WHERE cur.scrape_id = :current
+        AND cur.invoice_number = prev.invoice_number
+        AND cur.occurrence = prev.occurrence
+  )
+"""
+
+# Scrapes of an account older than its ``:keep`` most recent ones.
+_PRUNE_WHERE = """
+SELECT id FROM scrapes
+WHERE account = :account
+  AND id <= (SELECT id FROM scrapes WHERE account = :account
+             ORDER BY id DESC LIMIT 1 OFFSET :keep)
+"""
+
+
+class InvoiceChange(NamedTuple):
+    """One invoice that is ``new``, ``changed`` or ``paid`` since the last scrape."""
+
+    kind: str
+    invoice_number: Optional[str]
+    amount: float
+    previous_amount: Optional[float]
+    due_date: Optional[date]
+    issue_date: Optional[date]
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "change": self.kind,
+            "invoice_number": self.invoice_number,
+            "amount": self.amount,
+            "previous_amount": self.previous_amount,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "issue_date": self.issue_date.isoformat() if self.issue_date else None,
+        }
+
+
+def _observation_rows(
+    scrape_id: int, snapshot: BalanceSnapshot
+) -> list[tuple[object, ...]]:
+    seen: Counter[str] = Counter()
+    rows: list[tuple[object, ...]] = []
+    for position, item in enumerate(snapshot.invoices):
+        number = item.invoice_number or ""
+        rows.append(
+            (
+                scrape_id,
+                position,
+                number,
+                seen[number],
+                round(item.amount * 100),
+                item.due_date.isoformat() if item.due_date else None,
+                item.issue_date.isoformat() if item.issue_date else None,
+            )
+        )
+        seen[number] += 1
+    return rows
+
+
+class InvoiceHistory:
+    """Stores every scrape of an account and reports what changed.
+
+    Every scrape adds one row per invoice row, with amounts in grosze; only
+    the ``max_scrapes`` most recent scrapes of an account are kept. The
+    calls are blocking and open a short-lived connection each, so they can
+    run on any executor thread.
+    """
+
+    def __init__(self, path: Path, max_scrapes: int = MAX_SCRAPES) -> None:
+        self._path = Path(path)
+        self._max_scrapes = max(1, max_scrapes)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def record(self, account: str, snapshot: BalanceSnapshot) -> list[InvoiceChange]:
+        """Append ``snapshot`` and return its differences to the previous scrape."""
+        with closing(self._connect()) as conn, conn:
+            previous = conn.execute(
+                "SELECT max(id) FROM scrapes WHERE account = ?", (account,)
+            ).fetchone()[0]
+            current = conn.execute(
+                "INSERT INTO scrapes (account, fetched_at) VALUES (?, ?)",
+                (account, snapshot.fetched_at.isoformat()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _observation_rows(current, snapshot),
+            )
+            rows = conn.execute(
+                _DIFF_QUERY, {"previous": previous or 0, "current": current}
+            ).fetchall()
+            self._prune(conn, account)
+        return [
+            InvoiceChange(
+                kind=kind,
+                invoice_number=number or None,
+                amount=amount / 100,
+                previous_amount=None if previous_amount is None else previous_amount / 100,
+                due_date=date.fromisoformat(due) if due else None,
+                issue_date=date.fromisoformat(issued) if issued else None,
+            )
+            for kind, number, amount, previous_amount, due, issued in rows
+        ]
+
+    def forget(self, account: str) -> None:
+        """Delete the whole history of an account."""
+        if not self._path.exists():
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM observations WHERE scrape_id IN "
+                "(SELECT id FROM scrapes WHERE account = ?)",
+                (account,),
+            )
+            conn.execute("DELETE FROM scrapes WHERE account = ?", (account,))
+
+    def _prune(self, conn: sqlite3.Connection, account: str) -> None:
+        params = {"account": account, "keep": self._max_scrapes}
+        conn.execute(
+            f"DELETE FROM observations WHERE scrape_id IN ({_PRUNE_WHERE})", params
+        )
+        conn.execute(f"DELETE FROM scrapes WHERE id IN ({_PRUNE_WHERE})", params)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=30)
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+        return conn
@@ -0,0 +1,154 @@
+"""Domain-wide hub shared by all PGE Sensor config entries."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+import aiohttp
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_call_later
+
+from .api import BalanceSnapshot
+from .const import (
+    DOMAIN,
+    MAX_CONCURRENT_REFRESHES,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_REQUESTS_PER_SECOND,
+)
+
+DATA_HUB = f"{DOMAIN}_hub"
+# How long a config-flow login may be handed over to the new entry.
+VALIDATION_HANDOVER_TTL = 600.0
+
+
+class ValidatedLogin(NamedTuple):
+    """Session and first snapshot from a successful config-flow login check."""
+
+    session: dict[str, Any]
+    snapshot: BalanceSnapshot
+    created: float
+
+
+class PgeHub:
+    """Throttles portal traffic and staggers refreshes across accounts.
+
+    Every entry gets its own client session (separate cookie jar) on top of
+    Home Assistant's shared connection pool. All of their requests pass
+    through one gate that caps concurrency and the request rate, and at most
+    ``MAX_CONCURRENT_REFRESHES`` login/scrape chains run at the same time.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._entries: set[str] = set()
+        self._refresh_slots = asyncio.Semaphore(MAX_CONCURRENT_REFRESHES)
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._spacing_lock = asyncio.Lock()
+        self._min_spacing = 1 / MAX_REQUESTS_PER_SECOND
+        self._next_request_at = 0.0
+        self._validated: dict[str, ValidatedLogin] = {}
+        self._unsub_validation: dict[str, CALLBACK_TYPE] = {}
+
+    def register(self, entry_id: str) -> None:
+        self._entries.add(entry_id)
+
+    def unregister(self, entry_id: str) -> bool:
+        """Forget an entry; return True when no entries are left."""
+        self._entries.discard(entry_id)
+        return not self._entries
+
+    def create_client(self) -> aiohttp.ClientSession:
+        """Return a client session with a private cookie jar on the shared pool.
+
+        Connections (and TLS sessions) come from Home Assistant's shared
+        connector and are reused across entries and refreshes. The scraper
+        decodes response bodies itself to account for transferred bytes.
+        """
+        return async_create_clientsession(self._hass, auto_decompress=False)
+
+    @asynccontextmanager
+    async def refresh_slot(self) -> AsyncIterator[None]:
+        """Hold one of the global refresh slots for a full scrape."""
+        async with self._refresh_slots:
+            yield
+
+    @asynccontextmanager
+    async def request_slot(self) -> AsyncIterator[None]:
+        """Admit one HTTP request within the global concurrency and rate caps."""
+        async with self._request_slots:
+            async with self._spacing_lock:
+                loop = asyncio.get_running_loop()
+                now = loop.time()
+                delay = self._next_request_at - now
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_request_at = max(now, self._next_request_at) + self._min_spacing
+            yield
+
+    def stash_validation(
+        self, unique_id: str, session: dict[str, Any], snapshot: BalanceSnapshot
+    ) -> None:
+        """Keep a config-flow login for the entry about to be set up.
+
+        The login is dropped after ``VALIDATION_HANDOVER_TTL`` so that an
+        abandoned flow does not leave its session behind in ``hass.data``.
+        """
+        self._cancel_validation_expiry(unique_id)
+        self._validated[unique_id] = ValidatedLogin(session, snapshot, time.monotonic())
+
+        @callback
+        def _async_expire(_now: datetime) -> None:
+            self._unsub_validation.pop(unique_id, None)
+            self._validated.pop(unique_id, None)
+
+        self._unsub_validation[unique_id] = async_call_later(
+            self._hass, VALIDATION_HANDOVER_TTL, _async_expire
+        )
+
+    def pop_validation(self, unique_id: str | None) -> ValidatedLogin | None:
+        """Return the stashed login for ``unique_id`` unless it is too old."""
+        if not unique_id:
+            return None
+        self._cancel_validation_expiry(unique_id)
+        validated = self._validated.pop(unique_id, None)
+        if validated is None or time.monotonic() - validated.created > VALIDATION_HANDOVER_TTL:
+            return None
+        return validated
+
+    def _cancel_validation_expiry(self, unique_id: str) -> None:
+        unsub = self._unsub_validation.pop(unique_id, None)
+        if unsub is not None:
+            unsub()
+
+    @staticmethod
+    def stagger_offset(entry_id: str, interval: timedelta) -> timedelta:
+        """Return a stable per-entry phase within ``interval``.
+
+        Derived from the entry id so that refreshes of different accounts are
+        spread over the interval instead of all following HA's start-up time.
+        """
+        digest = hashlib.sha256(entry_id.encode("utf-8")).digest()
+        fraction = int.from_bytes(digest[:4], "big") / 2**32
+        return timedelta(seconds=int(interval.total_seconds() * fraction))
+
+
+def async_get_hub(hass: HomeAssistant) -> PgeHub:
+    """Return the hub, creating it on first use."""
+    hub: PgeHub | None = hass.data.get(DATA_HUB)
+    if hub is None:
+        hub = hass.data[DATA_HUB] = PgeHub(hass)
+    return hub
+
+
+def async_release_hub(hass: HomeAssistant, entry_id: str) -> None:
+    """Detach an entry from the hub and drop the hub with the last entry."""
+    hub: PgeHub | None = hass.data.get(DATA_HUB)
+    if hub is not None and hub.unregister(entry_id):
+        hass.data.pop(DATA_HUB, None)
@@ -0,0 +1,93 @@
+"""Adaptive refresh planning for the PGE Sensor coordinator."""
+from __future__ import annotations
+
+from collections import deque
+from datetime import date, datetime, timedelta
+
+from .api import BalanceSnapshot
+
+# Invoices are issued roughly monthly; poll more often around that date.
+BILLING_PERIOD = timedelta(days=30)
+ISSUE_WINDOW_BEFORE = timedelta(days=2)
+ISSUE_WINDOW_AFTER = timedelta(days=5)
+DUE_SOON = timedelta(days=2)
+DUE_UPCOMING = timedelta(days=7)
+PAYMENT_SETTLE = timedelta(days=1)
+
+QUIET_INTERVAL = timedelta(hours=24)
+UPCOMING_INTERVAL = timedelta(hours=8)
+ISSUE_WINDOW_INTERVAL = timedelta(hours=4)
+SETTLE_INTERVAL = timedelta(hours=3)
+DUE_SOON_INTERVAL = timedelta(hours=2)
+
+BUDGET_WINDOW = timedelta(hours=24)
+
+
+class PollingPlanner:
+    """Chooses the next refresh delay from the data the scraper returned.
+
+    Nothing due and no invoice expected: poll once a day. Around the expected
+    issue date, close to or past a due date and right after a payment: poll a
+    few times a day. Every interval is bounded by the daily request budget,
+    both as a minimum spacing and as a rolling 24 h cap.
+    """
+
+    def __init__(self, daily_budget: int) -> None:
+        self._daily_budget = max(1, daily_budget)
+        self._refreshes: deque[datetime] = deque()
+        self._last_issue_date: date | None = None
+        self._settle_until: datetime | None = None
+
+    @property
+    def min_interval(self) -> timedelta:
+        return BUDGET_WINDOW / self._daily_budget
+
+    def record_refresh(self, when: datetime) -> None:
+        """Count a portal refresh against the rolling daily budget."""
+        self._refreshes.append(when)
+        while self._refreshes and when - self._refreshes[0] >= BUDGET_WINDOW:
+            self._refreshes.popleft()
+
+    def next_interval(
+        self,
+        data: BalanceSnapshot | None,
+        previous: BalanceSnapshot | None,
+        now: datetime,
+    ) -> timedelta:
+        """Return the delay until the next refresh after a successful one."""
+        issue_date = data.latest_issue_date if data is not None else None
+        if issue_date and (not self._last_issue_date or issue_date > self._last_issue_date):
+            self._last_issue_date = issue_date
+        if previous is not None and data is not None and data.total < previous.total:
+            # A payment was registered; follow up until the portal settles.
+            self._settle_until = now + PAYMENT_SETTLE
+        return self.clamp(self._desired_interval(data, now), now)
+
+    def clamp(self, interval: timedelta, now: datetime) -> timedelta:
+        """Bound ``interval`` by the daily budget and return the result."""
+        interval = max(interval, self.min_interval)
+        if len(self._refreshes) >= self._daily_budget:
+            budget_frees_at = self._refreshes[-self._daily_budget] + BUDGET_WINDOW
+            interval = max(interval, budget_frees_at - now)
+        return interval
+
+    def _desired_interval(self, data: BalanceSnapshot | None, now: datetime) -> timedelta:
+        today = now.date()
+        candidates = [QUIET_INTERVAL]
+        if data is not None and data.total > 0 and data.earliest_due_date:
+            until_due = data.earliest_due_date - today
+            if until_due <= DUE_SOON:
+                candidates.append(DUE_SOON_INTERVAL)
+            elif until_due <= DUE_UPCOMING:
+                candidates.append(UPCOMING_INTERVAL)
+        if self._settle_until is not None:
+            if now < self._settle_until:
+                candidates.append(SETTLE_INTERVAL)
+            else:
+                self._settle_until = None
+        if self._last_issue_date is not None:
+            periods = max(1, round((today - self._last_issue_date) / BILLING_PERIOD))
+            expected = self._last_issue_date + periods * BILLING_PERIOD
+            if expected - ISSUE_WINDOW_BEFORE <= today <= expected + ISSUE_WINDOW_AFTER:
+                candidates.append(ISSUE_WINDOW_INTERVAL)
+        return min(candidates)
@@ -9,23 +9,56 @@ from homeassistant.components.sensor import (
     SensorEntity,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_USERNAME
+from homeassistant.const import CONF_USERNAME, EntityCategory
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from .const import DOMAIN
+from .api import BalanceInfo, BalanceSnapshot, Contract
+from .const import CONF_DIAGNOSTIC_SENSORS, DOMAIN
 from .coordinator import PgeEbokCoordinator
 
 MONETARY_UNIT = "PLN"
+# Invoices listed in the total sensor's attributes, earliest due first; the
+# recorder drops attributes over 16 KiB, and diagnostics has the full list.
+MAX_ATTRIBUTE_INVOICES = 20
 
 
-@dataclass
+@dataclass(frozen=True)
 class PgeSensorDescription:
     name: str
+    # Field of ``BalanceSnapshot`` exposed as the sensor state.
     key: str
+    device_class: SensorDeviceClass | None = None
+    unit: str | None = None
+
+
+AGGREGATE_SENSORS = (
+    PgeSensorDescription(
+        "PGE Total Outstanding", "total", SensorDeviceClass.MONETARY, MONETARY_UNIT
+    ),
+    PgeSensorDescription("PGE Outstanding Invoices", "count"),
+    PgeSensorDescription(
+        "PGE Earliest Due Date", "earliest_due_date", SensorDeviceClass.DATE
+    ),
+    PgeSensorDescription(
+        "PGE Overdue Amount", "overdue_amount", SensorDeviceClass.MONETARY, MONETARY_UNIT
+    ),
+)
+
+# Totals of the latest refresh attempt; keys of ``ScrapeMetrics.as_dict()``.
+METRIC_SENSORS = (
+    PgeSensorDescription(
+        "PGE Refresh Duration", "seconds", SensorDeviceClass.DURATION, "s"
+    ),
+    PgeSensorDescription("PGE Refresh Requests", "requests"),
+    PgeSensorDescription("PGE Refresh Bytes", "bytes", SensorDeviceClass.DATA_SIZE, "B"),
+    PgeSensorDescription(
+        "PGE Refresh Wire Bytes", "wire_bytes", SensorDeviceClass.DATA_SIZE, "B"
+    ),
+)
 
 
 async def async_setup_entry(
@@ -41,11 +74,48 @@ async def async_setup_entry(
         PgeBalanceSensor(coordinator, slug, username),
     ]
 
-    if coordinator.data and coordinator.data.due_date:
+    # Without data yet (first refresh still running) the due date may exist.
+    largest = coordinator.data.largest if coordinator.data else None
+    if coordinator.data is None or (largest and largest.due_date):
         entities.append(PgeDueDateSensor(coordinator, slug, username))
 
+    entities.extend(
+        PgeAggregateSensor(coordinator, slug, username, description)
+        for description in AGGREGATE_SENSORS
+    )
+
+    if entry.options.get(CONF_DIAGNOSTIC_SENSORS):
+        entities.extend(
+            PgeRefreshMetricSensor(coordinator, slug, username, description)
+            for description in METRIC_SENSORS
+        )
+
     async_add_entities(entities)
 
+    # Accounts with several contracts get a device per contract, added as the
+    # contracts show up in the coordinator's data.
+    known_contracts: set[str] = set()
+
+    @callback
+    def _async_add_contract_sensors() -> None:
+        data = coordinator.data
+        contracts = [
+            contract
+            for contract, _ in (data.contracts if data else ())
+            if contract.id not in known_contracts
+        ]
+        if not contracts:
+            return
+        known_contracts.update(contract.id for contract in contracts)
+        async_add_entities(
+            PgeContractSensor(coordinator, slug, username, description, contract)
+            for contract in contracts
+            for description in AGGREGATE_SENSORS
+        )
+
+    _async_add_contract_sensors()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_contract_sensors))
+
 
 class PgeBaseSensor(CoordinatorEntity[PgeEbokCoordinator], SensorEntity):
     def __init__(self, coordinator: PgeEbokCoordinator, slug: str, username: str) -> None:
@@ -65,7 +135,11 @@ class PgeBaseSensor(CoordinatorEntity[PgeEbokCoordinator], SensorEntity):
     def available(self) -> bool:
         if self._attr_available is False:
             return False
-        return self.coordinator.data is not None
+        return self.coordinator.data is not None and not self.coordinator.is_stale
+
+    @property
+    def _largest(self) -> BalanceInfo | None:
+        return self.coordinator.data.largest if self.coordinator.data else None
 
 
 class PgeBalanceSensor(PgeBaseSensor):
@@ -79,19 +153,21 @@ class PgeBalanceSensor(PgeBaseSensor):
 
     @property
     def native_value(self) -> float | None:
-        if self.coordinator.data:
-            return round(self.coordinator.data.amount, 2)
-        return None
+        if not self.coordinator.data:
+            return None
+        largest = self._largest
+        return round(largest.amount, 2) if largest else 0.0
 
     @property
     def extra_state_attributes(self) -> dict[str, str] | None:
-        if not self.coordinator.data:
+        largest = self._largest
+        if not largest:
             return None
         attributes = {}
-        if self.coordinator.data.invoice_number:
-            attributes["invoice_number"] = self.coordinator.data.invoice_number
-        if self.coordinator.data.issue_date:
-            attributes["issue_date"] = self.coordinator.data.issue_date.isoformat()
+        if largest.invoice_number:
+            attributes["invoice_number"] = largest.invoice_number
+        if largest.issue_date:
+            attributes["issue_date"] = largest.issue_date.isoformat()
         return attributes or None
 
 
@@ -105,14 +181,135 @@ class PgeDueDateSensor(PgeBaseSensor):
 
     @property
     def native_value(self) -> date | None:
-        if self.coordinator.data:
-            return self.coordinator.data.due_date
-        return None
+        largest = self._largest
+        return largest.due_date if largest else None
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        if self.coordinator.data and self.coordinator.data.due_date is None:
+        if self.coordinator.data and not (self._largest and self._largest.due_date):
             self._attr_available = False
         else:
             self._attr_available = True
         super()._handle_coordinator_update()
+
+
+class PgeAggregateSensor(PgeBaseSensor):
+    """Exposes one aggregate precomputed in the coordinator's snapshot."""
+
+    def __init__(
+        self,
+        coordinator: PgeEbokCoordinator,
+        slug: str,
+        username: str,
+        description: PgeSensorDescription,
+    ) -> None:
+        super().__init__(coordinator, slug, username)
+        self._description = description
+        self._attr_name = description.name
+        self._attr_device_class = description.device_class
+        self._attr_native_unit_of_measurement = description.unit
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._slug}_{self._description.key}"
+
+    @property
+    def _snapshot(self) -> BalanceSnapshot | None:
+        return self.coordinator.data
+
+    @property
+    def native_value(self) -> float | int | date | None:
+        snapshot = self._snapshot
+        if snapshot:
+            return getattr(snapshot, self._description.key)
+        return None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, object] | None:
+        snapshot = self._snapshot
+        if self._description.key != "total" or not snapshot:
+            return None
+        listed = snapshot.invoices[:MAX_ATTRIBUTE_INVOICES]
+        return {
+            "invoices": [
+                {
+                    "invoice_number": item.invoice_number,
+                    "amount": round(item.amount, 2),
+                    "due_date": item.due_date.isoformat() if item.due_date else None,
+                }
+                for item in listed
+            ],
+            "truncated": len(snapshot.invoices) - len(listed),
+        }
+
+
+class PgeContractSensor(PgeAggregateSensor):
+    """One aggregate of a single contract, on a device of its own."""
+
+    def __init__(
+        self,
+        coordinator: PgeEbokCoordinator,
+        slug: str,
+        username: str,
+        description: PgeSensorDescription,
+        contract: Contract,
+    ) -> None:
+        super().__init__(coordinator, slug, username, description)
+        self._contract = contract
+        self._contract_slug = f"{slug}_{slugify(contract.id)}"
+        self._attr_name = f"{description.name} {contract.label}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._contract_slug}_{self._description.key}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._contract_slug)},
+            name=f"PGE {self._contract.label}",
+            manufacturer="PGE",
+            via_device=(DOMAIN, self._slug),
+        )
+
+    @property
+    def available(self) -> bool:
+        return super().available and self._snapshot is not None
+
+    @property
+    def _snapshot(self) -> BalanceSnapshot | None:
+        data = self.coordinator.data
+        return data.by_contract.get(self._contract.id) if data else None
+
+
+class PgeRefreshMetricSensor(PgeAggregateSensor):
+    """Reports one total of the latest refresh attempt's phase statistics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._slug}_refresh_{self._description.key}"
+
+    @property
+    def available(self) -> bool:
+        return bool(self.coordinator.last_metrics)
+
+    @property
+    def native_value(self) -> float | None:
+        total = self.coordinator.last_metrics.get("total")
+        if total is None:
+            return None
+        value = total[self._description.key]
+        return round(value, 3) if isinstance(value, float) else value
+
+    @property
+    def extra_state_attributes(self) -> dict[str, object] | None:
+        metrics = self.coordinator.last_metrics
+        if not metrics:
+            return None
+        return {
+            phase: stats[self._description.key]
+            for phase, stats in metrics.items()
+            if phase != "total"
+        }
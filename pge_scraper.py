@@ -2,41 +2,554 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import contextlib
+import functools
+import hashlib
+import importlib
+import importlib.util
+import json
 import logging
+import os
 import re
+import signal
+import socketserver
+import sqlite3
 import sys
+import threading
+import time
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+from array import array
+from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import asdict, dataclass, field
 from datetime import date, datetime
-from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import MappingProxyType, ModuleType
+from typing import Any, Iterable, Iterator, Mapping, NamedTuple, Optional, TextIO
+from urllib.parse import parse_qs, unquote, urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+import requests.adapters
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+from urllib3.util.retry import Retry
 
 
 _LOGGER = logging.getLogger(__name__)
 
+# Finance pages are streamed in chunks of this size, and a page whose decoded
+# body exceeds the cap is rejected instead of being buffered and parsed.
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_FINANCE_BYTES = 16 * 1024 * 1024
+
+# BeautifulSoup tree builders in order of preference. lxml is an optional,
+# much faster C parser; html.parser ships with Python and is always present.
+HTML_PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def available_html_parsers() -> list[str]:
+    """Return the supported parser backends installed in this environment."""
+    return [name for name in HTML_PARSER_BACKENDS if builder_registry.lookup(name)]
+
+
+def set_html_parser(name: Optional[str] = None) -> str:
+    """Select the HTML parser backend; ``None`` picks the fastest installed."""
+    global _html_parser
+    if name is None:
+        _html_parser = available_html_parsers()[0]
+    elif name not in HTML_PARSER_BACKENDS:
+        raise ValueError(f"Unsupported HTML parser backend: {name}")
+    elif not builder_registry.lookup(name):
+        raise ValueError(f"HTML parser backend {name} is not installed")
+    else:
+        _html_parser = name
+    return _html_parser
+
+
+_html_parser = "html.parser"
+set_html_parser()
+
+
+def _make_soup(markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    return BeautifulSoup(markup, _html_parser, parse_only=parse_only)
+
+
+# Finance pages of accounts with several contracts are fetched in parallel,
+# at most this many at a time over the account's session.
+DEFAULT_CONTRACT_CONCURRENCY = 4
+# Connections kept per pool: a single scrape has at most this many requests
+# in flight (parallel warmup, hedged or per-contract finance fetches).
+DEFAULT_POOL_MAXSIZE = DEFAULT_CONTRACT_CONCURRENCY
+# Low-level retries for failed connections and connections dropped before a
+# response arrived. Only GETs are retried; replaying the login POST could trip
+# the portal's lockout. Error statuses are never retried here: a failing finance
+# endpoint goes straight to the fallback or hedge, and a Retry-After header
+# cannot stall a scrape.
+DEFAULT_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    status=0,
+    backoff_factor=0.5,
+    allowed_methods=frozenset({"GET"}),
+    raise_on_status=False,
+    respect_retry_after_header=False,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli_available() -> bool:
+    for name in ("brotli", "brotlicffi"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        return True
+    return False
+
+
+def accepted_encodings() -> str:
+    """Return the ``Accept-Encoding`` value for the installed decoders.
+
+    urllib3 only decodes brotli when ``brotli`` or ``brotlicffi`` is
+    installed, so ``br`` is not advertised otherwise.
+    """
+    return "gzip, deflate, br" if _brotli_available() else "gzip, deflate"
+
+
+def create_adapter(
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE, retry: Retry = DEFAULT_RETRY
+) -> requests.adapters.HTTPAdapter:
+    """Return a transport adapter with a sized pool and the retry policy.
+
+    Mount one adapter on many sessions to share its connections (and TLS
+    sessions) between them, as batch mode does.
+    """
+    return requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+
+
+def create_session(adapter: Optional[requests.adapters.HTTPAdapter] = None) -> requests.Session:
+    """Return a session on ``adapter`` (a new default one when omitted)."""
+    session = requests.Session()
+    adapter = adapter or create_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _rebase_url(url: str, base_url: str) -> str:
+    """Move a portal URL onto ``base_url`` (scheme, host and optional prefix)."""
+    return base_url.rstrip("/") + urlsplit(url).path
+
+
+_SESSION_CACHE_DIR = Path.home() / ".cache" / "pge_scraper"
+_DEFAULT_HISTORY = _SESSION_CACHE_DIR / "history.sqlite"
+
+
+def _wire_size(response: requests.Response) -> Optional[int]:
+    # urllib3 counts the raw (still compressed) bytes it read from the socket.
+    tell = getattr(response.raw, "tell", None)
+    return tell() if callable(tell) else None
+
 
 class PgeScraperError(RuntimeError):
     """Domain-specific exception raised by PgeScraper."""
 
+    # Failure class used to pick a retry policy; see the subclasses below.
+    kind = "unknown"
 
-@dataclass
+
+class PgeSessionExpiredError(PgeScraperError):
+    """Raised when the portal answers with the login form instead of data."""
+
+    kind = "session"
+
+
+class PgeNetworkError(PgeScraperError):
+    """The portal could not be reached or answered with an HTTP error."""
+
+    kind = "network"
+
+
+class PgeAuthError(PgeScraperError):
+    """The portal rejected the credentials or dropped the fresh session."""
+
+    kind = "auth"
+
+
+class PgeVerificationRequiredError(PgeScraperError):
+    """The portal asks for a verification step that only a browser can do."""
+
+    kind = "verification"
+
+
+class PgeLayoutChangedError(PgeScraperError):
+    """The portal answered, but its pages no longer look as expected."""
+
+    kind = "layout"
+
+
+@dataclass(frozen=True)
 class BalanceInfo:
     amount: float
     due_date: Optional[date] = None
     invoice_number: Optional[str] = None
     issue_date: Optional[date] = None
+    # Contract id on accounts with several contracts, otherwise None.
+    contract: Optional[str] = None
+
+
+class Contract(NamedTuple):
+    """A contract or delivery point (PPE) selectable under one login."""
+
+    id: str
+    label: str
+
+
+# Dates are kept as proleptic Gregorian ordinals; 0 marks a missing date.
+_NO_DATE = 0
+_UNDATED_LAST = date.max.toordinal() + 1
+
+
+@functools.lru_cache(maxsize=4096)
+def _date_from_ordinal(ordinal: int) -> date:
+    return date.fromordinal(ordinal)
+
+
+class InvoiceTable:
+    """Invoices stored column-wise: amounts in grosze, dates as ordinals.
+
+    Rows live in parallel ``array`` columns instead of one object each.
+    Sorting and filtering return views sharing those columns through an index
+    array, aggregates run over the integer columns, and ``BalanceInfo``
+    objects are only built when rows are iterated.
+    """
+
+    __slots__ = ("_amounts", "_due", "_issued", "_numbers", "_contracts", "_index")
+
+    def __init__(self) -> None:
+        self._amounts = array("q")
+        self._due = array("i")
+        self._issued = array("i")
+        self._numbers: list[Optional[str]] = []
+        self._contracts: list[Optional[str]] = []
+        self._index: Optional[array] = None
+
+    @classmethod
+    def from_balances(cls, balances: Iterable[BalanceInfo]) -> InvoiceTable:
+        table = cls()
+        for item in balances:
+            table.append(
+                round(item.amount * 100),
+                item.due_date.toordinal() if item.due_date else _NO_DATE,
+                item.issue_date.toordinal() if item.issue_date else _NO_DATE,
+                item.invoice_number,
+                item.contract,
+            )
+        return table
+
+    def append(
+        self,
+        amount_grosze: int,
+        due: int = _NO_DATE,
+        issued: int = _NO_DATE,
+        number: Optional[str] = None,
+        contract: Optional[str] = None,
+    ) -> None:
+        if self._index is not None:
+            raise TypeError("InvoiceTable views are read-only")
+        self._amounts.append(amount_grosze)
+        self._due.append(due)
+        self._issued.append(issued)
+        self._numbers.append(number)
+        self._contracts.append(contract)
+
+    def __len__(self) -> int:
+        return len(self._amounts) if self._index is None else len(self._index)
+
+    def __iter__(self) -> Iterator[BalanceInfo]:
+        return iter(self.rows())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, InvoiceTable):
+            return NotImplemented
+        return self.rows() == other.rows()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def rows(self) -> tuple[BalanceInfo, ...]:
+        amounts, due, issued, numbers = self._amounts, self._due, self._issued, self._numbers
+        contracts = self._contracts
+        to_date = _date_from_ordinal
+        return tuple(
+            BalanceInfo(
+                amounts[i] / 100,
+                to_date(due[i]) if due[i] else None,
+                numbers[i],
+                to_date(issued[i]) if issued[i] else None,
+                contracts[i],
+            )
+            for i in self._positions()
+        )
+
+    def tagged(self, contract: str) -> InvoiceTable:
+        """View whose rows all belong to ``contract``; other columns are shared."""
+        view = self._view(self._positions())
+        view._contracts = [contract] * len(self._amounts)
+        return view
+
+    def identified(self) -> InvoiceTable:
+        """View of the rows carrying an invoice number or a due date."""
+        numbers, due = self._numbers, self._due
+        return self._view(i for i in self._positions() if numbers[i] or due[i])
+
+    def due_before(self, day: date) -> InvoiceTable:
+        """View of the dated rows due before ``day``."""
+        limit, due = day.toordinal(), self._due
+        return self._view(i for i in self._positions() if _NO_DATE < due[i] < limit)
+
+    def sorted_by_due(self) -> InvoiceTable:
+        """View ordered by due date, undated rows last; ties keep their order."""
+        due = self._due
+        return self._view(
+            sorted(self._positions(), key=lambda i: due[i] or _UNDATED_LAST)
+        )
+
+    def largest(self) -> InvoiceTable:
+        """One-row view of the highest amount (the first on ties), empty if none."""
+        amounts = self._amounts
+        position = max(self._positions(), key=amounts.__getitem__, default=None)
+        return self._view(() if position is None else (position,))
+
+    def total_grosze(self) -> int:
+        if self._index is None:
+            return sum(self._amounts)
+        amounts = self._amounts
+        return sum(amounts[i] for i in self._index)
+
+    def earliest_due_date(self) -> Optional[date]:
+        due = self._due
+        ordinal = min((due[i] for i in self._positions() if due[i]), default=_NO_DATE)
+        return _date_from_ordinal(ordinal) if ordinal else None
+
+    def latest_issue_date(self) -> Optional[date]:
+        issued = self._issued
+        ordinal = max(issued[i] for i in self._positions()) if len(self) else _NO_DATE
+        return _date_from_ordinal(ordinal) if ordinal else None
+
+    def _positions(self) -> Iterable[int]:
+        return range(len(self._amounts)) if self._index is None else self._index
+
+    def _view(self, positions: Iterable[int]) -> InvoiceTable:
+        view = InvoiceTable.__new__(InvoiceTable)
+        view._amounts = self._amounts
+        view._due = self._due
+        view._issued = self._issued
+        view._numbers = self._numbers
+        view._contracts = self._contracts
+        view._index = array("q", positions)
+        return view
+
+
+class BalanceSnapshot(NamedTuple):
+    """Immutable view of every outstanding invoice from a single refresh.
+
+    Aggregates are computed once in :meth:`from_table` over the integer
+    columns; consumers only read fields. Invoices are ordered by due date,
+    undated ones last. On accounts with several contracts the fields cover
+    all of them and ``contracts`` holds a snapshot per contract, which
+    ``by_contract`` maps by contract id (empty for single accounts).
+    """
+
+    invoices: tuple[BalanceInfo, ...]
+    total: float
+    count: int
+    earliest_due_date: Optional[date]
+    overdue_amount: float
+    overdue_count: int
+    largest: Optional[BalanceInfo]
+    latest_issue_date: Optional[date]
+    fetched_at: datetime
+    contracts: tuple[tuple[Contract, BalanceSnapshot], ...] = ()
+    by_contract: Mapping[str, BalanceSnapshot] = MappingProxyType({})
+
+    @classmethod
+    def from_balances(
+        cls,
+        balances: list[BalanceInfo],
+        fetched_at: datetime,
+        contracts: Iterable[Contract] = (),
+    ) -> BalanceSnapshot:
+        contracts = tuple(contracts)
+        if not contracts:
+            return cls.from_table(InvoiceTable.from_balances(balances), fetched_at)
+        parts = [
+            (
+                contract,
+                cls.from_table(
+                    InvoiceTable.from_balances(
+                        item for item in balances if item.contract == contract.id
+                    ),
+                    fetched_at,
+                ),
+            )
+            for contract in contracts
+        ]
+        return cls.combine(parts, fetched_at)
+
+    @classmethod
+    def from_table(cls, table: InvoiceTable, fetched_at: datetime) -> BalanceSnapshot:
+        rows = table.identified()
+        if not rows:
+            # Only summary labels were found; they repeat one total, not add up.
+            rows = table.largest()
+        return cls._aggregate(rows, fetched_at)
+
+    @classmethod
+    def combine(
+        cls, parts: Iterable[tuple[Contract, BalanceSnapshot]], fetched_at: datetime
+    ) -> BalanceSnapshot:
+        """Account-wide snapshot over the per-contract snapshots ``parts``."""
+        parts = tuple(parts)
+        table = InvoiceTable.from_balances(
+            item for _, part in parts for item in part.invoices
+        )
+        return cls._aggregate(table, fetched_at, parts)
+
+    @classmethod
+    def _aggregate(
+        cls,
+        rows: InvoiceTable,
+        fetched_at: datetime,
+        contracts: tuple[tuple[Contract, BalanceSnapshot], ...] = (),
+    ) -> BalanceSnapshot:
+        largest = rows.largest()
+        rows = rows.sorted_by_due()
+        overdue = rows.due_before(fetched_at.date())
+        return cls(
+            invoices=rows.rows(),
+            total=rows.total_grosze() / 100,
+            count=len(rows),
+            earliest_due_date=rows.earliest_due_date(),
+            overdue_amount=overdue.total_grosze() / 100,
+            overdue_count=len(overdue),
+            largest=next(iter(largest), None),
+            latest_issue_date=rows.latest_issue_date(),
+            fetched_at=fetched_at,
+            contracts=contracts,
+            by_contract=MappingProxyType(
+                {contract.id: part for contract, part in contracts}
+            ),
+        )
+
+
+@dataclass
+class _FinanceAnalysis:
+    """Result of a single parse of a finance document."""
+
+    invoices: InvoiceTable
+    no_outstanding: bool = False
+
+
+class _PayloadTooLargeError(Exception):
+    """A response body exceeded the configured size limit."""
+
+
+@dataclass
+class PhaseStats:
+    """Wall time, request count and response body bytes of one scraper phase.
+
+    ``bytes`` counts decoded bodies, ``wire_bytes`` what was transferred
+    before content decoding (the same when the response was not compressed).
+    """
+
+    seconds: float = 0.0
+    requests: int = 0
+    bytes: int = 0
+    wire_bytes: int = 0
+
+
+class ScrapeMetrics:
+    """Per-phase statistics of the most recent scraper call.
+
+    Pass an instance to ``PgeScraper`` to enable collection; without one the
+    scraper uses a shared no-op recorder.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.phases: dict[str, PhaseStats] = {}
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        self.phases = {}
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        self.phases.setdefault(phase, PhaseStats()).seconds += seconds
+
+    def record_request(self, phase: str, size: int, wire_size: Optional[int] = None) -> None:
+        # Warmup and hedged requests are recorded from worker threads.
+        with self._lock:
+            stats = self.phases.setdefault(phase, PhaseStats())
+            stats.requests += 1
+            stats.bytes += size
+            stats.wire_bytes += size if wire_size is None else wire_size
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """Return the phases plus a ``total`` row, e.g. for JSON output."""
+        result = {name: asdict(stats) for name, stats in self.phases.items()}
+        result["total"] = {
+            "seconds": sum(stats.seconds for stats in self.phases.values()),
+            "requests": sum(stats.requests for stats in self.phases.values()),
+            "bytes": sum(stats.bytes for stats in self.phases.values()),
+            "wire_bytes": sum(stats.wire_bytes for stats in self.phases.values()),
+        }
+        return result
+
+
+class _DisabledMetrics(ScrapeMetrics):
+    enabled = False
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        pass
+
+    def record_request(self, phase: str, size: int, wire_size: Optional[int] = None) -> None:
+        pass
+
+
+_NO_METRICS = _DisabledMetrics()
 
 
 @dataclass
 class PgeScraper:
-    """Scrapes outstanding payment data from the PGE Sensor portal."""
+    """Scrapes outstanding payment data from the PGE Sensor portal.
+
+    Finance pages are streamed, and bodies larger than ``max_finance_bytes``
+    are rejected before they are buffered in full. When the dashboard lists
+    several contracts (delivery points), each one's finance page is fetched
+    over the same session, ``contract_concurrency`` at a time.
+    """
 
     username: str
     password: str
     session: Optional[requests.Session] = None
     timeout: int = 15
+    hedge_delay: Optional[float] = None
+    metrics: Optional[ScrapeMetrics] = None
+    base_url: Optional[str] = None
+    max_finance_bytes: int = DEFAULT_MAX_FINANCE_BYTES
+    contract_concurrency: int = DEFAULT_CONTRACT_CONCURRENCY
 
     LOGIN_URL: str = "https://ebok.gkpge.pl/ebok/profil/logowanie.xhtml"
     DASHBOARD_URL: str = "https://ebok.gkpge.pl/ebok/"
@@ -54,11 +567,48 @@ class PgeScraper:
     _AMOUNT_REGEX = re.compile(
         r"(?:\d{1,3}(?:[\s\xa0]\d{3})*(?:[\.,]\d{2})|\d+[\.,]\d{2})"
     )
+    _NO_OUTSTANDING_HINTS = (
+        "brak nale\u017cno\u015bci",
+        "brak zaleg\u0142o\u015bci",
+        "brak dokument\u00f3w do zap\u0142aty",
+        "brak faktur do zap\u0142aty",
+        "brak rachunk\u00f3w do zap\u0142aty",
+        "brak p\u0142atno\u015bci do realizacji",
+        "wszystkie p\u0142atno\u015bci zosta\u0142y uregulowane",
+        "nie masz \u017cadnych zaleg\u0142o\u015bci",
+    )
+    _ZERO_BALANCE_REGEX = re.compile(
+        r"(saldo|do zap(?:\u0142|l)aty|kwota do zap(?:\u0142|l)aty)[^0-9]{0,80}(0[,\.]00)"
+    )
+    # Per-request tokens that change on every response without the finance
+    # data changing; stripped before fingerprinting a payload.
+    _VOLATILE_TOKEN_REGEX = re.compile(
+        r"<update[^>]*javax\.faces\.ViewState[^>]*>.*?</update>"
+        r"|<input[^>]*javax\.faces\.ViewState[^>]*>"
+        r"|;jsessionid=[\w.\-]+"
+        r"|\snonce=\"[^\"]*\"",
+        re.IGNORECASE | re.DOTALL,
+    )
+    # Contract / delivery point switcher on the dashboard of business accounts
+    # and the query parameter selecting a contract on the finance page.
+    _CONTRACT_SELECTOR = (
+        'select[id*="umow" i] option[value], select[id*="ppe" i] option[value]'
+    )
+    _CONTRACT_PARAM = "umowa"
 
     def __post_init__(self) -> None:
         if not self.username or not self.password:
             raise ValueError("Username and password must be provided")
-        self._session = self.session or requests.Session()
+        if self.base_url:
+            # Point every portal URL at another host, e.g. a local test portal.
+            self.LOGIN_URL = _rebase_url(self.LOGIN_URL, self.base_url)
+            self.DASHBOARD_URL = _rebase_url(self.DASHBOARD_URL, self.base_url)
+            self.INDEX_URL = _rebase_url(self.INDEX_URL, self.base_url)
+            self.FINANCE_URL = _rebase_url(self.FINANCE_URL, self.base_url)
+            self.FINANCE_FALLBACK_URLS = tuple(
+                _rebase_url(url, self.base_url) for url in self.FINANCE_FALLBACK_URLS
+            )
+        self._session = self.session or create_session()
         default_headers = {
             "User-Agent": self.USER_AGENT,
             "Accept": (
@@ -66,12 +616,22 @@ class PgeScraper:
                 "image/avif,image/webp,*/*;q=0.8"
             ),
             "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": accepted_encodings(),
             "Connection": "keep-alive",
         }
         for header, value in default_headers.items():
             self._session.headers.setdefault(header, value)
         self._authenticated = False
+        self._metrics = self.metrics if self.metrics is not None else _NO_METRICS
+        self._phase = "other"
+        self._preferred_finance_url = self.FINANCE_URL
+        # None until the dashboard was seen; empty for single-contract accounts.
+        self._contracts: Optional[tuple[Contract, ...]] = None
+        self._contract_switch_warned = False
+        # Last fingerprint and analysis per contract id (None: the only view).
+        self._parse_cache: dict[Optional[str], tuple[str, _FinanceAnalysis]] = {}
+        self._parse_cache_hits = 0
+        self._parse_cache_misses = 0
 
     def get_balance(self) -> float:
         """Authenticate if needed and return just the amount."""
@@ -79,16 +639,151 @@ class PgeScraper:
 
     def get_balance_details(self) -> BalanceInfo:
         """Return the highest outstanding payment along with its due date."""
-        if not self._authenticated:
+        snapshot = self.get_snapshot()
+        return snapshot.largest or BalanceInfo(amount=0.0)
+
+    def get_snapshot(self, now: Optional[datetime] = None) -> BalanceSnapshot:
+        """Return every outstanding invoice with aggregates as of ``now``.
+
+        On accounts with several contracts the snapshot covers all of them
+        and carries a snapshot per contract (see ``BalanceSnapshot.by_contract``).
+        """
+        self._metrics.reset()
+        fresh_login = not self._authenticated
+        if fresh_login:
+            self._login()
+        try:
+            payloads = self._fetch_finance_payloads()
+        except PgeSessionExpiredError:
+            if fresh_login:
+                raise
+            _LOGGER.debug("Portal session for %s expired, logging in again", self.username)
+            self._reset_session()
             self._login()
-        payload = self._fetch_finance_payload()
-        balances = self._extract_balance_info(payload)
-        if not balances:
-            raise PgeScraperError("Could not find any outstanding payments in response")
-        return max(balances, key=lambda item: item.amount)
+            payloads = self._fetch_finance_payloads()
+        fetched_at = now or datetime.now().astimezone()
+        with self._timed_phase("parse"):
+            return self._snapshot_from_payloads(payloads, fetched_at)
+
+    @property
+    def contracts(self) -> tuple[Contract, ...]:
+        """Contracts found on the dashboard; empty for single-contract accounts."""
+        return self._contracts or ()
+
+    @property
+    def parse_cache_stats(self) -> dict[str, int]:
+        """Hit/miss counters of the finance payload fingerprint cache."""
+        return {"hits": self._parse_cache_hits, "misses": self._parse_cache_misses}
+
+    def export_session(self) -> dict[str, Any]:
+        """Return a JSON-serialisable snapshot of the authenticated session."""
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "host_only": not cookie.domain_specified,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "httponly": cookie.has_nonstandard_attr("HttpOnly"),
+                "expires": cookie.expires,
+            }
+            for cookie in self._session.cookies
+        ]
+        return {
+            "username": self.username,
+            "authenticated": self._authenticated,
+            "cookies": cookies,
+            "contracts": (
+                None if self._contracts is None else [list(item) for item in self._contracts]
+            ),
+        }
+
+    def restore_session(self, state: Optional[Mapping[str, Any]]) -> bool:
+        """Load cookies saved by export_session; return True when usable.
+
+        A restored session is trusted until the next finance request. If the
+        portal answers that request with its login form, get_balance_details
+        logs in again and retries once, so a stale cache costs one extra login.
+        """
+        if not state or state.get("username") != self.username:
+            return False
+        if not state.get("authenticated"):
+            return False
+        now = time.time()
+        restored = 0
+        for item in state.get("cookies") or ():
+            expires = item.get("expires")
+            if expires is not None and expires <= now:
+                continue
+            cookie = requests.cookies.create_cookie(
+                name=item["name"],
+                value=item["value"],
+                domain=item.get("domain", ""),
+                path=item.get("path", "/"),
+                secure=bool(item.get("secure")),
+                expires=expires,
+                rest={"HttpOnly": None} if item.get("httponly") else {},
+            )
+            # create_cookie marks every cookie with a domain as domain-specified.
+            if item.get("host_only"):
+                cookie.domain_specified = False
+            self._session.cookies.set_cookie(cookie)
+            restored += 1
+        if not restored:
+            return False
+        contracts = state.get("contracts")
+        if contracts is not None:
+            self._contracts = tuple(Contract(*item) for item in contracts)
+        self._authenticated = True
+        return True
+
+    @contextlib.contextmanager
+    def _timed_phase(self, phase: str) -> Iterator[None]:
+        self._phase = phase
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._phase = "other"
+            self._metrics.record_phase(phase, elapsed)
+            _LOGGER.debug("%s phase for %s took %.3f s", phase, self.username, elapsed)
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        phase = self._phase
+        response = self._session.request(method, url, timeout=self.timeout, **kwargs)
+        self._metrics.record_request(phase, len(response.content), _wire_size(response))
+        return response
+
+    def _send_streamed(self, url: str, **kwargs: Any) -> tuple[requests.Response, str]:
+        phase = self._phase
+        max_bytes = self.max_finance_bytes
+        with self._session.get(url, timeout=self.timeout, stream=True, **kwargs) as response:
+            length = response.headers.get("Content-Length", "")
+            if length.isdigit() and int(length) > max_bytes:
+                self._metrics.record_request(phase, 0, 0)
+                raise _PayloadTooLargeError(f"body of {length} bytes exceeds {max_bytes} bytes")
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")("replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            parts: list[str] = []
+            size = 0
+            try:
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise _PayloadTooLargeError(f"body exceeds {max_bytes} bytes")
+                    parts.append(decoder.decode(chunk))
+                parts.append(decoder.decode(b"", final=True))
+            finally:
+                self._metrics.record_request(phase, size, _wire_size(response))
+        return response, "".join(parts)
 
     def _login(self) -> None:
-        view_state = self._fetch_view_state()
+        with self._timed_phase("view_state"):
+            view_state = self._fetch_view_state()
         payload = {
             "hiddenLoginForm": "hiddenLoginForm",
             "hiddenLoginForm:hiddenLogin": self.username,
@@ -97,116 +792,357 @@ class PgeScraper:
             "javax.faces.ViewState": view_state,
         }
         try:
-            response = self._session.post(
-                self.LOGIN_URL,
-                data=payload,
-                headers={"Referer": self.LOGIN_URL},
-                timeout=self.timeout,
-            )
+            with self._timed_phase("login"):
+                response = self._send(
+                    "POST",
+                    self.LOGIN_URL,
+                    data=payload,
+                    headers={"Referer": self.LOGIN_URL},
+                )
             response.raise_for_status()
         except requests.RequestException as exc:
-            raise PgeScraperError("Login request failed") from exc
+            raise PgeNetworkError("Login request failed") from exc
         if self._is_login_response(response):
-            raise PgeScraperError(
+            raise PgeAuthError(
                 "Login failed: incorrect credentials or additional verification required"
             )
         if "weryfikacja" in (response.url or "").lower():
-            raise PgeScraperError(
+            raise PgeVerificationRequiredError(
                 "Portal requires additional verification. Complete it in the browser first."
             )
-        self._post_login_warmup()
+        with self._timed_phase("warmup"):
+            self._post_login_warmup()
         self._authenticated = True
 
+    def _reset_session(self) -> None:
+        self._session.cookies.clear()
+        self._authenticated = False
+
     def _fetch_view_state(self) -> str:
         try:
-            response = self._session.get(self.LOGIN_URL, timeout=self.timeout)
+            response = self._send("GET", self.LOGIN_URL)
             response.raise_for_status()
         except requests.RequestException as exc:
-            raise PgeScraperError("Unable to load login form") from exc
-        soup = BeautifulSoup(response.text, "html.parser")
+            raise PgeNetworkError("Unable to load login form") from exc
+        soup = _make_soup(response.text, parse_only=SoupStrainer("input"))
         view_state = soup.find("input", attrs={"name": "javax.faces.ViewState"})
         if not view_state or not view_state.get("value"):
-            raise PgeScraperError("Missing javax.faces.ViewState token on login page")
+            raise PgeLayoutChangedError("Missing javax.faces.ViewState token on login page")
         return view_state["value"]
 
     @staticmethod
     def _is_login_response(response: requests.Response) -> bool:
-        url = (response.url or "").lower()
-        if "logowanie" in url:
+        return PgeScraper._is_login_page(response.url, response.text)
+
+    @staticmethod
+    def _is_login_page(url: Optional[str], text: str) -> bool:
+        if "logowanie" in (url or "").lower():
             return True
-        return "hiddenLoginForm:hiddenLogin" in response.text
+        return "hiddenLoginForm:hiddenLogin" in text
 
     def _post_login_warmup(self) -> None:
-        for url in (self.DASHBOARD_URL, self.INDEX_URL):
-            try:
-                resp = self._session.get(url, timeout=self.timeout)
-                _LOGGER.debug("Warmup GET %s -> %s", url, resp.status_code)
-            except requests.RequestException as exc:
-                _LOGGER.debug("Warmup GET %s failed: %s", url, exc)
+        urls = (self.DASHBOARD_URL, self.INDEX_URL)
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            responses = list(executor.map(self._warmup_get, urls))
+        if any(resp is not None and self._is_login_response(resp) for resp in responses):
+            raise PgeAuthError(
+                "Login failed: portal did not keep the session after signing in"
+            )
+        dashboard = responses[0]
+        if dashboard is not None and dashboard.ok:
+            self._contracts = self._discover_contracts(dashboard.text)
 
-    def _fetch_finance_payload(self) -> str:
+    def _known_contracts(self) -> tuple[Contract, ...]:
+        if self._contracts is None:
+            # A restored session that never saw the dashboard.
+            with self._timed_phase("warmup"):
+                dashboard = self._warmup_get(self.DASHBOARD_URL)
+            if dashboard is None or not dashboard.ok:
+                return ()
+            if self._is_login_response(dashboard):
+                raise PgeSessionExpiredError(
+                    "Portal session expired: dashboard redirected to login"
+                )
+            self._contracts = self._discover_contracts(dashboard.text)
+        return self._contracts
+
+    @classmethod
+    def _discover_contracts(cls, html: str) -> tuple[Contract, ...]:
+        soup = _make_soup(html, parse_only=SoupStrainer("select"))
+        contracts: dict[str, Contract] = {}
+        for option in soup.select(cls._CONTRACT_SELECTOR):
+            value = option.get("value", "").strip()
+            if value and value not in contracts:
+                contracts[value] = Contract(value, option.get_text(" ", strip=True) or value)
+        # A switcher with a single entry is the plain one-view account.
+        return tuple(contracts.values()) if len(contracts) > 1 else ()
+
+    def _warmup_get(self, url: str) -> Optional[requests.Response]:
+        try:
+            resp = self._send("GET", url)
+        except requests.RequestException as exc:
+            _LOGGER.debug("Warmup GET %s failed: %s", url, exc)
+            return None
+        _LOGGER.debug("Warmup GET %s -> %s", url, resp.status_code)
+        return resp
+
+    def _fetch_finance_payloads(self) -> list[tuple[Optional[Contract], str]]:
+        contracts = self._known_contracts()
+        with self._timed_phase("finance"):
+            if not contracts:
+                return [(None, self._fetch_finance_payload())]
+            workers = max(1, min(len(contracts), self.contract_concurrency))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                payloads = list(executor.map(self._fetch_finance_payload, contracts))
+        return list(zip(contracts, payloads))
+
+    def _fetch_finance_payload(self, contract: Optional[Contract] = None) -> str:
         errors: list[str] = []
+        params = None if contract is None else {self._CONTRACT_PARAM: contract.id}
+        urls = [self._preferred_finance_url]
+        urls.extend(url for url in self.FINANCE_FALLBACK_URLS if url not in urls)
+        if self.hedge_delay is None:
+            for url in urls:
+                result = self._fetch_finance_url(url, errors, params)
+                if result is not None:
+                    break
+        else:
+            result = self._fetch_finance_hedged(urls, errors, params)
+        if result is not None:
+            url, payload = result
+            if url != self.FINANCE_URL:
+                _LOGGER.debug("Using fallback finance endpoint %s", url)
+            self._preferred_finance_url = url
+            return payload
+        target = "" if contract is None else f" of contract {contract.id}"
+        raise PgeNetworkError(
+            f"Unable to retrieve finance data{target}: " + "; ".join(errors)
+        )
+
+    def _fetch_finance_hedged(
+        self, urls: list[str], errors: list[str], params: Optional[dict[str, str]] = None
+    ) -> Optional[tuple[str, str]]:
+        executor = ThreadPoolExecutor(max_workers=len(urls))
+        futures: list[Future[Optional[tuple[str, str]]]] = []
+        try:
+            for index, url in enumerate(urls):
+                futures.append(executor.submit(self._fetch_finance_url, url, errors, params))
+                last = index == len(urls) - 1
+                result = self._first_result(futures, None if last else self.hedge_delay)
+                if result is not None:
+                    return result
+            return None
+        finally:
+            # Requests already on the wire cannot be aborted; let them finish
+            # in the background and drop their results.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _first_result(
+        futures: list[Future[Optional[tuple[str, str]]]], timeout: Optional[float]
+    ) -> Optional[tuple[str, str]]:
+        """Wait for the first successful future; None on timeout or if all failed."""
+        pending = {future for future in futures if not future.done()}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                return None
+            for future in done:
+                result = future.result()
+                if result is not None:
+                    return result
+        return None
+
+    def _fetch_finance_url(
+        self, url: str, errors: list[str], params: Optional[dict[str, str]] = None
+    ) -> Optional[tuple[str, str]]:
         headers = {"Referer": self.INDEX_URL}
-        for url in self.FINANCE_FALLBACK_URLS:
-            try:
-                response = self._session.get(url, timeout=self.timeout, headers=headers)
-                response.raise_for_status()
-                if url != self.FINANCE_URL:
-                    _LOGGER.debug("Using fallback finance endpoint %s", url)
-                return response.text
-            except requests.HTTPError as exc:
-                status = exc.response.status_code if exc.response else "?"
-                snippet = exc.response.text[:160].strip() if exc.response else ""
-                errors.append(f"{url} -> {status}: {snippet}")
-            except requests.RequestException as exc:
-                errors.append(f"{url} -> network error: {exc}")
-        raise PgeScraperError(
-            "Unable to retrieve finance data: " + "; ".join(errors)
+        try:
+            response, text = self._send_streamed(url, headers=headers, params=params)
+        except requests.RequestException as exc:
+            errors.append(f"{url} -> network error: {exc}")
+            return None
+        except _PayloadTooLargeError as exc:
+            errors.append(f"{url} -> {exc}")
+            return None
+        if response.status_code >= 400:
+            errors.append(f"{url} -> {response.status_code}: {text[:160].strip()}")
+            return None
+        if self._is_login_page(response.url, text):
+            raise PgeSessionExpiredError(
+                "Portal session expired: finance page redirected to login"
+            )
+        return url, text
+
+    def _snapshot_from_payloads(
+        self, payloads: list[tuple[Optional[Contract], str]], fetched_at: datetime
+    ) -> BalanceSnapshot:
+        if payloads[0][0] is None:
+            return self._snapshot_from_payload(payloads[0][1], None, fetched_at)
+        fingerprints = [self._fingerprint_payload(payload) for _, payload in payloads]
+        if len(set(fingerprints)) == 1:
+            # Every contract got the same page, so the portal did not switch
+            # contracts; summing the pages would count one account N times.
+            if not self._contract_switch_warned:
+                self._contract_switch_warned = True
+                _LOGGER.warning(
+                    "Finance pages of the %d contracts of %s are identical, "
+                    "reading them as one account",
+                    len(payloads),
+                    self.username,
+                )
+            return self._snapshot_from_payload(
+                payloads[0][1], None, fetched_at, fingerprints[0]
+            )
+        parts = []
+        seen: set[str] = set()
+        for (contract, payload), fingerprint in zip(payloads, fingerprints):
+            if fingerprint in seen:
+                _LOGGER.debug(
+                    "Contract %s got the finance page of another contract, counting it once",
+                    contract.id,
+                )
+                continue
+            seen.add(fingerprint)
+            snapshot = self._snapshot_from_payload(payload, contract, fetched_at, fingerprint)
+            parts.append((contract, snapshot))
+        return BalanceSnapshot.combine(parts, fetched_at)
+
+    def _snapshot_from_payload(
+        self,
+        raw_payload: str,
+        contract: Optional[Contract],
+        fetched_at: datetime,
+        fingerprint: Optional[str] = None,
+    ) -> BalanceSnapshot:
+        analysis = self._analyse_cached(
+            raw_payload, contract.id if contract else None, fingerprint
+        )
+        if not analysis.invoices:
+            if not analysis.no_outstanding:
+                raise PgeLayoutChangedError(
+                    "Could not find any outstanding payments in response"
+                )
+            _LOGGER.debug(
+                "No outstanding payments detected for %s%s",
+                self.username,
+                f" ({contract.id})" if contract else "",
+            )
+        invoices = analysis.invoices
+        if contract is not None:
+            invoices = invoices.tagged(contract.id)
+        return BalanceSnapshot.from_table(invoices, fetched_at)
+
+    def _analyse_cached(
+        self,
+        raw_payload: str,
+        contract_id: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ) -> _FinanceAnalysis:
+        fingerprint = fingerprint or self._fingerprint_payload(raw_payload)
+        cached = self._parse_cache.get(contract_id)
+        if cached is not None and cached[0] == fingerprint:
+            self._parse_cache_hits += 1
+            _LOGGER.debug("Finance payload unchanged (%s), reusing parsed data", fingerprint)
+            return cached[1]
+        self._parse_cache_misses += 1
+        analysis = self._analyse_finance_payload(raw_payload)
+        self._parse_cache[contract_id] = (fingerprint, analysis)
+        return analysis
+
+    @classmethod
+    def _fingerprint_payload(cls, raw_payload: str) -> str:
+        stable = cls._VOLATILE_TOKEN_REGEX.sub("", raw_payload)
+        digest = hashlib.blake2b(
+            stable.encode("utf-8", "surrogatepass"), digest_size=16
         )
+        return digest.hexdigest()
 
     @classmethod
-    def _extract_balance_info(cls, raw_payload: str) -> list[BalanceInfo]:
+    def _analyse_finance_payload(cls, raw_payload: str) -> _FinanceAnalysis:
+        """Parse a finance document once and collect everything we need.
+
+        Partial responses are read from their ``<update>`` fragments. When
+        those hold no invoices, the whole payload is parsed as HTML and also
+        searched for the no-outstanding message, as a table or message may
+        sit outside the fragments.
+        """
+        markup = cls._finance_markup(raw_payload)
+        soup = _make_soup(markup)
+        invoices = cls._extract_from_soup(soup)
+        from_fragments = markup is not raw_payload
+        if not invoices and from_fragments:
+            soup = _make_soup(raw_payload)
+            invoices = cls._extract_from_soup(soup)
+        if invoices:
+            return _FinanceAnalysis(invoices)
+        no_outstanding = cls._has_no_outstanding_hint(soup.get_text(" ")) or (
+            from_fragments and cls._has_no_outstanding_hint(raw_payload)
+        )
+        return _FinanceAnalysis(invoices, no_outstanding)
+
+    @classmethod
+    def _extract_balance_info(cls, raw_payload: str) -> InvoiceTable:
+        markup = cls._finance_markup(raw_payload)
+        invoices = cls._extract_from_html(markup)
+        if not invoices and markup is not raw_payload:
+            invoices = cls._extract_from_html(raw_payload)
+        return invoices
+
+    @classmethod
+    def _finance_markup(cls, raw_payload: str) -> str:
         snapshot = raw_payload.lstrip()
-        balances: list[BalanceInfo] = []
         if snapshot.startswith("<?xml") or "<partial-response" in snapshot[:200]:
             try:
-                balances.extend(cls._extract_from_partial(snapshot))
+                return cls._partial_fragments(snapshot)
             except PgeScraperError as err:
                 _LOGGER.debug(
                     "Partial-response parsing failed, falling back to HTML: %s", err
                 )
-        if not balances:
-            balances.extend(cls._extract_from_html(raw_payload))
-        return balances
+        return raw_payload
 
     @classmethod
-    def _extract_from_partial(cls, partial_xml: str) -> list[BalanceInfo]:
+    def _has_no_outstanding_hint(cls, text: str) -> bool:
+        simplified = " ".join(text.lower().split())
+        if any(marker in simplified for marker in cls._NO_OUTSTANDING_HINTS):
+            return True
+        if "0,00" not in simplified and "0.00" not in simplified:
+            return False
+        return bool(cls._ZERO_BALANCE_REGEX.search(simplified))
+
+    @staticmethod
+    def _partial_fragments(partial_xml: str) -> str:
         try:
             root = ET.fromstring(partial_xml)
         except ET.ParseError as exc:
-            raise PgeScraperError("Finance response is not valid XML") from exc
-        balances: list[BalanceInfo] = []
-        for update_node in root.findall(".//update"):
-            html_fragment = update_node.text or ""
-            balances.extend(cls._extract_from_html(html_fragment))
-        return balances
+            raise PgeLayoutChangedError("Finance response is not valid XML") from exc
+        return "\n".join(node.text or "" for node in root.iter("update"))
+
+    @classmethod
+    def _extract_from_partial(cls, partial_xml: str) -> InvoiceTable:
+        return cls._extract_from_html(cls._partial_fragments(partial_xml))
 
     @classmethod
-    def _extract_from_html(cls, html_payload: str) -> list[BalanceInfo]:
-        soup = BeautifulSoup(html_payload, "html.parser")
-        balances = cls._extract_from_invoice_tables(soup)
-        if not balances:
+    def _extract_from_html(cls, html_payload: str) -> InvoiceTable:
+        return cls._extract_from_soup(_make_soup(html_payload))
+
+    @classmethod
+    def _extract_from_soup(cls, soup: BeautifulSoup) -> InvoiceTable:
+        invoices = cls._extract_from_invoice_tables(soup)
+        if not invoices:
             for label in soup.select(
                 '[id*="amountToPay" i], .amount-to-pay, .do-zaplaty-label'
             ):
-                amount = cls._extract_amount_from_text(label.get_text(" ", strip=True))
+                amount = cls._amount_grosze(label.get_text(" ", strip=True))
                 if amount is not None:
-                    balances.append(BalanceInfo(amount=amount))
-        return balances
+                    invoices.append(amount)
+        return invoices
 
     @classmethod
-    def _extract_from_invoice_tables(cls, soup: BeautifulSoup) -> list[BalanceInfo]:
-        balances: list[BalanceInfo] = []
+    def _extract_from_invoice_tables(cls, soup: BeautifulSoup) -> InvoiceTable:
+        invoices = InvoiceTable()
         tables = []
         for thead in soup.select("thead[id*='fakturaDoZaplaty']"):
             table = thead.find_parent("table")
@@ -227,69 +1163,948 @@ class PgeScraper:
                 cells = row.find_all("td")
                 if len(cells) < 4:
                     continue
-                invoice_number = cells[0].get_text(" ", strip=True) or None
-                issue_date = cls._parse_date(cells[1].get_text(" ", strip=True))
-                due_date = cls._parse_date(cells[2].get_text(" ", strip=True))
-                amount = cls._extract_amount_from_text(
-                    cells[3].get_text(" ", strip=True)
-                )
+                amount = cls._amount_grosze(cells[3].get_text(" ", strip=True))
                 if amount is None:
                     continue
-                balances.append(
-                    BalanceInfo(
-                        amount=amount,
-                        due_date=due_date,
-                        invoice_number=invoice_number,
-                        issue_date=issue_date,
-                    )
+                invoices.append(
+                    amount,
+                    due=cls._date_ordinal(cells[2].get_text(" ", strip=True)),
+                    issued=cls._date_ordinal(cells[1].get_text(" ", strip=True)),
+                    number=cells[0].get_text(" ", strip=True) or None,
                 )
-        return balances
+        return invoices
 
+    # Cell texts repeat across rows and refreshes (due dates above all), so
+    # decoding is memoised; both caches are bounded.
     @staticmethod
-    def _parse_date(value: str) -> Optional[date]:
-        if not value:
-            return None
+    @functools.lru_cache(maxsize=4096)
+    def _date_ordinal(value: str) -> int:
+        """Decode ``DD.MM.YYYY`` to a date ordinal, 0 when it is not a date."""
+        day, _, rest = value.strip().partition(".")
+        month, _, year = rest.partition(".")
+        if not (day.isdigit() and month.isdigit() and year.isdigit() and len(year) == 4):
+            return _NO_DATE
         try:
-            return datetime.strptime(value.strip(), "%d.%m.%Y").date()
+            return date(int(year), int(month), int(day)).toordinal()
         except ValueError:
-            return None
+            return _NO_DATE
 
-    @classmethod
-    def _extract_amount_from_text(cls, text: str) -> Optional[float]:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _amount_grosze(text: str) -> Optional[int]:
+        """Decode the last amount in ``text`` to grosze."""
         if not text:
             return None
-        cleaned_text = text.replace("PLN", "").replace("zł", "")
-        matches = cls._AMOUNT_REGEX.findall(cleaned_text)
+        matches = PgeScraper._AMOUNT_REGEX.findall(text.replace("PLN", "").replace("zł", ""))
         if not matches:
             return None
-        numeric = matches[-1]
-        cleaned = (
-            numeric.replace("\xa0", "")
-            .replace(" ", "")
-            .replace(",", ".")
+        # Every match ends in a separator and two decimals, so its digits
+        # alone are the amount in grosze.
+        return int("".join(char for char in matches[-1] if char.isdigit()))
+
+
+def _default_session_cache(username: str) -> Path:
+    digest = hashlib.sha256(username.lower().encode("utf-8")).hexdigest()[:16]
+    return _SESSION_CACHE_DIR / f"session-{digest}.json"
+
+
+def _load_session_cache(path: Path) -> Optional[dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        _LOGGER.debug("Ignoring unreadable session cache %s: %s", path, exc)
+        return None
+
+
+def _save_session_cache(path: Path, state: Mapping[str, Any]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        _LOGGER.debug("Unable to write session cache %s: %s", path, exc)
+
+
+def _load_history_module() -> ModuleType:
+    # The integration's history module only needs the standard library, so
+    # the CLI runs the same schema, diff query and retention from its file.
+    path = Path(__file__).resolve().parent / "custom_components" / "pge_sensor" / "history.py"
+    spec = importlib.util.spec_from_file_location("pge_sensor_history", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_history = _load_history_module()
+InvoiceChange = _history.InvoiceChange
+InvoiceHistory = _history.InvoiceHistory
+
+
+def _record_history(
+    history: InvoiceHistory, username: str, snapshot: BalanceSnapshot
+) -> list[InvoiceChange]:
+    try:
+        return history.record(username, snapshot)
+    except sqlite3.Error as exc:
+        _LOGGER.warning("Could not update invoice history for %s: %s", username, exc)
+        return []
+
+
+def _read_accounts(source: TextIO) -> list[tuple[str, str]]:
+    """Parse ``username:password`` or JSON object lines; skip blanks and comments."""
+    accounts: list[tuple[str, str]] = []
+    for line_no, raw_line in enumerate(source, start=1):
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                entry = json.loads(line)
+                accounts.append((entry["username"], entry["password"]))
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ValueError(f"Invalid account entry on line {line_no}") from exc
+            continue
+        username, sep, password = line.partition(":")
+        if not sep or not username or not password:
+            raise ValueError(f"Invalid account entry on line {line_no}")
+        accounts.append((username.strip(), password))
+    return accounts
+
+
+def _balance_to_dict(balance: BalanceInfo) -> dict[str, Any]:
+    result = {
+        "amount": round(balance.amount, 2),
+        "due_date": balance.due_date.isoformat() if balance.due_date else None,
+        "invoice_number": balance.invoice_number,
+        "issue_date": balance.issue_date.isoformat() if balance.issue_date else None,
+    }
+    if balance.contract is not None:
+        result["contract"] = balance.contract
+    return result
+
+
+def _snapshot_to_dict(snapshot: BalanceSnapshot) -> dict[str, Any]:
+    """Largest invoice at the top level (as before) plus the aggregates.
+
+    Accounts with several contracts also get ``contracts``, the aggregates of
+    each contract keyed by its id.
+    """
+    earliest = snapshot.earliest_due_date
+    result = {
+        **_balance_to_dict(snapshot.largest or BalanceInfo(amount=0.0)),
+        "total": snapshot.total,
+        "count": snapshot.count,
+        "earliest_due_date": earliest.isoformat() if earliest else None,
+        "overdue_amount": snapshot.overdue_amount,
+        "invoices": [_balance_to_dict(item) for item in snapshot.invoices],
+        "fetched_at": snapshot.fetched_at.isoformat(),
+    }
+    if snapshot.contracts:
+        result["contracts"] = {
+            contract.id: {
+                "label": contract.label,
+                "total": part.total,
+                "count": part.count,
+                "earliest_due_date": (
+                    part.earliest_due_date.isoformat() if part.earliest_due_date else None
+                ),
+                "overdue_amount": part.overdue_amount,
+            }
+            for contract, part in snapshot.contracts
+        }
+    return result
+
+
+def _error_to_dict(error: Exception) -> dict[str, Any]:
+    return {
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "error_kind": getattr(error, "kind", PgeScraperError.kind),
+    }
+
+
+def _scrape_account(
+    username: str,
+    password: str,
+    *,
+    timeout: int,
+    hedge_delay: Optional[float] = None,
+    session: Optional[requests.Session] = None,
+    cache_path: Optional[Path] = None,
+    metrics: Optional[ScrapeMetrics] = None,
+    base_url: Optional[str] = None,
+    max_finance_bytes: int = DEFAULT_MAX_FINANCE_BYTES,
+    contract_concurrency: int = DEFAULT_CONTRACT_CONCURRENCY,
+) -> BalanceSnapshot:
+    scraper = PgeScraper(
+        username,
+        password,
+        session=session,
+        timeout=timeout,
+        hedge_delay=hedge_delay,
+        metrics=metrics,
+        base_url=base_url,
+        max_finance_bytes=max_finance_bytes,
+        contract_concurrency=contract_concurrency,
+    )
+    if cache_path is not None and scraper.restore_session(_load_session_cache(cache_path)):
+        _LOGGER.debug("Restored portal session from %s", cache_path)
+    snapshot = scraper.get_snapshot()
+    if cache_path is not None:
+        _save_session_cache(cache_path, scraper.export_session())
+    return snapshot
+
+
+def run_batch(
+    accounts: list[tuple[str, str]],
+    *,
+    workers: int,
+    timeout: int,
+    hedge_delay: Optional[float] = None,
+    use_session_cache: bool = True,
+    history: Optional[InvoiceHistory] = None,
+    profile: bool = False,
+    base_url: Optional[str] = None,
+    max_finance_bytes: int = DEFAULT_MAX_FINANCE_BYTES,
+    contract_concurrency: int = DEFAULT_CONTRACT_CONCURRENCY,
+    output: TextIO = sys.stdout,
+) -> int:
+    """Scrape accounts concurrently, writing one JSON line per account.
+
+    Every account gets its own session (cookies, login state) while all
+    sessions share a single urllib3 pool so TLS connections are reused across
+    workers. A failing account is reported and never aborts the batch; the
+    return value is the number of failed accounts. With ``history`` each
+    result also lists the invoices that changed since the previous run, and
+    with ``profile`` the per-phase timings of the account's scrape.
+    """
+    adapter = create_adapter(pool_maxsize=workers * DEFAULT_POOL_MAXSIZE)
+
+    def _job(username: str, password: str) -> dict[str, Any]:
+        session = create_session(adapter)
+        cache_path = _default_session_cache(username) if use_session_cache else None
+        metrics = ScrapeMetrics() if profile else None
+        started = time.perf_counter()
+        try:
+            snapshot = _scrape_account(
+                username,
+                password,
+                timeout=timeout,
+                hedge_delay=hedge_delay,
+                session=session,
+                cache_path=cache_path,
+                metrics=metrics,
+                base_url=base_url,
+                max_finance_bytes=max_finance_bytes,
+                contract_concurrency=contract_concurrency,
+            )
+        except Exception as exc:  # noqa: BLE001 - report every failure per account
+            result: dict[str, Any] = {"username": username, "ok": False, **_error_to_dict(exc)}
+        else:
+            result = {"username": username, "ok": True, **_snapshot_to_dict(snapshot)}
+            if history is not None:
+                changes = _record_history(history, username, snapshot)
+                result["changes"] = [change.as_dict() for change in changes]
+        result["elapsed_s"] = round(time.perf_counter() - started, 3)
+        if metrics is not None:
+            result["profile"] = metrics.as_dict()
+        return result
+
+    failures = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_job, *account) for account in accounts]
+            for future in as_completed(futures):
+                result = future.result()
+                failures += not result["ok"]
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+    finally:
+        adapter.close()
+    return failures
+
+
+# Serve mode: results stay fresh for the TTL. A failed refresh is remembered
+# for SERVE_ERROR_TTL, doubling with every consecutive failure up to the TTL,
+# so that consumers cannot turn a portal outage or a rejected password into
+# a login storm.
+DEFAULT_CACHE_TTL = 900.0
+SERVE_ERROR_TTL = 60.0
+DEFAULT_SERVE_ADDRESS = "127.0.0.1:8765"
+SCRAPE_DURATION_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+@dataclass
+class _ScrapeTelemetry:
+    """Cumulative counters of one account's refreshes since start-up."""
+
+    scrapes: int = 0
+    duration_sum: float = 0.0
+    duration_buckets: list[int] = field(
+        default_factory=lambda: [0] * len(SCRAPE_DURATION_BUCKETS)
+    )
+    errors: Counter[str] = field(default_factory=Counter)
+    requests: Counter[str] = field(default_factory=Counter)
+    response_bytes: Counter[str] = field(default_factory=Counter)
+
+    def record(
+        self, seconds: float, metrics: ScrapeMetrics, error_kind: Optional[str]
+    ) -> None:
+        self.scrapes += 1
+        self.duration_sum += seconds
+        for index, bound in enumerate(SCRAPE_DURATION_BUCKETS):
+            if seconds <= bound:
+                self.duration_buckets[index] += 1
+        if error_kind is not None:
+            self.errors[error_kind] += 1
+        for phase, stats in metrics.as_dict().items():
+            if phase != "total" and stats["requests"]:
+                self.requests[phase] += stats["requests"]
+                self.response_bytes[phase] += stats["bytes"]
+
+    def copy(self) -> _ScrapeTelemetry:
+        return _ScrapeTelemetry(
+            self.scrapes,
+            self.duration_sum,
+            list(self.duration_buckets),
+            Counter(self.errors),
+            Counter(self.requests),
+            Counter(self.response_bytes),
         )
+
+
+@dataclass
+class _CachedAccount:
+    scraper: PgeScraper
+    cache_path: Optional[Path]
+    metrics: ScrapeMetrics
+    lock: threading.Lock
+    snapshot: Optional[BalanceSnapshot] = None
+    fetched: float = 0.0
+    error: Optional[Exception] = None
+    failed: float = 0.0
+    failures: int = 0
+    changes: tuple[InvoiceChange, ...] = ()
+    telemetry: _ScrapeTelemetry = field(default_factory=_ScrapeTelemetry)
+
+
+class _AccountState(NamedTuple):
+    """Consistent copy of one account's cache entry for exporters."""
+
+    username: str
+    snapshot: Optional[BalanceSnapshot]
+    ok: Optional[bool]
+    telemetry: _ScrapeTelemetry
+
+
+class BalanceCache:
+    """Latest snapshot per account, scraped at most once per TTL.
+
+    Every account keeps one ``PgeScraper`` and so one logged-in session for
+    the lifetime of the cache. Callers asking for an account while it is being
+    refreshed wait for that refresh and share its result; ``workers`` caps the
+    refreshes running at once, and all sessions share one urllib3 pool.
+    :meth:`run_refresher` keeps every account fresh in the background, and
+    :meth:`states` reads the cache without ever contacting the portal.
+    """
+
+    def __init__(
+        self,
+        accounts: list[tuple[str, str]],
+        *,
+        ttl: float = DEFAULT_CACHE_TTL,
+        workers: int = 8,
+        timeout: int = 15,
+        hedge_delay: Optional[float] = None,
+        use_session_cache: bool = True,
+        history: Optional[InvoiceHistory] = None,
+        profile: bool = False,
+        base_url: Optional[str] = None,
+        max_finance_bytes: int = DEFAULT_MAX_FINANCE_BYTES,
+        contract_concurrency: int = DEFAULT_CONTRACT_CONCURRENCY,
+    ) -> None:
+        self._ttl = ttl
+        self._workers = workers
+        self._history = history
+        self._profile = profile
+        self._upstream = threading.BoundedSemaphore(workers)
+        self._adapter = create_adapter(pool_maxsize=workers * DEFAULT_POOL_MAXSIZE)
+        self._accounts: dict[str, _CachedAccount] = {}
+        # Guards the stats and every entry's published fields; never held
+        # while talking to the portal.
+        self._state_lock = threading.Lock()
+        self._stats: Counter[str] = Counter()
+        for username, password in accounts:
+            # Request counters feed the exporter, so they are always recorded.
+            metrics = ScrapeMetrics()
+            scraper = PgeScraper(
+                username,
+                password,
+                session=create_session(self._adapter),
+                timeout=timeout,
+                hedge_delay=hedge_delay,
+                metrics=metrics,
+                base_url=base_url,
+                max_finance_bytes=max_finance_bytes,
+                contract_concurrency=contract_concurrency,
+            )
+            cache_path = _default_session_cache(username) if use_session_cache else None
+            if cache_path is not None and scraper.restore_session(
+                _load_session_cache(cache_path)
+            ):
+                _LOGGER.debug("Restored portal session from %s", cache_path)
+            self._accounts[username] = _CachedAccount(
+                scraper, cache_path, metrics, threading.Lock()
+            )
+
+    @property
+    def usernames(self) -> list[str]:
+        return list(self._accounts)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Counters of cache hits, coalesced waits, refreshes and failures."""
+        with self._state_lock:
+            return dict(self._stats)
+
+    def get(self, username: str, *, refresh: bool = False) -> dict[str, Any]:
+        """Return the result for ``username``, scraping only when it is stale.
+
+        ``refresh`` bypasses the TTL unless another caller's refresh finished
+        while this one was waiting, or the last scrape failed and its backoff
+        has not expired: forced refreshes must not turn a rejected password
+        into a login per call. Unknown accounts raise ``KeyError``.
+        """
+        account = self._accounts[username]
+        waited = not account.lock.acquire(blocking=False)
+        if waited:
+            account.lock.acquire()
         try:
-            return float(cleaned)
-        except ValueError:
-            return None
+            now = time.monotonic()
+            backing_off = account.error is not None
+            if self._fresh_for(account, now) > 0 and (waited or backing_off or not refresh):
+                self._count("coalesced" if waited else "hits")
+            else:
+                self._refresh(username, account)
+                now = time.monotonic()
+            return self._result(username, account, now)
+        finally:
+            account.lock.release()
+
+    def states(self) -> list[_AccountState]:
+        """Return every account's cached data; ``ok`` is ``None`` before the first scrape."""
+        with self._state_lock:
+            return [
+                _AccountState(
+                    username,
+                    account.snapshot,
+                    None if not account.telemetry.scrapes else account.error is None,
+                    account.telemetry.copy(),
+                )
+                for username, account in self._accounts.items()
+            ]
+
+    def run_refresher(self, stop: threading.Event) -> None:
+        """Refresh stale accounts in the background until ``stop`` is set."""
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            while not stop.is_set():
+                now = time.monotonic()
+                stale = [
+                    username
+                    for username, account in self._accounts.items()
+                    if self._fresh_for(account, now) <= 0
+                ]
+                list(executor.map(self.get, stale))
+                now = time.monotonic()
+                delay = min(
+                    (self._fresh_for(account, now) for account in self._accounts.values()),
+                    default=self._ttl,
+                )
+                stop.wait(max(delay, 1.0))
+
+    def close(self) -> None:
+        self._adapter.close()
+
+    def _fresh_for(self, account: _CachedAccount, now: float) -> float:
+        """Seconds until ``account`` should be scraped again."""
+        if account.error is not None:
+            error_ttl = min(self._ttl, SERVE_ERROR_TTL * 2 ** (account.failures - 1))
+            return error_ttl - (now - account.failed)
+        if account.snapshot is None:
+            return 0.0
+        return self._ttl - (now - account.fetched)
+
+    def _refresh(self, username: str, account: _CachedAccount) -> None:
+        self._count("refreshes")
+        error: Optional[Exception] = None
+        with self._upstream:
+            started = time.perf_counter()
+            try:
+                snapshot = account.scraper.get_snapshot()
+            except Exception as exc:  # noqa: BLE001 - reported to every waiting caller
+                _LOGGER.warning("Refreshing %s failed: %s", username, exc)
+                error = exc
+            finally:
+                elapsed = time.perf_counter() - started
+                if account.cache_path is not None:
+                    _save_session_cache(account.cache_path, account.scraper.export_session())
+        changes: Optional[tuple[InvoiceChange, ...]] = None
+        if error is None and self._history is not None:
+            changes = tuple(_record_history(self._history, username, snapshot))
+        with self._state_lock:
+            kind = None if error is None else getattr(error, "kind", PgeScraperError.kind)
+            account.telemetry.record(elapsed, account.metrics, kind)
+            if error is not None:
+                self._stats["failures"] += 1
+                account.error = error
+                account.failed = time.monotonic()
+                account.failures += 1
+                return
+            account.snapshot = snapshot
+            account.fetched = time.monotonic()
+            account.error = None
+            account.failures = 0
+            if changes is not None:
+                account.changes = changes
+
+    def _result(self, username: str, account: _CachedAccount, now: float) -> dict[str, Any]:
+        result: dict[str, Any] = {"username": username, "ok": account.snapshot is not None}
+        if account.snapshot is not None:
+            result.update(_snapshot_to_dict(account.snapshot))
+            result["age_s"] = round(now - account.fetched, 1)
+        if account.error is not None:
+            # With an older snapshot at hand it is served, marked stale.
+            result["stale"] = account.snapshot is not None
+            result.update(_error_to_dict(account.error))
+        if self._history is not None:
+            result["changes"] = [change.as_dict() for change in account.changes]
+        if self._profile:
+            result["profile"] = account.metrics.as_dict()
+        return result
+
+    def _count(self, key: str) -> None:
+        with self._state_lock:
+            self._stats[key] += 1
+
+
+def _openmetrics_labels(labels: Mapping[str, str]) -> str:
+    pairs = []
+    for name, value in labels.items():
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_openmetrics(cache: BalanceCache) -> str:
+    """Render cached balances and scrape telemetry in the OpenMetrics text format.
+
+    Only cached state is read, so a metrics scrape never reaches the portal.
+    """
+    lines: list[str] = []
+
+    def family(
+        name: str, kind: str, help_text: str, samples: list[tuple[str, dict[str, str], float]]
+    ) -> None:
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"# HELP {name} {help_text}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_openmetrics_labels(labels)} {value}")
+
+    states = cache.states()
+    balances = [(state.username, state.snapshot) for state in states if state.snapshot]
+    family(
+        "pge_up",
+        "gauge",
+        "Whether the latest scrape of the account succeeded.",
+        [("", {"account": s.username}, int(s.ok)) for s in states if s.ok is not None],
+    )
+    for name, help_text, value_of in (
+        ("pge_outstanding_pln", "Total outstanding amount.", lambda snap: snap.total),
+        (
+            "pge_overdue_pln",
+            "Outstanding amount past its due date.",
+            lambda snap: snap.overdue_amount,
+        ),
+        ("pge_outstanding_invoices", "Outstanding invoices.", lambda snap: snap.count),
+        ("pge_overdue_invoices", "Overdue invoices.", lambda snap: snap.overdue_count),
+        (
+            "pge_last_success_timestamp_seconds",
+            "When the cached balance was scraped.",
+            lambda snap: snap.fetched_at.timestamp(),
+        ),
+    ):
+        family(
+            name,
+            "gauge",
+            help_text,
+            [("", {"account": username}, value_of(snap)) for username, snap in balances],
+        )
+    family(
+        "pge_earliest_due_date_timestamp_seconds",
+        "gauge",
+        "Local midnight of the earliest due date among outstanding invoices.",
+        [
+            (
+                "",
+                {"account": username},
+                datetime.combine(snap.earliest_due_date, datetime.min.time())
+                .astimezone()
+                .timestamp(),
+            )
+            for username, snap in balances
+            if snap.earliest_due_date
+        ],
+    )
+    for name, help_text, value_of in (
+        (
+            "pge_contract_outstanding_pln",
+            "Outstanding amount per contract of multi-contract accounts.",
+            lambda snap: snap.total,
+        ),
+        (
+            "pge_contract_overdue_pln",
+            "Overdue amount per contract of multi-contract accounts.",
+            lambda snap: snap.overdue_amount,
+        ),
+    ):
+        family(
+            name,
+            "gauge",
+            help_text,
+            [
+                ("", {"account": username, "contract": contract.id}, value_of(part))
+                for username, snap in balances
+                for contract, part in snap.contracts
+            ],
+        )
+    duration_samples: list[tuple[str, dict[str, str], float]] = []
+    for state in states:
+        telemetry = state.telemetry
+        for bound, count in zip(SCRAPE_DURATION_BUCKETS, telemetry.duration_buckets):
+            duration_samples.append(
+                ("_bucket", {"account": state.username, "le": str(bound)}, count)
+            )
+        duration_samples.append(
+            ("_bucket", {"account": state.username, "le": "+Inf"}, telemetry.scrapes)
+        )
+        duration_samples.append(("_count", {"account": state.username}, telemetry.scrapes))
+        duration_samples.append(
+            ("_sum", {"account": state.username}, round(telemetry.duration_sum, 6))
+        )
+    family(
+        "pge_scrape_duration_seconds",
+        "histogram",
+        "Wall time of portal scrapes, login included.",
+        duration_samples,
+    )
+    family(
+        "pge_scrape_errors",
+        "counter",
+        "Failed scrapes by failure class.",
+        [
+            ("_total", {"account": state.username, "kind": kind}, count)
+            for state in states
+            for kind, count in sorted(state.telemetry.errors.items())
+        ],
+    )
+    family(
+        "pge_portal_requests",
+        "counter",
+        "HTTP requests sent to the portal by scrape phase.",
+        [
+            ("_total", {"account": state.username, "phase": phase}, count)
+            for state in states
+            for phase, count in sorted(state.telemetry.requests.items())
+        ],
+    )
+    family(
+        "pge_portal_response_bytes",
+        "counter",
+        "Decoded response bytes received from the portal by scrape phase.",
+        [
+            ("_total", {"account": state.username, "phase": phase}, count)
+            for state in states
+            for phase, count in sorted(state.telemetry.response_bytes.items())
+        ],
+    )
+    family(
+        "pge_cache_events",
+        "counter",
+        "Balance cache lookups and refreshes by outcome.",
+        [("_total", {"event": event}, count) for event, count in sorted(cache.stats.items())],
+    )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class _BalanceRequestHandler(BaseHTTPRequestHandler):
+    """Read-only JSON API over a :class:`BalanceCache`.
+
+    ``GET /balance/<username>`` (or ``/balance`` with a single account) returns
+    the cached result, ``?refresh=1`` forces a scrape. ``GET /accounts`` lists
+    the served usernames, ``GET /healthz`` the cache counters and
+    ``GET /metrics`` everything in the OpenMetrics format.
+    """
+
+    cache: BalanceCache
+    server_version = "pge_scraper"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        if parts == ["metrics"]:
+            payload = render_openmetrics(self.cache).encode("utf-8")
+            self._send(200, payload, OPENMETRICS_CONTENT_TYPE)
+        elif parts == ["healthz"]:
+            self._reply(200, {"status": "ok", **self.cache.stats})
+        elif parts == ["accounts"]:
+            self._reply(200, {"accounts": self.cache.usernames})
+        elif parts[:1] == ["balance"] and len(parts) <= 2:
+            usernames = self.cache.usernames
+            if len(parts) == 2:
+                username = parts[1]
+            elif len(usernames) == 1:
+                username = usernames[0]
+            else:
+                self._reply(404, {"error": "Use /balance/<username>"})
+                return
+            refresh = parse_qs(url.query).get("refresh", ["0"])[-1] not in ("0", "false")
+            try:
+                result = self.cache.get(username, refresh=refresh)
+            except KeyError:
+                self._reply(404, {"error": f"Unknown account {username}"})
+                return
+            self._reply(200 if result["ok"] else 502, result)
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def _reply(self, status: int, body: Mapping[str, Any]) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self._send(status, payload, "application/json; charset=utf-8")
+
+    def _send(self, status: int, payload: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # The default writes to stderr and breaks on Unix socket peers.
+        _LOGGER.debug("serve: " + format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _unix_socket_path(address: str) -> Optional[str]:
+    if address.startswith("unix:"):
+        return address[len("unix:") :]
+    return address if "/" in address else None
+
+
+def _parse_tcp_address(address: str) -> tuple[str, int]:
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Expected HOST:PORT or a Unix socket path, got {address!r}")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def serve(address: str, cache: BalanceCache) -> None:
+    """Serve ``cache`` on ``HOST:PORT`` or a Unix socket until interrupted.
+
+    Every account is refreshed in the background once per TTL, so metrics
+    are populated without any balance request. A Unix socket is created with
+    owner-only permissions and removed on exit.
+    """
+    handler = type("_Handler", (_BalanceRequestHandler,), {"cache": cache})
+    socket_path = _unix_socket_path(address)
+    server: socketserver.BaseServer
+    if socket_path is not None:
+        with contextlib.suppress(FileNotFoundError):
+            if Path(socket_path).is_socket():
+                os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, handler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer(_parse_tcp_address(address), handler)
+    # serve_forever() returns once shutdown() is called from another thread.
+    signal.signal(
+        signal.SIGTERM,
+        lambda *_: threading.Thread(target=server.shutdown, daemon=True).start(),
+    )
+    stop_refresher = threading.Event()
+    threading.Thread(
+        target=cache.run_refresher, args=(stop_refresher,), name="pge-refresher", daemon=True
+    ).start()
+    _LOGGER.info("Serving %d account(s) on %s", len(cache.usernames), address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_refresher.set()
+        server.server_close()
+        if socket_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(socket_path)
 
 
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Fetch outstanding balance from PGE Sensor")
-    parser.add_argument("username", help="Login used on ekob portal")
-    parser.add_argument("password", help="Password used on ekob portal")
+    parser.add_argument("username", nargs="?", help="Login used on ekob portal")
+    parser.add_argument("password", nargs="?", help="Password used on ekob portal")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help=(
+            "Scrape many accounts concurrently; FILE ('-' for stdin) holds one "
+            "'username:password' or JSON object per line. Prints JSON lines."
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "json"),
+        default="text",
+        help=(
+            "Output of a single-account run: a sentence or one JSON line with every "
+            "invoice (batch and serve modes always produce JSON)"
+        ),
+    )
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        const=DEFAULT_SERVE_ADDRESS,
+        metavar="ADDRESS",
+        help=(
+            "Run as a daemon answering GET /balance/<username> with cached JSON results "
+            "and GET /metrics in the OpenMetrics format on HOST:PORT or a Unix socket "
+            f"path (default: {DEFAULT_SERVE_ADDRESS}); serves the given account or "
+            "every account in --batch FILE"
+        ),
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        metavar="SECONDS",
+        help="Seconds a scraped result is served in --serve mode (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Concurrent accounts in batch and serve modes (default: 8)",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
         default=15,
         help="Request timeout in seconds (default: 15)",
     )
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Query the fallback finance endpoint if the preferred one has not "
+            "answered within SECONDS (default: try endpoints one after another)"
+        ),
+    )
+    parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        help=(
+            "Portal origin to talk to instead of https://ebok.gkpge.pl, e.g. "
+            "http://127.0.0.1:8080 for benchmarks/fake_portal.py"
+        ),
+    )
+    parser.add_argument(
+        "--max-finance-bytes",
+        type=int,
+        default=DEFAULT_MAX_FINANCE_BYTES,
+        metavar="BYTES",
+        help="Reject finance pages larger than BYTES (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--contract-concurrency",
+        type=int,
+        default=DEFAULT_CONTRACT_CONCURRENCY,
+        metavar="N",
+        help=(
+            "Finance pages fetched at once for an account with several contracts "
+            "(default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--html-parser",
+        choices=HTML_PARSER_BACKENDS,
+        help="HTML parser backend (default: fastest installed, lxml if available)",
+    )
+    parser.add_argument(
+        "--session-cache",
+        type=Path,
+        help=(
+            "File used to persist the portal session between runs "
+            "(default: ~/.cache/pge_scraper/session-<hash>.json; "
+            "batch and serve modes always use the per-account default)"
+        ),
+    )
+    parser.add_argument(
+        "--no-session-cache",
+        action="store_true",
+        help="Always perform a full login and do not persist the session",
+    )
+    parser.add_argument(
+        "--history",
+        nargs="?",
+        type=Path,
+        const=_DEFAULT_HISTORY,
+        metavar="FILE",
+        help=(
+            "Append each scrape to a SQLite invoice history and report new, "
+            f"changed and paid invoices (default FILE: {_DEFAULT_HISTORY})"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Report wall time, request count and response bytes per scrape phase "
+            "(stderr table; a 'profile' field in JSON output)"
+        ),
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
         help="Enable verbose debug logging",
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.batch is None and (not args.username or not args.password):
+        parser.error("username and password are required unless --batch is used")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_finance_bytes < 1:
+        parser.error("--max-finance-bytes must be at least 1")
+    if args.contract_concurrency < 1:
+        parser.error("--contract-concurrency must be at least 1")
+    if args.cache_ttl <= 0:
+        parser.error("--cache-ttl must be positive")
+    if args.serve is not None and _unix_socket_path(args.serve) is None:
+        try:
+            _parse_tcp_address(args.serve)
+        except ValueError as exc:
+            parser.error(f"--serve: {exc}")
+    return args
 
 
 def main() -> int:
@@ -298,17 +2113,156 @@ def main() -> int:
         level=logging.DEBUG if args.debug else logging.WARNING,
         format="%(levelname)s: %(message)s",
     )
-    scraper = PgeScraper(args.username, args.password, timeout=args.timeout)
+    if args.html_parser:
+        try:
+            set_html_parser(args.html_parser)
+        except ValueError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            return 2
+    if args.serve is not None:
+        return _main_serve(args)
+    if args.batch is not None:
+        return _main_batch(args)
+    cache_path: Optional[Path] = None
+    if not args.no_session_cache:
+        cache_path = args.session_cache or _default_session_cache(args.username)
+    metrics = ScrapeMetrics() if args.profile else None
     try:
-        balance = scraper.get_balance_details()
+        snapshot = _scrape_account(
+            args.username,
+            args.password,
+            timeout=args.timeout,
+            hedge_delay=args.hedge_delay,
+            cache_path=cache_path,
+            metrics=metrics,
+            base_url=args.base_url,
+            max_finance_bytes=args.max_finance_bytes,
+            contract_concurrency=args.contract_concurrency,
+        )
     except PgeScraperError as exc:
-        print(f"Error: {exc}", file=sys.stderr)
+        if args.format == "json":
+            error = {"username": args.username, "ok": False, **_error_to_dict(exc)}
+            print(json.dumps(error, ensure_ascii=False))
+        else:
+            print(f"Error: {exc}", file=sys.stderr)
         return 1
+    finally:
+        if metrics is not None and args.format == "text":
+            _print_profile(metrics)
+    changes: Optional[list[InvoiceChange]] = None
+    if args.history is not None:
+        changes = _record_history(InvoiceHistory(args.history), args.username, snapshot)
+    if args.format == "json":
+        result = {"username": args.username, "ok": True, **_snapshot_to_dict(snapshot)}
+        if changes is not None:
+            result["changes"] = [change.as_dict() for change in changes]
+        if metrics is not None:
+            result["profile"] = metrics.as_dict()
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+    balance = snapshot.largest or BalanceInfo(amount=0.0)
     if balance.due_date:
         due_text = balance.due_date.strftime("%d.%m.%Y")
         print(f"Outstanding amount: {balance.amount:.2f} PLN (due {due_text})")
     else:
         print(f"Outstanding amount: {balance.amount:.2f} PLN (due date unavailable)")
+    if snapshot.count > 1:
+        print(f"Total outstanding: {snapshot.total:.2f} PLN in {snapshot.count} invoices")
+    if snapshot.overdue_count:
+        print(
+            f"Overdue: {snapshot.overdue_amount:.2f} PLN in "
+            f"{snapshot.overdue_count} invoice(s)"
+        )
+    for contract, part in snapshot.contracts:
+        print(f"  {contract.label}: {part.total:.2f} PLN in {part.count} invoice(s)")
+    for change in changes or ():
+        print(_describe_change(change))
+    return 0
+
+
+def _print_profile(metrics: ScrapeMetrics) -> None:
+    print(
+        f"{'phase':<12} {'seconds':>9} {'requests':>9} {'bytes':>10} {'wire':>10}",
+        file=sys.stderr,
+    )
+    for phase, stats in metrics.as_dict().items():
+        print(
+            f"{phase:<12} {stats['seconds']:>9.3f} {stats['requests']:>9} "
+            f"{stats['bytes']:>10} {stats['wire_bytes']:>10}",
+            file=sys.stderr,
+        )
+
+
+def _describe_change(change: InvoiceChange) -> str:
+    number = change.invoice_number or "(no number)"
+    if change.kind == "paid":
+        return f"Paid invoice {number}: {change.previous_amount:.2f} PLN"
+    due = f" (due {change.due_date.strftime('%d.%m.%Y')})" if change.due_date else ""
+    if change.kind == "new":
+        return f"New invoice {number}: {change.amount:.2f} PLN{due}"
+    return (
+        f"Changed invoice {number}: {change.previous_amount:.2f} -> "
+        f"{change.amount:.2f} PLN{due}"
+    )
+
+
+def _load_batch_accounts(source: str) -> list[tuple[str, str]]:
+    if source == "-":
+        return _read_accounts(sys.stdin)
+    with open(source, encoding="utf-8") as handle:
+        return _read_accounts(handle)
+
+
+def _main_batch(args: argparse.Namespace) -> int:
+    try:
+        accounts = _load_batch_accounts(args.batch)
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 2
+    failures = run_batch(
+        accounts,
+        workers=args.workers,
+        timeout=args.timeout,
+        hedge_delay=args.hedge_delay,
+        use_session_cache=not args.no_session_cache,
+        history=InvoiceHistory(args.history) if args.history is not None else None,
+        profile=args.profile,
+        base_url=args.base_url,
+        max_finance_bytes=args.max_finance_bytes,
+        contract_concurrency=args.contract_concurrency,
+    )
+    return 1 if failures else 0
+
+
+def _main_serve(args: argparse.Namespace) -> int:
+    if args.batch is not None:
+        try:
+            accounts = _load_batch_accounts(args.batch)
+        except (OSError, ValueError) as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            return 2
+    else:
+        accounts = [(args.username, args.password)]
+    cache = BalanceCache(
+        accounts,
+        ttl=args.cache_ttl,
+        workers=args.workers,
+        timeout=args.timeout,
+        hedge_delay=args.hedge_delay,
+        use_session_cache=not args.no_session_cache,
+        history=InvoiceHistory(args.history) if args.history is not None else None,
+        profile=args.profile,
+        base_url=args.base_url,
+        max_finance_bytes=args.max_finance_bytes,
+        contract_concurrency=args.contract_concurrency,
+    )
+    try:
+        serve(args.serve, cache)
+    except OSError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        cache.close()
     return 0
 
 
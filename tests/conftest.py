@@ -0,0 +1,76 @@
+"""Shared test setup for the CLI scraper and the integration modules."""
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import types
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Expose the integration as a bare ``pge_sensor`` package, so api.py and its
+# Home Assistant free siblings import without running __init__.py.
+if "pge_sensor" not in sys.modules:
+    _package = types.ModuleType("pge_sensor")
+    _package.__path__ = [str(ROOT / "custom_components" / "pge_sensor")]
+    sys.modules["pge_sensor"] = _package
+
+
+class RunningPortal:
+    """``benchmarks/fake_portal.py`` served from a loop on its own thread.
+
+    Both scrapers reach it over TCP, so the blocking CLI scraper and tests
+    running their own event loop can share it.
+    """
+
+    def __init__(self, **options: object) -> None:
+        from aiohttp import web
+
+        from benchmarks.fake_portal import FakePortal, PortalConfig
+
+        self.portal = FakePortal(PortalConfig(**options))
+        self._runner = web.AppRunner(self.portal.build_app())
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.base_url = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(self.portal.stats)
+
+    async def _start(self) -> str:
+        from aiohttp import web
+
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+@pytest.fixture
+def fake_portal() -> Iterator[Callable[..., RunningPortal]]:
+    """Start fake portals with ``PortalConfig`` options; stopped after the test."""
+    pytest.importorskip("aiohttp")
+    started: list[RunningPortal] = []
+
+    def _start(**options: object) -> RunningPortal:
+        portal = RunningPortal(**options)
+        started.append(portal)
+        return portal
+
+    yield _start
+    for portal in started:
+        portal.close()
@@ -0,0 +1,104 @@
+"""Failure backoff: per-kind delays, jitter bounds and the circuit breaker."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from pge_sensor.backoff import JITTER, POLICIES, CircuitBreaker  # noqa: E402
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class _FixedRandom(random.Random):
+    """Always draws ``value``, to pin the jitter to one end of its range."""
+
+    def __init__(self, value: float) -> None:
+        super().__init__()
+        self._value = value
+
+    def random(self) -> float:
+        return self._value
+
+
+@pytest.mark.parametrize("kind", sorted(POLICIES))
+def test_policy_delay_grows_to_its_cap_and_cools_down_when_tripped(kind):
+    policy = POLICIES[kind]
+    previous = timedelta(0)
+    for failures in range(1, policy.trip_after):
+        expected = min(policy.maximum, policy.initial * policy.factor ** (failures - 1))
+        assert policy.delay(failures) == expected
+        assert previous <= expected <= policy.maximum
+        previous = expected
+    assert policy.delay(policy.trip_after) == policy.cooldown
+    assert policy.delay(policy.trip_after + 3) == policy.cooldown
+
+
+@pytest.mark.parametrize("draw", [0.0, 0.5, 0.999999])
+def test_jitter_stays_within_bounds(draw):
+    breaker = CircuitBreaker(_FixedRandom(draw))
+    base = POLICIES["network"].delay(1)
+    delay = breaker.record_failure("network", NOW)
+    assert base <= delay < base * (1 + JITTER)
+    assert delay == base * (1 + JITTER * draw)
+
+
+def test_jitter_is_applied_on_top_of_the_floor():
+    breaker = CircuitBreaker(_FixedRandom(0.0))
+    floor = POLICIES["network"].initial * 10
+    assert breaker.record_failure("network", NOW, floor=floor) == floor
+
+
+def test_unknown_kind_uses_the_default_policy():
+    breaker = CircuitBreaker(_FixedRandom(0.0))
+    assert breaker.record_failure("teapot", NOW) == POLICIES["unknown"].initial
+    assert breaker.kind == "teapot"
+
+
+@pytest.mark.parametrize("kind", sorted(POLICIES))
+def test_breaker_opens_after_trip_after_failures(kind):
+    policy = POLICIES[kind]
+    breaker = CircuitBreaker(_FixedRandom(0.0))
+    for _ in range(policy.trip_after - 1):
+        breaker.record_failure(kind, NOW)
+        assert not breaker.is_open(NOW)
+    delay = breaker.record_failure(kind, NOW)
+    assert delay == policy.cooldown
+    assert breaker.open_until == NOW + policy.cooldown
+    assert breaker.is_open(NOW + policy.cooldown - timedelta(seconds=1))
+
+
+def test_half_open_breaker_lets_one_attempt_through_and_reopens_on_failure():
+    policy = POLICIES["auth"]
+    breaker = CircuitBreaker(_FixedRandom(0.0))
+    for _ in range(policy.trip_after):
+        breaker.record_failure("auth", NOW)
+    retry_at = breaker.open_until
+    assert retry_at is not None
+
+    assert not breaker.is_open(retry_at)
+    assert breaker.open_until is None
+    assert breaker.failures == policy.trip_after
+
+    breaker.record_failure("auth", retry_at)
+    assert breaker.is_open(retry_at)
+    assert breaker.open_until == retry_at + policy.cooldown
+
+
+def test_success_and_reset_close_the_breaker():
+    policy = POLICIES["layout"]
+    breaker = CircuitBreaker(_FixedRandom(0.0))
+    for _ in range(policy.trip_after):
+        breaker.record_failure("layout", NOW)
+    assert breaker.is_open(NOW)
+
+    breaker.record_success()
+    assert not breaker.is_open(NOW)
+    assert (breaker.failures, breaker.kind, breaker.open_until) == (0, None, None)
+    assert breaker.record_failure("layout", NOW) == policy.initial
+
+    breaker.reset()
+    assert breaker.failures == 0
@@ -0,0 +1,104 @@
+"""The CLI's serve-mode cache: one scrape per TTL, shared by concurrent callers."""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pge_scraper
+
+FINANCE = "GET /ebok/finanse.xhtml"
+
+
+def _cache(
+    base_url: str, password: str = "secret", **options: object
+) -> pge_scraper.BalanceCache:
+    return pge_scraper.BalanceCache(
+        [("user", password)], use_session_cache=False, base_url=base_url, **options
+    )
+
+
+@pytest.fixture
+def closing():  # noqa: ANN201
+    caches: list[pge_scraper.BalanceCache] = []
+    yield caches.append
+    for cache in caches:
+        cache.close()
+
+
+def test_result_is_reused_until_the_ttl_runs_out(fake_portal, closing):
+    running = fake_portal(rows=3)
+    cache = _cache(running.base_url, ttl=0.5)
+    closing(cache)
+
+    first = cache.get("user")
+    second = cache.get("user")
+
+    assert first["ok"] and second["ok"]
+    assert first["total"] == second["total"]
+    assert cache.stats == {"refreshes": 1, "hits": 1}
+    assert running.stats[FINANCE] == 1
+
+    time.sleep(0.6)
+    assert cache.get("user")["age_s"] == 0.0
+    assert cache.stats == {"refreshes": 2, "hits": 1}
+    assert running.stats[FINANCE] == 2
+    assert running.stats["logins"] == 1
+
+
+def test_forced_refresh_bypasses_the_ttl(fake_portal, closing):
+    running = fake_portal(rows=3)
+    cache = _cache(running.base_url, ttl=900)
+    closing(cache)
+
+    cache.get("user")
+    cache.get("user", refresh=True)
+
+    assert cache.stats == {"refreshes": 2}
+    assert running.stats[FINANCE] == 2
+
+
+def test_concurrent_callers_share_one_scrape(fake_portal, closing):
+    running = fake_portal(rows=3, latency=0.05)
+    cache = _cache(running.base_url, ttl=900)
+    closing(cache)
+    callers = 8
+    barrier = threading.Barrier(callers)
+
+    def _get(_: int) -> dict[str, object]:
+        barrier.wait()
+        return cache.get("user")
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        results = list(executor.map(_get, range(callers)))
+
+    assert all(result == results[0] for result in results)
+    stats = cache.stats
+    assert stats["refreshes"] == 1
+    assert stats["coalesced"] >= 1
+    assert stats.get("hits", 0) + stats["coalesced"] == callers - 1
+    assert running.stats["logins"] == 1
+    assert running.stats[FINANCE] == 1
+
+
+def test_failed_scrape_is_remembered_even_for_forced_refreshes(fake_portal, closing):
+    running = fake_portal(rows=3)
+    cache = _cache(running.base_url, password="wrong", ttl=900)
+    closing(cache)
+
+    first = cache.get("user")
+    again = cache.get("user", refresh=True)
+
+    assert (first["ok"], first["error_kind"]) == (False, "auth")
+    assert again == first
+    assert cache.stats == {"refreshes": 1, "failures": 1, "hits": 1}
+    assert running.stats["failed_logins"] == 1
+
+
+def test_unknown_account_raises_key_error(fake_portal, closing):
+    cache = _cache(fake_portal().base_url)
+    closing(cache)
+    with pytest.raises(KeyError):
+        cache.get("someone-else")
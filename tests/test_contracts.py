@@ -0,0 +1,144 @@
+"""Accounts with several contracts: discovery, per-contract totals, fallback."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import pge_scraper
+from benchmarks.fake_portal import _finance_document
+from pge_sensor import api
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+ROWS = 4
+SCRAPERS = {"cli": pge_scraper.PgeScraper, "async": api.PgeScraper}
+
+
+def _dashboard(*options: tuple[str, str], select_id: str = "menuForm:wyborUmowy") -> str:
+    items = "".join(f'<option value="{value}">{label}</option>' for value, label in options)
+    return f'<html><body><select id="{select_id}">{items}</select></body></html>'
+
+
+def _page_total(view: str) -> float:
+    page = _finance_document(ROWS, False, 0, view)
+    return pge_scraper.PgeScraper._analyse_finance_payload(page).invoices.total_grosze() / 100
+
+
+def _cli_snapshot(base_url: str, username: str) -> pge_scraper.BalanceSnapshot:
+    scraper = pge_scraper.PgeScraper(username, "secret", base_url=base_url)
+    return scraper.get_snapshot(now=NOW)
+
+
+def _async_snapshot(base_url: str, username: str) -> api.BalanceSnapshot:
+    import aiohttp
+
+    async def _run() -> api.BalanceSnapshot:
+        jar = aiohttp.CookieJar(unsafe=True)
+        async with aiohttp.ClientSession(cookie_jar=jar) as session:
+            scraper = api.PgeScraper(username, "secret", session, base_url=base_url)
+            return await scraper.get_snapshot(now=NOW)
+
+    return asyncio.run(_run())
+
+
+FETCHERS = {"cli": _cli_snapshot, "async": _async_snapshot}
+
+
+def _offline_scraper(kind: str):  # noqa: ANN202
+    if kind == "cli":
+        return pge_scraper.PgeScraper("user", "secret")
+    # Parsing only; the client session is never used.
+    return api.PgeScraper("user", "secret", None)
+
+
+@pytest.mark.parametrize("kind", sorted(SCRAPERS))
+def test_discovery_reads_every_contract_once(kind):
+    html = _dashboard(
+        ("000101", "Umowa 000101 - PPE 1"),
+        ("000102", "Umowa 000102 - PPE 2"),
+        ("000101", "Umowa 000101 - PPE 1"),
+        ("", "Wybierz"),
+    )
+    contracts = SCRAPERS[kind]._discover_contracts(html)
+    assert [tuple(item) for item in contracts] == [
+        ("000101", "Umowa 000101 - PPE 1"),
+        ("000102", "Umowa 000102 - PPE 2"),
+    ]
+
+
+@pytest.mark.parametrize("kind", sorted(SCRAPERS))
+def test_discovery_accepts_a_delivery_point_switcher(kind):
+    html = _dashboard(("PL1", "PPE 1"), ("PL2", ""), select_id="form:ppeSelect")
+    contracts = SCRAPERS[kind]._discover_contracts(html)
+    assert [tuple(item) for item in contracts] == [("PL1", "PPE 1"), ("PL2", "PL2")]
+
+
+@pytest.mark.parametrize("kind", sorted(SCRAPERS))
+def test_discovery_treats_one_option_or_no_switcher_as_single_account(kind):
+    scraper_cls = SCRAPERS[kind]
+    assert scraper_cls._discover_contracts(_dashboard(("000101", "Umowa 1"))) == ()
+    assert scraper_cls._discover_contracts("<html><body><p>eBOK</p></body></html>") == ()
+
+
+@pytest.mark.parametrize("kind", sorted(FETCHERS))
+def test_contract_totals_add_up_to_the_account(kind, fake_portal):
+    running = fake_portal(rows=ROWS, contracts=3)
+    username = "multi-user"
+    ids = running.portal._contract_ids(username)
+
+    snapshot = FETCHERS[kind](running.base_url, username)
+
+    assert [contract.id for contract, _ in snapshot.contracts] == ids
+    expected = {contract: _page_total(f"{username}/{contract}") for contract in ids}
+    assert len(set(expected.values())) == len(ids)
+    for contract, total in expected.items():
+        part = snapshot.by_contract[contract]
+        assert part.total == total
+        assert part.count == ROWS
+        assert {item.contract for item in part.invoices} == {contract}
+    assert snapshot.total == round(sum(expected.values()), 2)
+    assert snapshot.count == ROWS * len(ids)
+    assert running.stats["contract_views"] == len(ids)
+
+
+@pytest.mark.parametrize("kind", sorted(FETCHERS))
+def test_single_contract_account_is_one_view(kind, fake_portal):
+    running = fake_portal(rows=ROWS)
+
+    snapshot = FETCHERS[kind](running.base_url, "user")
+
+    assert snapshot.contracts == ()
+    assert snapshot.by_contract == {}
+    assert snapshot.total == _page_total("user")
+    assert snapshot.count == ROWS
+    assert "contract_views" not in running.stats
+
+
+@pytest.mark.parametrize("kind", sorted(FETCHERS))
+def test_ignored_contract_switch_falls_back_to_one_view(kind, fake_portal):
+    running = fake_portal(rows=ROWS, contracts=3, ignore_contract_param=True)
+
+    snapshot = FETCHERS[kind](running.base_url, "multi-user")
+
+    assert snapshot.contracts == ()
+    assert snapshot.total == _page_total("multi-user")
+    assert snapshot.count == ROWS
+    assert running.stats["GET /ebok/finanse.xhtml"] == 3
+
+
+@pytest.mark.parametrize("kind", sorted(SCRAPERS))
+def test_repeated_contract_page_is_counted_once(kind):
+    module = pge_scraper if kind == "cli" else api
+    scraper = _offline_scraper(kind)
+    first, second, third = (module.Contract(str(index), f"PPE {index}") for index in (1, 2, 3))
+    page_a = _finance_document(ROWS, False, 0, "a")
+    page_b = _finance_document(ROWS, False, 0, "b")
+
+    snapshot = scraper._snapshot_from_payloads(
+        [(first, page_a), (second, page_a), (third, page_b)], NOW
+    )
+
+    assert [contract.id for contract, _ in snapshot.contracts] == ["1", "3"]
+    assert snapshot.total == round(_page_total("a") + _page_total("b"), 2)
+    assert snapshot.count == 2 * ROWS
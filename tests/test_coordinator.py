@@ -0,0 +1,79 @@
+"""Coordinator state kept in its Store: the portal session and last snapshot."""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+
+pytest.importorskip("homeassistant.helpers.update_coordinator")
+
+from pge_sensor.api import BalanceInfo, BalanceSnapshot, Contract  # noqa: E402
+from pge_sensor.coordinator import (  # noqa: E402
+    _snapshot_from_store,
+    _snapshot_to_store,
+)
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+FIELDS = (
+    "invoices",
+    "total",
+    "count",
+    "earliest_due_date",
+    "overdue_amount",
+    "overdue_count",
+    "largest",
+    "latest_issue_date",
+    "fetched_at",
+)
+
+
+def _through_store(snapshot: BalanceSnapshot) -> BalanceSnapshot | None:
+    # Store.async_save writes JSON; async_load gives back plain data.
+    return _snapshot_from_store(json.loads(json.dumps(_snapshot_to_store(snapshot))))
+
+
+def _fields(snapshot: BalanceSnapshot) -> dict[str, object]:
+    return {field: getattr(snapshot, field) for field in FIELDS}
+
+
+def test_snapshot_survives_the_store():
+    snapshot = BalanceSnapshot.from_balances(
+        [
+            BalanceInfo(120.45, date(2024, 2, 10), "FV/1", date(2024, 1, 27)),
+            BalanceInfo(80.0, None, "FV/2"),
+            BalanceInfo(80.0, date(2024, 3, 20), None, date(2024, 3, 6)),
+        ],
+        NOW,
+    )
+
+    restored = _through_store(snapshot)
+
+    assert restored is not None
+    assert _fields(restored) == _fields(snapshot)
+
+
+def test_contract_snapshots_survive_the_store():
+    contracts = (Contract("1", "PPE 1"), Contract("2", "PPE 2"))
+    snapshot = BalanceSnapshot.from_balances(
+        [
+            BalanceInfo(10.0, date(2024, 2, 10), "FV/1", contract="1"),
+            BalanceInfo(20.0, date(2024, 2, 12), "FV/2", contract="2"),
+        ],
+        NOW,
+        contracts,
+    )
+
+    restored = _through_store(snapshot)
+
+    assert restored is not None
+    assert [contract for contract, _ in restored.contracts] == list(contracts)
+    for contract in contracts:
+        assert _fields(restored.by_contract[contract.id]) == _fields(
+            snapshot.by_contract[contract.id]
+        )
+
+
+@pytest.mark.parametrize("stored", [None, {}, {"invoices": []}, {"fetched_at": "soon"}])
+def test_unreadable_stored_snapshot_is_ignored(stored):
+    assert _snapshot_from_store(stored) is None
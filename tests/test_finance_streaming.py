@@ -0,0 +1,119 @@
+"""Streamed finance pages must parse exactly like the complete document."""
+from __future__ import annotations
+
+import asyncio
+import io
+
+import pytest
+import requests
+import requests.adapters
+
+import pge_scraper
+from pge_sensor import api
+
+# Small enough that every table and message lands in a chunk of its own.
+CHUNK_SIZE = 64
+FINANCE_URL = "https://ebok.gkpge.pl/ebok/finanse.xhtml"
+
+
+def _invoice_table(first: int, rows: int = 2) -> str:
+    body = "".join(
+        f"<tr><td>FV/2024/{number:07d}</td><td>05.01.2024</td><td>19.01.2024</td>"
+        f"<td>{number}23,45 zł</td></tr>"
+        for number in range(first, first + rows)
+    )
+    return (
+        '<table><thead id="form:fakturaDoZaplaty_head"><tr><th>Numer</th>'
+        "<th>Data wystawienia</th><th>Termin płatności</th><th>Kwota</th></tr></thead>"
+        f"<tbody>{body}</tbody></table>"
+    )
+
+
+def _page(body: str) -> str:
+    # Padding pushes the interesting markup past the first chunks.
+    head = '<!DOCTYPE html><html><head><meta charset="UTF-8"/></head><body>'
+    return f"{head}<nav>{'menu ' * 80}</nav>{body}</body></html>"
+
+
+GAP = f"<p>{'x' * 500}</p>"
+PAGES = {
+    "two_tables": _page(_invoice_table(1) + GAP + _invoice_table(3)),
+    "banner_first": _page(f"<div>Nie masz żadnych zaległości</div>{GAP}{_invoice_table(1)}"),
+    "empty_table_then_rows": _page(
+        _invoice_table(1, rows=0) + "<p>Brak należności</p>" + GAP + _invoice_table(5)
+    ),
+}
+
+
+class _ChunkedAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with ``page``, readable in small chunks."""
+
+    def __init__(self, page: str) -> None:
+        super().__init__()
+        self._page = page.encode("utf-8")
+
+    def send(self, request, **_kwargs):  # noqa: ANN001
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(self._page)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def _assert_same_analysis(scraper_cls, streamed: str, page: str) -> None:
+    assert streamed == page
+    full = scraper_cls._analyse_finance_payload(page)
+    partial = scraper_cls._analyse_finance_payload(streamed)
+    assert partial.invoices.rows() == full.invoices.rows()
+    assert partial.no_outstanding == full.no_outstanding
+    assert len(full.invoices) > 0
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_cli_streamed_page_parses_like_full_page(name, monkeypatch):
+    monkeypatch.setattr(pge_scraper, "STREAM_CHUNK_SIZE", CHUNK_SIZE)
+    page = PAGES[name]
+    session = requests.Session()
+    session.mount("https://", _ChunkedAdapter(page))
+    scraper = pge_scraper.PgeScraper("user", "secret", session=session)
+    result = scraper._fetch_finance_url(FINANCE_URL, [])
+    assert result is not None
+    _assert_same_analysis(pge_scraper.PgeScraper, result[1], page)
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_async_streamed_page_parses_like_full_page(name, monkeypatch):
+    aiohttp = pytest.importorskip("aiohttp")
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    monkeypatch.setattr(api, "STREAM_CHUNK_SIZE", CHUNK_SIZE)
+    page = PAGES[name]
+
+    async def _finance(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        body = page.encode("utf-8")
+        for start in range(0, len(body), CHUNK_SIZE):
+            await response.write(body[start : start + CHUNK_SIZE])
+        await response.write_eof()
+        return response
+
+    async def _run() -> str:
+        app = web.Application()
+        app.router.add_get("/ebok/finanse.xhtml", _finance)
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            scraper = api.PgeScraper(
+                "user", "secret", session, base_url=str(server.make_url("/"))
+            )
+            result = await scraper._fetch_finance_url(scraper.FINANCE_URL, [])
+            assert result is not None
+            return result[1]
+
+    _assert_same_analysis(api.PgeScraper, asyncio.run(_run()), page)
@@ -0,0 +1,162 @@
+"""Invoice history: diffing consecutive scrapes, retention and the CLI's copy."""
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+import pge_scraper
+from pge_sensor import api
+from pge_sensor.history import InvoiceHistory
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+JAN = date(2024, 1, 20)
+FEB = date(2024, 2, 20)
+
+
+def _snapshot(*items: api.BalanceInfo, at: datetime = NOW) -> api.BalanceSnapshot:
+    return api.BalanceSnapshot.from_balances(list(items), at)
+
+
+def _changes(history: InvoiceHistory, *items: api.BalanceInfo) -> set[tuple[object, ...]]:
+    return {
+        (change.kind, change.invoice_number, change.amount, change.previous_amount)
+        for change in history.record("user", _snapshot(*items))
+    }
+
+
+def _count(path: Path, table: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def history(tmp_path: Path) -> InvoiceHistory:
+    return InvoiceHistory(tmp_path / "history.sqlite")
+
+
+def test_first_scrape_reports_every_invoice_as_new(history):
+    changes = history.record(
+        "user", _snapshot(api.BalanceInfo(120.5, JAN, "FV/1", date(2024, 1, 6)))
+    )
+    assert [change.as_dict() for change in changes] == [
+        {
+            "change": "new",
+            "invoice_number": "FV/1",
+            "amount": 120.5,
+            "previous_amount": None,
+            "due_date": "2024-01-20",
+            "issue_date": "2024-01-06",
+        }
+    ]
+
+
+def test_new_changed_and_paid_rows(history):
+    _changes(
+        history,
+        api.BalanceInfo(100.0, JAN, "FV/1"),
+        api.BalanceInfo(200.0, FEB, "FV/2"),
+        api.BalanceInfo(300.0, FEB, "FV/3"),
+    )
+
+    changes = _changes(
+        history,
+        api.BalanceInfo(100.0, JAN, "FV/1"),
+        api.BalanceInfo(150.0, FEB, "FV/2"),
+        api.BalanceInfo(40.0, FEB, "FV/4"),
+    )
+
+    assert changes == {
+        ("changed", "FV/2", 150.0, 200.0),
+        ("paid", "FV/3", 0.0, 300.0),
+        ("new", "FV/4", 40.0, None),
+    }
+
+
+def test_moved_due_date_is_a_change(history):
+    _changes(history, api.BalanceInfo(100.0, JAN, "FV/1"))
+    assert _changes(history, api.BalanceInfo(100.0, FEB, "FV/1")) == {
+        ("changed", "FV/1", 100.0, 100.0)
+    }
+    assert _changes(history, api.BalanceInfo(100.0, FEB, "FV/1")) == set()
+
+
+def test_unnumbered_rows_are_matched_in_order(history):
+    _changes(history, api.BalanceInfo(10.0, JAN), api.BalanceInfo(20.0, FEB))
+    assert _changes(history, api.BalanceInfo(10.0, JAN), api.BalanceInfo(20.0, FEB)) == set()
+
+    assert _changes(history, api.BalanceInfo(20.0, FEB)) == {
+        ("changed", None, 20.0, 10.0),
+        ("paid", None, 0.0, 20.0),
+    }
+
+
+def test_repeated_rows_are_not_collapsed(history):
+    row = api.BalanceInfo(55.0, JAN, "FV/1")
+    _changes(history, row, row)
+    assert _changes(history, row, row) == set()
+    changes = history.record("user", _snapshot(row, row, row))
+    assert [change.kind for change in changes] == ["new"]
+    assert [change.kind for change in history.record("user", _snapshot(row))] == [
+        "paid",
+        "paid",
+    ]
+
+
+def test_accounts_are_diffed_separately(history):
+    history.record("first", _snapshot(api.BalanceInfo(10.0, JAN, "FV/1")))
+    changes = history.record("second", _snapshot(api.BalanceInfo(10.0, JAN, "FV/1")))
+    assert [change.kind for change in changes] == ["new"]
+
+
+def test_old_scrapes_are_pruned_per_account(tmp_path):
+    path = tmp_path / "history.sqlite"
+    history = InvoiceHistory(path, max_scrapes=3)
+    history.record("other", _snapshot(api.BalanceInfo(1.0, JAN, "FV/9")))
+    for day in range(6):
+        snapshot = _snapshot(
+            api.BalanceInfo(10.0 + day, JAN, "FV/1"),
+            api.BalanceInfo(5.0, FEB, "FV/2"),
+            at=NOW + timedelta(days=day),
+        )
+        changes = history.record("user", snapshot)
+        if day:
+            assert [(change.kind, change.previous_amount) for change in changes] == [
+                ("changed", 9.0 + day)
+            ]
+
+    assert _count(path, "scrapes") == 3 + 1
+    assert _count(path, "observations") == 3 * 2 + 1
+    with sqlite3.connect(path) as conn:
+        kept = [row[0] for row in conn.execute("SELECT fetched_at FROM scrapes ORDER BY id")]
+    assert kept[0] == NOW.isoformat()
+    assert kept[1:] == [(NOW + timedelta(days=day)).isoformat() for day in (3, 4, 5)]
+
+
+def test_forget_drops_one_account(tmp_path):
+    path = tmp_path / "history.sqlite"
+    history = InvoiceHistory(path)
+    history.record("first", _snapshot(api.BalanceInfo(10.0, JAN, "FV/1")))
+    history.record("second", _snapshot(api.BalanceInfo(10.0, JAN, "FV/1")))
+
+    history.forget("first")
+
+    assert (_count(path, "scrapes"), _count(path, "observations")) == (1, 1)
+    changes = history.record("first", _snapshot(api.BalanceInfo(10.0, JAN, "FV/1")))
+    assert [change.kind for change in changes] == ["new"]
+
+
+def test_cli_records_its_snapshots_with_the_shared_history(tmp_path):
+    history = pge_scraper.InvoiceHistory(tmp_path / "history.sqlite")
+    assert pge_scraper.InvoiceHistory.__module__ == "pge_sensor_history"
+
+    first = pge_scraper.BalanceSnapshot.from_balances(
+        [pge_scraper.BalanceInfo(10.0, JAN, "FV/1")], NOW
+    )
+    second = pge_scraper.BalanceSnapshot.from_balances([], NOW)
+
+    assert [change.kind for change in history.record("user", first)] == ["new"]
+    changes = pge_scraper._record_history(history, "user", second)
+    assert [change.as_dict()["change"] for change in changes] == ["paid"]
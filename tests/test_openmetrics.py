@@ -0,0 +1,116 @@
+"""OpenMetrics exposition of the serve-mode cache, compared with a stored rendering."""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+import pge_scraper
+from pge_scraper import BalanceInfo, BalanceSnapshot, Contract
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+EXPECTED = Path(__file__).resolve().parent / "data" / "openmetrics.txt"
+
+
+class _StaticCache:
+    """The two reads render_openmetrics makes of a BalanceCache, with fixed data."""
+
+    stats = {"refreshes": 3, "hits": 5, "failures": 1}
+
+    def states(self) -> list[pge_scraper._AccountState]:
+        single = BalanceSnapshot.from_balances(
+            [
+                BalanceInfo(120.45, date(2024, 2, 10), "FV/1"),
+                BalanceInfo(80.0, date(2024, 3, 20), "FV/2"),
+            ],
+            NOW,
+        )
+        multi = BalanceSnapshot.from_balances(
+            [
+                BalanceInfo(10.5, date(2024, 3, 10), "FV/3", contract="1"),
+                BalanceInfo(20.0, None, "FV/4", contract="2"),
+            ],
+            NOW,
+            (Contract("1", "PPE 1"), Contract("2", "PPE 2")),
+        )
+        telemetry = pge_scraper._ScrapeTelemetry
+        return [
+            pge_scraper._AccountState(
+                "jan@example.pl",
+                single,
+                True,
+                telemetry(
+                    2,
+                    3.25,
+                    [0, 1, 2, 2, 2, 2, 2],
+                    Counter(),
+                    Counter({"login": 4, "finance": 2}),
+                    Counter({"login": 8000, "finance": 50000}),
+                ),
+            ),
+            # A failed latest scrape still exports the older snapshot; the
+            # label value needs escaping.
+            pge_scraper._AccountState(
+                'multi "x"\\',
+                multi,
+                False,
+                telemetry(
+                    2,
+                    31.5,
+                    [0, 0, 0, 1, 1, 1, 2],
+                    Counter({"network": 1}),
+                    Counter({"finance": 3}),
+                    Counter({"finance": 1234}),
+                ),
+            ),
+            # Not scraped yet: no pge_up sample, an empty histogram.
+            pge_scraper._AccountState("new", None, None, telemetry()),
+        ]
+
+
+@pytest.fixture
+def warsaw_time(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Due dates are exported as local midnight; pin the local time zone."""
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "Europe/Warsaw")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_exposition_matches_the_expected_output(warsaw_time):
+    rendered = pge_scraper.render_openmetrics(_StaticCache())
+    assert rendered == EXPECTED.read_text(encoding="utf-8")
+
+
+def test_every_sample_belongs_to_a_declared_family(warsaw_time):
+    rendered = pge_scraper.render_openmetrics(_StaticCache())
+    lines = rendered.splitlines()
+    assert rendered.endswith("\n") and lines[-1] == "# EOF"
+
+    suffixes = {"counter": ("_total",), "histogram": ("_bucket", "_count", "_sum")}
+    families: dict[str, str] = {}
+    for line in lines[:-1]:
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in families
+            families[name] = kind
+            continue
+        if line.startswith("# HELP "):
+            assert line.split(" ")[2] in families
+            continue
+        name = line.partition("{")[0]
+        family = next(
+            family
+            for family in families
+            if name == family
+            or any(name == family + suffix for suffix in suffixes.get(families[family], ()))
+        )
+        assert family == list(families)[-1]
+        float(line.rpartition(" ")[2])
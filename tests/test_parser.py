@@ -0,0 +1,105 @@
+"""Finance document parsing of both scrapers on every installed backend."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+import pge_scraper
+from benchmarks.fixtures import generate, no_outstanding_page, partial_response
+from pge_sensor import api
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+MODULES = {"cli": pge_scraper, "async": api}
+BACKENDS = pge_scraper.available_html_parsers()
+# The benchmark fixture set without the slowest sizes, by name.
+FIXTURES = {fixture.name: fixture for fixture in generate(row_counts=(1, 10, 1000))}
+
+# A partial response whose fragments hold no table, with the portal's message
+# in another element of the envelope.
+MESSAGE_OUTSIDE_FRAGMENTS = (
+    '<?xml version="1.0" encoding="UTF-8"?><partial-response id="j_id1"><changes>'
+    '<update id="financeForm:menu"><![CDATA[<div class="menu">Finanse</div>]]></update>'
+    '<extension id="financeForm:messages"><![CDATA[<p>Brak należności do '
+    "zapłaty.</p>]]></extension>"
+    "</changes></partial-response>"
+)
+NOTHING_IN_FRAGMENTS = MESSAGE_OUTSIDE_FRAGMENTS.replace("Brak", "Lista")
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Run the test with each installed parser backend, in both modules."""
+    for module in MODULES.values():
+        monkeypatch.setattr(module, "_html_parser", request.param)
+    return request.param
+
+
+def _offline_scraper(kind: str):  # noqa: ANN202
+    if kind == "cli":
+        return pge_scraper.PgeScraper("user", "secret")
+    # Parsing only; the client session is never used.
+    return api.PgeScraper("user", "secret", None)
+
+
+@pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_message_outside_partial_fragments_means_nothing_to_pay(kind, backend):
+    scraper_cls = MODULES[kind].PgeScraper
+    analysis = scraper_cls._analyse_finance_payload(MESSAGE_OUTSIDE_FRAGMENTS)
+    assert len(analysis.invoices) == 0
+    assert analysis.no_outstanding
+
+
+@pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_partial_response_without_invoices_or_message_is_a_layout_change(kind, backend):
+    module = MODULES[kind]
+    scraper = _offline_scraper(kind)
+    assert not module.PgeScraper._analyse_finance_payload(NOTHING_IN_FRAGMENTS).no_outstanding
+    with pytest.raises(module.PgeLayoutChangedError):
+        scraper._snapshot_from_payload(NOTHING_IN_FRAGMENTS, None, NOW)
+    snapshot = scraper._snapshot_from_payload(MESSAGE_OUTSIDE_FRAGMENTS, None, NOW)
+    assert (snapshot.total, snapshot.count) == (0.0, 0)
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_partial_response_rows_come_from_the_fragments(kind, backend):
+    scraper_cls = MODULES[kind].PgeScraper
+    analysis = scraper_cls._analyse_finance_payload(partial_response(25, seed=3))
+    assert len(analysis.invoices) == 25
+    assert len(scraper_cls._extract_balance_info(partial_response(25, seed=3))) == 25
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_no_outstanding_page(kind, backend):
+    analysis = MODULES[kind].PgeScraper._analyse_finance_payload(no_outstanding_page())
+    assert len(analysis.invoices) == 0
+    assert analysis.no_outstanding
+
+
+def _analyse_with(module, backend: str, payload: str) -> object:  # noqa: ANN001
+    module.set_html_parser(backend)
+    try:
+        return module.PgeScraper._analyse_finance_payload(payload)
+    except module.PgeScraperError as exc:
+        return type(exc)
+
+
+@pytest.mark.skipif(len(BACKENDS) < 2, reason="needs lxml next to html.parser")
+@pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+@pytest.mark.parametrize("kind", sorted(MODULES))
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_parser_backends_agree_on_the_benchmark_fixtures(kind, name, monkeypatch):
+    module = MODULES[kind]
+    # set_html_parser() swaps the module global; monkeypatch puts it back.
+    monkeypatch.setattr(module, "_html_parser", module._html_parser)
+    fixture = FIXTURES[name]
+
+    results = {backend: _analyse_with(module, backend, fixture.payload) for backend in BACKENDS}
+
+    reference = results[BACKENDS[0]]
+    for backend, result in results.items():
+        assert result == reference, f"{backend} differs from {BACKENDS[0]}"
+    if fixture.kind in ("page", "partial"):
+        assert len(reference.invoices) == fixture.rows
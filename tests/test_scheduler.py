@@ -0,0 +1,124 @@
+"""Refresh planning: the chosen intervals and the daily request budget."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from pge_sensor.api import BalanceInfo, BalanceSnapshot
+from pge_sensor.scheduler import (
+    BUDGET_WINDOW,
+    DUE_SOON_INTERVAL,
+    ISSUE_WINDOW_INTERVAL,
+    QUIET_INTERVAL,
+    SETTLE_INTERVAL,
+    UPCOMING_INTERVAL,
+    PollingPlanner,
+)
+
+START = datetime(2024, 3, 1, 6, 0, tzinfo=timezone.utc)
+
+
+def _snapshot(
+    amount: float, due: date | None, now: datetime = START, issued: date | None = None
+) -> BalanceSnapshot:
+    if not amount:
+        return BalanceSnapshot.from_balances([], now)
+    return BalanceSnapshot.from_balances([BalanceInfo(amount, due, "FV/1", issued)], now)
+
+
+@pytest.mark.parametrize(("budget", "spacing"), [(1, 24), (12, 2), (48, 0.5), (0, 24)])
+def test_min_interval_spreads_the_budget_over_a_day(budget, spacing):
+    assert PollingPlanner(budget).min_interval == timedelta(hours=spacing)
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (None, QUIET_INTERVAL),
+        (_snapshot(0, None), QUIET_INTERVAL),
+        (_snapshot(100.0, date(2024, 3, 20)), QUIET_INTERVAL),
+        (_snapshot(100.0, date(2024, 3, 6)), UPCOMING_INTERVAL),
+        (_snapshot(100.0, date(2024, 3, 2)), DUE_SOON_INTERVAL),
+        (_snapshot(100.0, date(2024, 2, 20)), DUE_SOON_INTERVAL),
+        (_snapshot(100.0, None), QUIET_INTERVAL),
+    ],
+)
+def test_interval_follows_the_due_date(data, expected):
+    assert PollingPlanner(48).next_interval(data, None, START) == expected
+
+
+def test_min_spacing_overrides_a_shorter_interval():
+    planner = PollingPlanner(4)
+    interval = planner.next_interval(_snapshot(100.0, date(2024, 3, 2)), None, START)
+    assert interval == timedelta(hours=6) > DUE_SOON_INTERVAL
+
+
+def test_payment_is_followed_up_until_it_settles():
+    planner = PollingPlanner(48)
+    due = date(2024, 3, 20)
+    before = _snapshot(300.0, due)
+    after = _snapshot(100.0, due)
+
+    assert planner.next_interval(after, before, START) == SETTLE_INTERVAL
+    assert planner.next_interval(after, after, START + timedelta(hours=23)) == SETTLE_INTERVAL
+    assert planner.next_interval(after, after, START + timedelta(days=1)) == QUIET_INTERVAL
+
+
+def test_polls_more_often_around_the_expected_issue_date():
+    planner = PollingPlanner(48)
+    issued = _snapshot(100.0, date(2024, 4, 30), issued=date(2024, 1, 15))
+
+    # One billing period after 15 January is 14 February.
+    now = datetime(2024, 2, 5, tzinfo=timezone.utc)
+    assert planner.next_interval(issued, None, now) == QUIET_INTERVAL
+    for day in (12, 14, 19):
+        now = datetime(2024, 2, day, tzinfo=timezone.utc)
+        assert planner.next_interval(issued, None, now) == ISSUE_WINDOW_INTERVAL
+    now = datetime(2024, 2, 20, tzinfo=timezone.utc)
+    assert planner.next_interval(issued, None, now) == QUIET_INTERVAL
+
+
+def test_rolling_cap_waits_for_the_oldest_refresh_in_the_window():
+    planner = PollingPlanner(3)
+    # Manual refreshes ignore the planned spacing but still count.
+    for hours in (0, 1, 2):
+        planner.record_refresh(START + timedelta(hours=hours))
+    now = START + timedelta(hours=2)
+
+    assert planner.clamp(timedelta(0), now) == timedelta(hours=22)
+    assert planner.clamp(timedelta(hours=30), now) == timedelta(hours=30)
+
+
+def test_refreshes_leave_the_window_after_a_day():
+    planner = PollingPlanner(2)
+    planner.record_refresh(START)
+    planner.record_refresh(START + timedelta(hours=1))
+    later = START + BUDGET_WINDOW + timedelta(hours=1)
+    planner.record_refresh(later)
+
+    assert planner.clamp(timedelta(0), later) == planner.min_interval
+
+
+@pytest.mark.parametrize("budget", [1, 3, 12, 48])
+def test_no_day_exceeds_the_budget(budget):
+    planner = PollingPlanner(budget)
+    data = _snapshot(100.0, date(2024, 3, 2))
+    now = START
+    refreshes = []
+    for step in range(200):
+        planner.record_refresh(now)
+        refreshes.append(now)
+        if step % 5 == 4:
+            # An occasional manual refresh shortly after a planned one.
+            now += timedelta(minutes=10)
+            planner.record_refresh(now)
+            refreshes.append(now)
+        interval = planner.next_interval(data, data, now)
+        assert interval >= planner.min_interval
+        now += interval
+
+    for index, first in enumerate(refreshes):
+        in_window = [when for when in refreshes[index:] if when - first < BUDGET_WINDOW]
+        # A manual refresh can go one over the budget; planned ones then wait.
+        assert len(in_window) <= budget + 1
@@ -0,0 +1,270 @@
+"""Portal sessions: losing them after login, persisting and re-login."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+
+import pge_scraper
+from pge_sensor import api
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+MODULES = {"cli": pge_scraper, "async": api}
+
+
+def _cli_snapshot(base_url: str, username: str = "user") -> pge_scraper.BalanceSnapshot:
+    return pge_scraper.PgeScraper(username, "secret", base_url=base_url).get_snapshot(NOW)
+
+
+def _async_snapshot(base_url: str, username: str = "user") -> api.BalanceSnapshot:
+    import aiohttp
+
+    async def _run() -> api.BalanceSnapshot:
+        jar = aiohttp.CookieJar(unsafe=True)
+        async with aiohttp.ClientSession(cookie_jar=jar) as session:
+            scraper = api.PgeScraper(username, "secret", session, base_url=base_url)
+            return await scraper.get_snapshot(NOW)
+
+    return asyncio.run(_run())
+
+
+FETCHERS = {"cli": _cli_snapshot, "async": _async_snapshot}
+
+
+@pytest.mark.parametrize("kind", sorted(FETCHERS))
+def test_session_dropped_after_login_is_an_auth_failure(kind, fake_portal):
+    # The session survives the redirect after the login POST (one request
+    # later) but not the warmup requests that follow it.
+    running = fake_portal(latency=0.2, session_ttl=0.3)
+
+    error = MODULES[kind].PgeAuthError
+    with pytest.raises(error, match="did not keep the session") as caught:
+        FETCHERS[kind](running.base_url)
+
+    assert caught.value.kind == "auth"
+    assert running.stats["logins"] == 1
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_every_error_has_its_own_kind(kind):
+    module = MODULES[kind]
+    kinds = {
+        error.kind
+        for error in (
+            module.PgeSessionExpiredError,
+            module.PgeNetworkError,
+            module.PgeAuthError,
+            module.PgeVerificationRequiredError,
+            module.PgeLayoutChangedError,
+        )
+    }
+    assert len(kinds) == 5
+    assert module.PgeScraperError.kind not in kinds
+
+
+def _session_cookie(state: dict[str, Any]) -> dict[str, Any]:
+    (cookie,) = (item for item in state["cookies"] if item["name"] == "JSESSIONID")
+    return cookie
+
+
+def _cli_round_trip(base_url: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    first = pge_scraper.PgeScraper("user", "secret", base_url=base_url)
+    first.get_snapshot(NOW)
+    # The coordinator Store and the CLI cache file both keep the state as JSON.
+    state = json.loads(json.dumps(first.export_session()))
+
+    second = pge_scraper.PgeScraper("user", "secret", base_url=base_url)
+    assert second.restore_session(state)
+    second.get_snapshot(NOW)
+    return state, second.export_session()
+
+
+def _async_round_trip(base_url: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    import aiohttp
+
+    async def _run() -> tuple[dict[str, Any], dict[str, Any]]:
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            first = api.PgeScraper("user", "secret", session, base_url=base_url)
+            await first.get_snapshot(NOW)
+            state = json.loads(json.dumps(first.export_session()))
+
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            second = api.PgeScraper("user", "secret", session, base_url=base_url)
+            assert second.restore_session(state)
+            assert api._host_only_cookies(session.cookie_jar) == {
+                ("127.0.0.1", "JSESSIONID")
+            }
+            await second.get_snapshot(NOW)
+            return state, second.export_session()
+
+    return asyncio.run(_run())
+
+
+ROUND_TRIPS = {"cli": _cli_round_trip, "async": _async_round_trip}
+
+
+@pytest.mark.parametrize("kind", sorted(ROUND_TRIPS))
+def test_restored_session_keeps_its_cookie_attributes(kind, fake_portal):
+    running = fake_portal(rows=3)
+
+    state, restored = ROUND_TRIPS[kind](running.base_url)
+
+    cookie = _session_cookie(state)
+    assert cookie["domain"] == "127.0.0.1"
+    assert cookie["host_only"] is True
+    assert cookie["path"] == "/ebok"
+    assert cookie["httponly"] is True
+    assert restored == state
+    assert running.stats["logins"] == 1
+
+
+def test_domain_cookie_stays_a_domain_cookie():
+    import aiohttp
+
+    state = {
+        "username": "user",
+        "authenticated": True,
+        "contracts": None,
+        "cookies": [
+            {
+                "name": "lb",
+                "value": "node-2",
+                "domain": "gkpge.pl",
+                "host_only": False,
+                "path": "/",
+                "secure": True,
+                "httponly": False,
+                "expires": None,
+            }
+        ],
+    }
+
+    async def _run() -> dict[str, Any]:
+        async with aiohttp.ClientSession() as session:
+            scraper = api.PgeScraper("user", "secret", session)
+            assert scraper.restore_session(state)
+            assert not api._host_only_cookies(session.cookie_jar)
+            return scraper.export_session()
+
+    assert asyncio.run(_run()) == state
+
+
+def _cli_refresh_twice(base_url: str, pause: float) -> None:
+    scraper = pge_scraper.PgeScraper("user", "secret", base_url=base_url)
+    scraper.get_snapshot(NOW)
+    time.sleep(pause)
+    scraper.get_snapshot(NOW)
+
+
+def _async_refresh_twice(base_url: str, pause: float) -> None:
+    import aiohttp
+
+    async def _run() -> None:
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            scraper = api.PgeScraper("user", "secret", session, base_url=base_url)
+            await scraper.get_snapshot(NOW)
+            await asyncio.sleep(pause)
+            await scraper.get_snapshot(NOW)
+
+    asyncio.run(_run())
+
+
+REFRESHES = {"cli": _cli_refresh_twice, "async": _async_refresh_twice}
+
+
+@pytest.mark.parametrize("kind", sorted(REFRESHES))
+def test_expired_session_logs_in_once_and_retries_once(kind, fake_portal):
+    running = fake_portal(rows=3, session_ttl=0.5)
+
+    REFRESHES[kind](running.base_url, pause=0.6)
+
+    stats = running.stats
+    assert stats["expired_sessions"] == 1
+    assert stats["logins"] == 2
+    # First refresh, the request answered with the login page, the retry.
+    assert stats["GET /ebok/finanse.xhtml"] == 3
+
+
+class _ExpiringPortal:
+    """Stands in for the portal requests of an offline scraper and counts them."""
+
+    def __init__(self, expiries: int) -> None:
+        self.expiries = expiries
+        self.logins = 0
+        self.fetches = 0
+
+    def login(self) -> None:
+        self.logins += 1
+
+    def fetch(self) -> list[tuple[None, str]]:
+        self.fetches += 1
+        if self.expiries:
+            self.expiries -= 1
+            raise pge_scraper.PgeSessionExpiredError("Portal session expired")
+        return [(None, "<p>Brak należności do zapłaty.</p>")]
+
+
+def _patched_snapshot(
+    kind: str, portal: _ExpiringPortal, monkeypatch: pytest.MonkeyPatch, authenticated: bool
+) -> object:
+    if kind == "cli":
+        scraper = pge_scraper.PgeScraper("user", "secret")
+        monkeypatch.setattr(scraper, "_login", portal.login)
+        monkeypatch.setattr(scraper, "_fetch_finance_payloads", portal.fetch)
+        scraper._authenticated = authenticated
+        return scraper.get_snapshot(NOW)
+
+    async def _login() -> None:
+        portal.login()
+
+    async def _fetch() -> list[tuple[None, str]]:
+        try:
+            return portal.fetch()
+        except pge_scraper.PgeSessionExpiredError as exc:
+            raise api.PgeSessionExpiredError(str(exc)) from None
+
+    async def _run() -> object:
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            scraper = api.PgeScraper("user", "secret", session)
+            monkeypatch.setattr(scraper, "_login", _login)
+            monkeypatch.setattr(scraper, "_fetch_finance_payloads", _fetch)
+            scraper._authenticated = authenticated
+            return await scraper.get_snapshot(NOW)
+
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_second_expiry_after_logging_in_again_is_raised(kind, monkeypatch):
+    portal = _ExpiringPortal(expiries=2)
+
+    with pytest.raises(MODULES[kind].PgeSessionExpiredError):
+        _patched_snapshot(kind, portal, monkeypatch, authenticated=True)
+
+    assert (portal.logins, portal.fetches) == (1, 2)
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_expiry_right_after_a_fresh_login_is_not_retried(kind, monkeypatch):
+    portal = _ExpiringPortal(expiries=1)
+
+    with pytest.raises(MODULES[kind].PgeSessionExpiredError):
+        _patched_snapshot(kind, portal, monkeypatch, authenticated=False)
+
+    assert (portal.logins, portal.fetches) == (1, 1)
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_restored_session_expiry_costs_one_login(kind, monkeypatch):
+    portal = _ExpiringPortal(expiries=1)
+
+    snapshot = _patched_snapshot(kind, portal, monkeypatch, authenticated=True)
+
+    assert (snapshot.total, snapshot.count) == (0.0, 0)
+    assert (portal.logins, portal.fetches) == (1, 2)
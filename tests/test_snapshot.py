@@ -0,0 +1,238 @@
+"""Columnar invoice storage: amounts in grosze, aggregates and fallbacks."""
+from __future__ import annotations
+
+import random
+import re
+from datetime import date, datetime, timezone
+
+import pytest
+
+import pge_scraper
+from benchmarks.fixtures import full_page, no_outstanding_page, partial_response
+from pge_sensor import api
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+MODULES = {"cli": pge_scraper, "async": api}
+FIXTURES = {
+    "page": full_page(100, seed=7),
+    "partial": partial_response(100, seed=7),
+}
+ROW_REGEX = re.compile(
+    r"<td[^>]*><span>(?P<number>FV/[^<]+)</span></td>"
+    r"<td[^>]*><span>[^<]+</span></td>"
+    r"<td[^>]*><span>(?P<due>[^<]+)</span></td>"
+    r'<td[^>]*class="kwota"[^>]*><span>(?P<amount>[^<]+)</span></td>'
+)
+
+
+def _reference_rows(payload: str) -> list[tuple[str, date, int]]:
+    """Invoice number, due date and grosze of every fixture row, read with a regex."""
+    rows = []
+    for match in ROW_REGEX.finditer(payload):
+        day, month, year = (int(part) for part in match["due"].split("."))
+        amount = match["amount"].replace("\xa0", "").removesuffix("zł")
+        zloty, _, cents = amount.partition(",")
+        rows.append((match["number"], date(year, month, day), int(zloty) * 100 + int(cents)))
+    return rows
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+@pytest.mark.parametrize(
+    ("text", "grosze"),
+    [
+        ("1 234,56 zł", 123456),
+        ("1\xa0234,56\xa0zł", 123456),
+        ("12 345 678,90 PLN", 1234567890),
+        ("0,05 zł", 5),
+        ("99.10", 9910),
+        ("Saldo: 10,00 zł, do zapłaty 1 020,50 zł", 102050),
+        ("Brak należności", None),
+        ("", None),
+    ],
+)
+def test_amounts_are_decoded_to_exact_grosze(kind, text, grosze):
+    assert MODULES[kind].PgeScraper._amount_grosze(text) == grosze
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+@pytest.mark.parametrize("fixture", sorted(FIXTURES))
+def test_total_and_overdue_sums_match_the_fixture_rows(kind, fixture):
+    payload = FIXTURES[fixture]
+    reference = _reference_rows(payload)
+    assert len(reference) == 100
+    table = MODULES[kind].PgeScraper._analyse_finance_payload(payload).invoices
+
+    snapshot = MODULES[kind].BalanceSnapshot.from_table(table, NOW)
+
+    overdue = [grosze for _, due, grosze in reference if due < NOW.date()]
+    assert 0 < len(overdue) < len(reference)
+    assert table.total_grosze() == sum(grosze for _, _, grosze in reference)
+    assert snapshot.total == sum(grosze for _, _, grosze in reference) / 100
+    assert snapshot.count == len(reference)
+    assert snapshot.overdue_amount == sum(overdue) / 100
+    assert snapshot.overdue_count == len(overdue)
+    assert snapshot.earliest_due_date == min(due for _, due, _ in reference)
+    number, _, grosze = max(reference, key=lambda row: row[2])
+    assert (snapshot.largest.invoice_number, snapshot.largest.amount) == (number, grosze / 100)
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_float_amounts_are_rounded_to_grosze(kind):
+    module = MODULES[kind]
+    table = module.InvoiceTable.from_balances(
+        [module.BalanceInfo(0.1 + 0.2, date(2024, 1, 1)), module.BalanceInfo(1234.56)]
+    )
+    assert table.total_grosze() == 123486
+    assert [item.amount for item in table] == [0.3, 1234.56]
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_summary_labels_alone_count_as_one_invoice(kind):
+    module = MODULES[kind]
+    table = module.InvoiceTable()
+    for grosze in (50_000, 50_000, 30_000):
+        table.append(grosze)
+
+    snapshot = module.BalanceSnapshot.from_table(table, NOW)
+
+    assert len(table.identified()) == 0
+    assert (snapshot.total, snapshot.count) == (500.0, 1)
+    assert snapshot.largest == module.BalanceInfo(500.0)
+    assert snapshot.earliest_due_date is None
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_summary_labels_are_ignored_next_to_invoice_rows(kind):
+    module = MODULES[kind]
+    table = module.InvoiceTable()
+    table.append(90_000)
+    table.append(12_345, due=date(2024, 2, 10).toordinal(), number="FV/1")
+    table.append(10_000, due=date(2024, 3, 10).toordinal())
+
+    snapshot = module.BalanceSnapshot.from_table(table, NOW)
+
+    assert (snapshot.total, snapshot.count) == (223.45, 2)
+    assert (snapshot.overdue_amount, snapshot.overdue_count) == (123.45, 1)
+    assert snapshot.largest.invoice_number == "FV/1"
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_no_outstanding_page_and_empty_table_give_an_empty_snapshot(kind):
+    module = MODULES[kind]
+    analysis = module.PgeScraper._analyse_finance_payload(no_outstanding_page())
+
+    for table in (module.InvoiceTable(), analysis.invoices):
+        snapshot = module.BalanceSnapshot.from_table(table, NOW)
+        assert snapshot.invoices == ()
+        assert (snapshot.total, snapshot.count) == (0.0, 0)
+        assert (snapshot.overdue_amount, snapshot.overdue_count) == (0.0, 0)
+        assert snapshot.largest is None
+        assert snapshot.earliest_due_date is None
+        assert snapshot.latest_issue_date is None
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+def test_views_share_columns_and_are_read_only(kind):
+    module = MODULES[kind]
+    table = module.PgeScraper._analyse_finance_payload(FIXTURES["page"]).invoices
+    view = table.sorted_by_due()
+
+    assert len(view) == len(table)
+    assert view.total_grosze() == table.total_grosze()
+    with pytest.raises(TypeError):
+        view.append(100)
+
+
+# Snapshot fields read by the sensors, the diagnostics and the CLI output.
+SENSOR_FIELDS = (
+    "invoices",
+    "total",
+    "count",
+    "earliest_due_date",
+    "overdue_amount",
+    "overdue_count",
+    "largest",
+    "latest_issue_date",
+)
+
+
+def _reference_aggregates(items: list, today: date) -> dict[str, object]:
+    """The sensor aggregates computed the plain way, over a list of ``BalanceInfo``."""
+    rows = [item for item in items if item.invoice_number or item.due_date]
+    if not rows and items:
+        rows = [max(items, key=lambda item: item.amount)]
+    overdue = [item for item in rows if item.due_date and item.due_date < today]
+    return {
+        "invoices": tuple(sorted(rows, key=lambda item: item.due_date or date.max)),
+        "total": round(sum(item.amount for item in rows), 2),
+        "count": len(rows),
+        "earliest_due_date": min(
+            (item.due_date for item in rows if item.due_date), default=None
+        ),
+        "overdue_amount": round(sum(item.amount for item in overdue), 2),
+        "overdue_count": len(overdue),
+        "largest": max(rows, key=lambda item: item.amount, default=None),
+        "latest_issue_date": max(
+            (item.issue_date for item in rows if item.issue_date), default=None
+        ),
+    }
+
+
+def _random_balances(  # noqa: ANN001
+    module, rng: random.Random, count: int, contracts: tuple = (None,)
+) -> list:
+    items = []
+    for index in range(count):
+        # Repeated amounts exercise the first-on-ties rule of ``largest``.
+        amount = rng.choice((rng.randint(1, 500_000), 12_345)) / 100
+        due = date(2024, 1, 1).toordinal() + rng.randint(0, 120)
+        issued = due - 14
+        items.append(
+            module.BalanceInfo(
+                amount,
+                date.fromordinal(due) if rng.random() < 0.8 else None,
+                f"FV/{index}" if rng.random() < 0.7 else None,
+                date.fromordinal(issued) if rng.random() < 0.9 else None,
+                rng.choice(contracts),
+            )
+        )
+    return items
+
+
+def _fields(snapshot) -> dict[str, object]:  # noqa: ANN001
+    return {field: getattr(snapshot, field) for field in SENSOR_FIELDS}
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+@pytest.mark.parametrize("seed", range(20))
+def test_sensor_aggregates_match_a_list_based_reference(kind, seed):
+    module = MODULES[kind]
+    rng = random.Random(seed)
+    items = _random_balances(module, rng, rng.choice((0, 1, 3, 50)))
+    if seed % 4 == 0:
+        # Summary labels only: no invoice number and no due date anywhere.
+        items = [module.BalanceInfo(item.amount) for item in items]
+
+    snapshot = module.BalanceSnapshot.from_balances(items, NOW)
+
+    assert _fields(snapshot) == _reference_aggregates(items, NOW.date())
+
+
+@pytest.mark.parametrize("kind", sorted(MODULES))
+@pytest.mark.parametrize("seed", range(10))
+def test_contract_aggregates_match_a_list_based_reference(kind, seed):
+    module = MODULES[kind]
+    rng = random.Random(seed)
+    contracts = (module.Contract("A", "PPE A"), module.Contract("B", "PPE B"))
+    items = _random_balances(module, rng, 40, tuple(contract.id for contract in contracts))
+
+    snapshot = module.BalanceSnapshot.from_balances(items, NOW, contracts)
+
+    kept = []
+    for contract in contracts:
+        expected = _reference_aggregates(
+            [item for item in items if item.contract == contract.id], NOW.date()
+        )
+        assert _fields(snapshot.by_contract[contract.id]) == expected
+        kept.extend(expected["invoices"])
+    assert _fields(snapshot) == _reference_aggregates(kept, NOW.date())
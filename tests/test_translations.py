@@ -0,0 +1,80 @@
+"""UI strings must cover every flow step, error and abort the flows use."""
+from __future__ import annotations
+
+import json
+import re
+import string
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+COMPONENT = Path(__file__).resolve().parent.parent / "custom_components" / "pge_sensor"
+FLOW_SOURCE = (COMPONENT / "config_flow.py").read_text(encoding="utf-8")
+CONFIG_FLOW_SOURCE, _, OPTIONS_FLOW_SOURCE = FLOW_SOURCE.partition("class PgeEbokOptionsFlow")
+# ``CONF_*`` names of const.py mapped to the option keys they hold.
+CONSTANTS = dict(
+    re.findall(r'^(CONF_\w+) = "(\w+)"$', (COMPONENT / "const.py").read_text("utf-8"), re.M)
+)
+LANGUAGES = ("en", "pl")
+
+
+def _load(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+STRINGS = _load(COMPONENT / "strings.json")
+TRANSLATIONS = {
+    language: _load(COMPONENT / "translations" / f"{language}.json") for language in LANGUAGES
+}
+
+
+def _keys(tree: Any, prefix: tuple[str, ...] = ()) -> set[tuple[str, ...]]:
+    if not isinstance(tree, dict):
+        return {prefix}
+    return set().union(*(_keys(value, (*prefix, key)) for key, value in tree.items()))
+
+
+def _placeholders(text: str) -> set[str]:
+    return {name for _, name, _, _ in string.Formatter().parse(text) if name}
+
+
+def _leaf(tree: Any, path: tuple[str, ...]) -> str:
+    for key in path:
+        tree = tree[key]
+    return tree
+
+
+def test_english_translation_is_the_source_strings():
+    assert TRANSLATIONS["en"] == STRINGS
+
+
+@pytest.mark.parametrize("language", LANGUAGES)
+def test_translation_has_every_key_and_placeholder(language):
+    translation = TRANSLATIONS[language]
+    assert _keys(translation) == _keys(STRINGS)
+    for path in _keys(STRINGS):
+        assert _placeholders(_leaf(translation, path)) == _placeholders(_leaf(STRINGS, path))
+
+
+def test_config_flow_steps_errors_and_aborts_have_strings():
+    config = STRINGS["config"]
+    steps = set(re.findall(r'step_id="(\w+)"', CONFIG_FLOW_SOURCE))
+    errors = set(re.findall(r'errors\["base"\] = "(\w+)"', CONFIG_FLOW_SOURCE))
+    aborts = set(re.findall(r'reason="(\w+)"', CONFIG_FLOW_SOURCE))
+    if "_abort_if_unique_id_configured" in CONFIG_FLOW_SOURCE:
+        aborts.add("already_configured")
+    assert steps and steps <= set(config["step"])
+    assert errors <= set(config["error"])
+    assert aborts <= set(config["abort"])
+    assert "{username}" in config["step"]["reauth_confirm"]["description"]
+
+
+def test_options_flow_steps_and_fields_have_strings():
+    options = STRINGS["options"]["step"]
+    steps = set(re.findall(r'step_id="(\w+)"', OPTIONS_FLOW_SOURCE))
+    names = re.findall(r"vol\.(?:Required|Optional)\(\s*(CONF_\w+)", OPTIONS_FLOW_SOURCE)
+    fields = {CONSTANTS[name] for name in names}
+    assert steps == {"init"} and steps <= set(options)
+    assert fields and set(options["init"]["data"]) == fields
+    assert set(options["init"].get("data_description", {})) <= fields